@@ -0,0 +1,151 @@
+"""
+Benchmark: 30-day meal history payload serialization
+
+Compares the previous path (one model construction per row, FastAPI
+response_model re-validation and the stdlib JSON encoder) with the fast path
+used by nutrition_api (rows reshaped into the response dict and rendered with
+orjson, no model per meal).
+
+The previous path is timed on whatever FastAPI is installed; on the pinned
+0.121 response_model output also goes through jsonable_encoder, so the gap
+there is larger than on releases that serialize response models with Pydantic.
+
+Run from backend/: python benchmark_history_payload.py [--days 30] [--meals-per-day 15]
+No database or running server is needed.
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+
+from nutrition_aggregation import NutrientFrame, empty_totals
+from nutrition_db import meal_history_payload
+from nutrition_models import DailyNutritionTotals, MealEntryResponse, MealsByCategory, WeeklyMealHistory
+
+CATEGORIES = ("Breakfast", "Lunch", "Dinner")
+
+
+def make_rows(days: int, meals_per_day: int):
+    """Fake meal_entries rows with embedded food_items, as PostgREST returns them"""
+    end = date.today()
+    rows = []
+    for day in range(days):
+        entry_date = (end - timedelta(days=day)).isoformat()
+        for i in range(meals_per_day):
+            rows.append({
+                "id": day * meals_per_day + i + 1,
+                "profile_id": "00000000-0000-0000-0000-000000000001",
+                "food_item_id": i + 1,
+                "entry_date": entry_date,
+                "meal_category": CATEGORIES[i % 3],
+                "servings": 1.5,
+                "created_at": f"{entry_date}T12:00:00+00:00",
+                "food_items": {
+                    "id": i + 1,
+                    "name": f"Food item {i}",
+                    "serving_size": "1 cup",
+                    "calories": 250 + i,
+                    "total_fat": 9.5,
+                    "sodium": 410.0,
+                    "total_carb": 31.2,
+                    "dietary_fiber": 3.1,
+                    "sugars": 6.4,
+                    "protein": 12.8,
+                    "location": "Worcester",
+                },
+            })
+    return rows, (end - timedelta(days=days - 1)).isoformat(), end.isoformat()
+
+
+def validated_entry(row) -> MealEntryResponse:
+    """The previous field-by-field construction"""
+    food = row["food_items"]
+    return MealEntryResponse(
+        id=row["id"], profile_id=row["profile_id"], food_item_id=row["food_item_id"],
+        entry_date=row["entry_date"], meal_category=row["meal_category"], servings=row["servings"],
+        created_at=row["created_at"], food_name=food["name"], serving_size=food["serving_size"],
+        calories=food["calories"], total_fat=food["total_fat"], sodium=food["sodium"],
+        total_carb=food["total_carb"], dietary_fiber=food["dietary_fiber"], sugars=food["sugars"],
+        protein=food["protein"], location=food["location"],
+    )
+
+
+def build_history(rows, start_date, end_date):
+    """The previous history endpoint: models for every meal, totals and day"""
+    meals_by_date = {}
+    entries = [validated_entry(row) for row in rows]
+    for entry in entries:
+        meals_by_date.setdefault(entry.entry_date[:10], {c: [] for c in CATEGORIES})[entry.meal_category].append(entry)
+
+    totals_by_day = NutrientFrame.from_entries(entries).totals_by_day()
+    return WeeklyMealHistory(
+        profile_id=rows[0]["profile_id"],
+        start_date=start_date,
+        end_date=end_date,
+        meals_by_date={d: MealsByCategory(**m) for d, m in meals_by_date.items()},
+        daily_totals={
+            d: DailyNutritionTotals(date=d, **(totals_by_day.get(d) or empty_totals()))
+            for d in meals_by_date
+        },
+    )
+
+
+def make_app(rows, start_date, end_date) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/previous", response_model=WeeklyMealHistory)
+    async def previous():
+        return build_history(rows, start_date, end_date)
+
+    @app.get("/fast", response_model=WeeklyMealHistory)
+    async def fast():
+        return ORJSONResponse(meal_history_payload(rows[0]["profile_id"], start_date, end_date, rows))
+
+    return app
+
+
+def normalized(body):
+    """created_at is passed through as PostgREST's ISO string instead of re-rendered; compare instants"""
+    for meals in body["meals_by_date"].values():
+        for entries in meals.values():
+            for entry in entries:
+                entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+    return body
+
+
+def timed(label: str, fn: Callable, repeat: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<12} {per_call:8.2f} ms/request")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--meals-per-day", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows, start_date, end_date = make_rows(args.days, args.meals_per_day)
+    client = TestClient(make_app(rows, start_date, end_date))
+
+    previous_body = client.get("/previous").json()
+    fast_body = client.get("/fast").json()
+    assert normalized(previous_body) == normalized(fast_body), "fast path changed the payload"
+
+    print(f"History payload: {args.days} days x {args.meals_per_day} meals ({len(rows)} entries)")
+    previous = timed("previous", lambda: client.get("/previous"), args.repeat)
+    fast = timed("fast path", lambda: client.get("/fast"), args.repeat)
+    print(f"  speedup      {previous / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: nutrition string parsing during menu ingest
+
+Compares the previous parser (strip every non-digit/non-dot character, then
+float()) with nutrition_parsing over the nutrition strings of a scraped menu
+file, and the previous validate-then-model ingest with the single-pass
+parse_menu_document (checked and trusted). Values whose parse changed
+(e.g. "<1g", "2-3g", malformed "1.5.0g") are listed.
+
+Run from backend/: python benchmark_nutrition_parsing.py [--menu all_dining_halls_menus.json]
+No database or running server is needed.
+"""
+import argparse
+import time
+from typing import Callable
+
+import nutrition_parsing
+from nutrition_parsing import NUTRIENT_UNITS, parse_nutrition_facts, parse_nutrition_value
+from nutrition_aggregation import NUTRIENTS
+from nutrition_models import FoodItemCreate
+from menu_files import read_menu_file
+from nutrition_utils import parse_menu_document
+
+
+def legacy_parse_nutrition_value(value: str) -> float:
+    """The parser previously duplicated in nutrition_utils and the Lambda"""
+    if not value:
+        return 0.0
+    numeric_str = ''.join(c for c in value if c.isdigit() or c == '.')
+    try:
+        return float(numeric_str) if numeric_str else 0.0
+    except ValueError:
+        return 0.0
+
+
+def legacy_parse_facts(nutrition: dict) -> dict:
+    return {field: legacy_parse_nutrition_value(nutrition.get(field)) for field in NUTRIENT_UNITS}
+
+
+def previous_menu_rows(menus: dict) -> list:
+    """The previous ingest: a validation walk, then a FoodItemCreate per item dumped back to a dict"""
+    for location, entries in menus.items():
+        for idx, entry in enumerate(entries):
+            if not isinstance(entry, dict) or "date" not in entry or not isinstance(entry.get("meals"), dict):
+                raise ValueError(f"Entry {idx} in '{location}' is invalid")
+    rows = []
+    for location, entries in menus.items():
+        for entry in entries:
+            for meal_type, sections in entry["meals"].items():
+                for items in sections.values():
+                    for item in items:
+                        nutrition = item.get("nutrition", {})
+                        facts = parse_nutrition_facts(nutrition)
+                        rows.append(FoodItemCreate(
+                            name=item.get("name", "Unknown"),
+                            serving_size=nutrition.get("serving_size", "1 serving"),
+                            calories=int(facts["calories"]),
+                            **{name: facts[name] for name in NUTRIENTS if name != "calories"},
+                            location=location,
+                            date=entry["date"],
+                            meal_type=meal_type,
+                        ).model_dump())
+    return rows
+
+
+def nutrition_dicts(menus: dict):
+    """Every item's nutrition dict in a {hall: [{"date", "meals": {meal: {section: [items]}}}]} menu file"""
+    for day_menus in menus.values():
+        for day_menu in day_menus:
+            for sections in day_menu.get("meals", {}).values():
+                for items in sections.values():
+                    for item in items:
+                        yield item.get("nutrition", {})
+
+
+def timed(label: str, fn: Callable, repeat: int, clear_cache: bool = False) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if clear_cache:
+            nutrition_parsing._parse_string.cache_clear()
+        fn()
+    per_call = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<22} {per_call:8.2f} ms")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--menu", default="all_dining_halls_menus.json")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    menus = read_menu_file(args.menu)
+    items = list(nutrition_dicts(menus))
+    values = [item.get(field) for item in items for field in NUTRIENT_UNITS]
+    print(f"{len(items)} items, {len(values)} values, {len(set(values))} distinct strings")
+
+    print("Per-value parsing:")
+    legacy = timed("previous", lambda: [legacy_parse_nutrition_value(v) for v in values], args.repeat)
+    cold = timed("shared (cold cache)", lambda: [parse_nutrition_value(v) for v in values], args.repeat, clear_cache=True)
+    warm = timed("facts dict (warm)", lambda: [parse_nutrition_facts(item) for item in items], args.repeat)
+    print(f"  speedup (cold/facts)   {legacy / cold:8.2f}x / {legacy / warm:.2f}x")
+
+    print("Menu document -> food_items rows:")
+    previous = timed("validate + models", lambda: previous_menu_rows(menus), args.repeat)
+    single = timed("single pass", lambda: parse_menu_document(menus), args.repeat)
+    trusted = timed("single pass, trusted", lambda: parse_menu_document(menus, trusted=True), args.repeat)
+    print(f"  speedup (checked/trusted) {previous / single:5.2f}x / {previous / trusted:.2f}x")
+    assert previous_menu_rows(menus) == parse_menu_document(menus) == parse_menu_document(menus, trusted=True)
+
+    changed = {}
+    for item in items:
+        before, after = legacy_parse_facts(item), parse_nutrition_facts(item)
+        for field in NUTRIENT_UNITS:
+            if abs(before[field] - after[field]) > 1e-9:
+                changed[(field, item.get(field))] = (before[field], after[field])
+    print(f"Changed values: {len(changed)}")
+    for (field, raw), (before, after) in sorted(changed.items(), key=str)[:20]:
+        print(f"  {field:<16} {raw!r:<12} {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
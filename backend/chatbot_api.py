@@ -11,12 +11,15 @@ from pydantic_ai import Agent, RunContext
 from dataclasses import dataclass
 from datetime import datetime
 from contextlib import asynccontextmanager
+import math
 import os
 from dotenv import load_dotenv
 from typing import Optional, List
 from supabase import create_client, Client
 import httpx
 
+from nutrition_db import profile_from_row
+
 load_dotenv()
 
 # Initialize Supabase client
@@ -31,6 +34,7 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 # API Base URLs (configurable)
 NUTRITION_API_BASE = os.getenv("NUTRITION_API_BASE", "http://localhost:8000")
 ORDERS_API_BASE = os.getenv("ORDERS_API_BASE", "http://localhost:8000")
+MAX_SERVINGS_PER_ENTRY = 20  # Upper bound on servings of one meal entry in the nutrition API
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -93,6 +97,15 @@ async def get_chat_history(user_id: str, limit: int = 10) -> List[dict]:
         print(f"Error fetching chat history: {e}")
         return []
 
+def get_profile_row(user_id: str) -> Optional[dict]:
+    """Fetch the user's full profiles row (loaded once per chat turn)"""
+    try:
+        response = supabase.table("profiles").select("*").eq("id", user_id).limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        print(f"Error fetching user profile: {e}")
+        return None
+
 def get_current_date_formatted() -> str:
     """Get current date in the format used by food_items table"""
     # Format: "Fri November 08, 2025"
@@ -166,6 +179,7 @@ class ChatbotDeps:
     chat_history: List[dict]
     http_client: httpx.AsyncClient
     user_location: Optional[dict] = None  # {latitude: float, longitude: float}
+    profile: Optional[dict] = None  # Raw profiles row, fetched once per turn
 
 # Create the agent with Gemini
 agent = Agent(
@@ -268,7 +282,7 @@ IMPORTANT BEHAVIORS:
 - Remember conversation context to avoid repeating questions
 - If creating order fails due to missing info, ask for it specifically
 - Proactively offer insights from order history
-- Suggest tracking ordered food in nutrition log
+- Suggest tracking ordered food in nutrition log (log_order_to_nutrition logs a whole order at once)
 
 Order statuses: pending, preparing, ready, out_for_delivery, delivered, completed, cancelled
 Auto-calculated fields: total_calories, total_protein, total_carbs, total_fat"""
@@ -292,17 +306,11 @@ def add_current_date(ctx: RunContext[ChatbotDeps]) -> str:
         lon = ctx.deps.user_location.get('longitude')
         location_info = f"\n- User's current location: ({lat:.4f}, {lon:.4f}) - AUTOMATICALLY CAPTURED!"
 
-    # Fetch user profile proactively from Supabase
+    # User profile was loaded with the turn's dependencies
     profile_info = ""
     try:
-        profile_response = supabase.table("profiles")\
-            .select("dietary_preferences, goals, goal_calories, goal_protein")\
-            .eq("id", ctx.deps.user_id)\
-            .single()\
-            .execute()
-        
-        if profile_response.data:
-            profile = profile_response.data
+        if ctx.deps.profile:
+            profile = ctx.deps.profile
             dietary_prefs = profile.get('dietary_preferences', [])
             goals = profile.get('goals', '')
             goal_calories = profile.get('goal_calories')
@@ -859,48 +867,114 @@ async def search_nutrition_food_items(
 @agent.tool
 async def log_meal_to_nutrition(
     ctx: RunContext[ChatbotDeps],
-    food_item_id: int,
-    servings: float = 1.0,
+    food_item_ids: list[int],
+    servings: Optional[list[float]] = None,
     meal_category: str = "Lunch",
     entry_date: Optional[str] = None
 ) -> str:
-    """Log a meal to user's nutrition tracker.
+    """Log one or more foods to user's nutrition tracker in a single call.
 
     Args:
-        food_item_id: ID of food item from nutrition database
-        servings: Number of servings (default 1.0)
+        food_item_ids: IDs of food items from nutrition database (log a whole tray at once)
+        servings: Servings for each item (must match length of food_item_ids, default 1.0 each)
         meal_category: "Breakfast", "Lunch", or "Dinner"
         entry_date: Date (YYYY-MM-DD, defaults to today)
 
     Returns confirmation with nutritional totals.
     """
+    if not food_item_ids:
+        return "Error: Provide at least one food item ID."
+    servings = servings or [1.0] * len(food_item_ids)
+    if len(servings) != len(food_item_ids):
+        return "Error: Number of items and servings must match."
+
+    return await _log_meal_batch(
+        ctx,
+        [{"food_item_id": food_id, "servings": amount} for food_id, amount in zip(food_item_ids, servings)],
+        meal_category,
+        entry_date
+    )
+
+@agent.tool
+async def log_order_to_nutrition(
+    ctx: RunContext[ChatbotDeps],
+    order_id: str,
+    meal_category: str = "Lunch",
+    entry_date: Optional[str] = None
+) -> str:
+    """Log every item of one of the user's orders to their nutrition tracker.
+
+    Args:
+        order_id: The UUID of the order (can use shortened version like first 8 characters)
+        meal_category: "Breakfast", "Lunch", or "Dinner"
+        entry_date: Date (YYYY-MM-DD, defaults to today)
+
+    Each order item is logged with servings equal to its quantity, split over several
+    entries when it exceeds MAX_SERVINGS_PER_ENTRY.
+    """
+    try:
+        orders = supabase.table("orders").select("id").eq("user_id", ctx.deps.user_id).execute()
+        matching = [o['id'] for o in orders.data if o['id'].startswith(order_id)]
+        if not matching:
+            return f"Order {order_id[:8]} not found."
+
+        items_response = supabase.table("order_items")\
+            .select("food_item_id, quantity")\
+            .eq("order_id", matching[0])\
+            .execute()
+        if not items_response.data:
+            return f"Order {order_id[:8]} has no items to log."
+    except Exception as e:
+        return f"Error fetching order: {str(e)}"
+
+    return await _log_meal_batch(
+        ctx,
+        [entry for item in items_response.data for entry in _servings_entries(item["food_item_id"], item["quantity"])],
+        meal_category,
+        entry_date
+    )
+
+def _servings_entries(food_item_id: int, servings: float) -> List[dict]:
+    """Batch items for `servings` of one food item, split evenly so none exceeds MAX_SERVINGS_PER_ENTRY"""
+    count = max(1, math.ceil(servings / MAX_SERVINGS_PER_ENTRY))
+    return [{"food_item_id": food_item_id, "servings": servings / count} for _ in range(count)]
+
+async def _log_meal_batch(
+    ctx: RunContext[ChatbotDeps],
+    items: List[dict],
+    meal_category: str,
+    entry_date: Optional[str]
+) -> str:
+    """Post items to the batch meal logging endpoint and summarize the result"""
     try:
         payload = {
             "profile_id": ctx.deps.user_id,
-            "food_item_id": food_item_id,
-            "servings": servings,
-            "meal_category": meal_category
+            "meal_category": meal_category,
+            "items": items
         }
         if entry_date:
             payload["entry_date"] = entry_date
 
         response = await ctx.deps.http_client.post(
-            f"{NUTRITION_API_BASE}/api/nutrition/meals",
+            f"{NUTRITION_API_BASE}/api/nutrition/meals:batch",
             json=payload,
             timeout=10.0
         )
         if response.status_code == 201:
-            meal = response.json()
+            meals = response.json()
             # MealEntryResponse has food details at top level, not nested
-            total_cals = (meal.get('calories', 0) or 0) * servings
-            total_protein = (meal.get('protein', 0) or 0) * servings
-            total_carbs = (meal.get('total_carb', 0) or 0) * servings
-            total_fat = (meal.get('total_fat', 0) or 0) * servings
+            total_cals = sum((m.get('calories') or 0) * m['servings'] for m in meals)
+            total_protein = sum((m.get('protein') or 0) * m['servings'] for m in meals)
+            total_carbs = sum((m.get('total_carb') or 0) * m['servings'] for m in meals)
+            total_fat = sum((m.get('total_fat') or 0) * m['servings'] for m in meals)
+            entries = "\n".join(
+                f"- {m.get('food_name', 'Unknown')} x{m['servings']:g}" for m in meals
+            )
 
             return f"""Meal logged successfully!
 
-Entry: {meal.get('food_name', 'Unknown')}
-Servings: {servings}
+Entries ({len(meals)}):
+{entries}
 Category: {meal_category}
 
 Nutritional Impact:
@@ -1000,12 +1074,10 @@ async def get_user_nutrition_profile(ctx: RunContext[ChatbotDeps]) -> str:
     Returns profile with BMR, TDEE, dietary preferences, and nutrition goals.
     """
     try:
-        response = await ctx.deps.http_client.get(
-            f"{NUTRITION_API_BASE}/api/nutrition/profiles/{ctx.deps.user_id}",
-            timeout=10.0
-        )
-        if response.status_code == 200:
-            profile = response.json()
+        # Served from the row loaded for this turn; BMR/TDEE are computed the same
+        # way as GET /api/nutrition/profiles/{user_id}
+        if ctx.deps.profile:
+            profile = {**ctx.deps.profile, **profile_from_row(ctx.deps.profile).model_dump()}
 
             # Convert cm to inches and kg to lbs for display
             height_cm = profile.get('height_cm')
@@ -1016,7 +1088,7 @@ async def get_user_nutrition_profile(ctx: RunContext[ChatbotDeps]) -> str:
             result = f"""Nutrition Profile:
 
 Basic Info:
-- Name: {profile.get('full_name', 'Not set')}
+- Name: {profile.get('full_name') or 'Not set'}
 - Age: {profile.get('age', 'Not set')}
 - Sex: {profile.get('sex', 'Not set')}
 - Height: {height_display}
@@ -1028,19 +1100,17 @@ Metabolic Rates:
 - Activity Level: {profile.get('activity_level', 'Not set')}/5
 
 Daily Goals:
-- Calories: {profile.get('goal_calories', 'Not set')} kcal
-- Protein: {profile.get('goal_protein', 'Not set')}g
-- Carbs: {profile.get('goal_carbs', 'Not set')}g
-- Fat: {profile.get('goal_fat', 'Not set')}g
+- Calories: {profile.get('goal_calories') or 'Not set'} kcal
+- Protein: {profile.get('goal_protein') or 'Not set'}g
+- Carbs: {profile.get('goal_carbs') or 'Not set'}g
+- Fat: {profile.get('goal_fat') or 'Not set'}g
 
-Dietary Preferences: {', '.join(profile.get('dietary_preferences', [])) or 'None set'}
-Goals: {profile.get('goals', 'Not set')}"""
+Dietary Preferences: {', '.join(profile.get('dietary_preferences') or []) or 'None set'}
+Goals: {profile.get('goals') or 'Not set'}"""
 
             return result
-        elif response.status_code == 404:
-            return "No nutrition profile found. User needs to complete onboarding."
         else:
-            return f"Error fetching profile: {response.status_code}"
+            return "No nutrition profile found. User needs to complete onboarding."
     except Exception as e:
         return f"Error getting nutrition profile: {str(e)}"
 
@@ -1097,6 +1167,8 @@ async def update_nutrition_profile(
         )
         if response.status_code == 200:
             profile = response.json()
+            # Refresh the turn's copy so later tool calls see the new values
+            ctx.deps.profile = get_profile_row(ctx.deps.user_id)
             return f"""Profile updated successfully!
 
 Updated metrics:
@@ -1384,7 +1456,8 @@ async def chat(request: ChatRequest):
                 user_id=request.user_id,
                 chat_history=chat_history,
                 http_client=http_client,
-                user_location=user_location_dict
+                user_location=user_location_dict,
+                profile=get_profile_row(request.user_id)
             )
 
             result = await agent.run(request.message, deps=deps)
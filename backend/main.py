@@ -13,6 +13,7 @@ load_dotenv()
 # Import the individual API apps
 from orders_api import app as orders_app
 from nutrition_api import app as nutrition_app
+from compression import CompressionMiddleware
 
 # Create main app
 app = FastAPI(
@@ -28,8 +29,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# gzip/brotli for JSON responses (menus compress ~10x)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 
 @app.get("/")
 async def root():
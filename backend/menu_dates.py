@@ -0,0 +1,108 @@
+"""
+Menu Dates
+Incremental scraping: only dates that are not in the database yet (or are due for a refresh)
+The dates already loaded per hall come from the menu_dates view (distinct
+location/date of food_items); dates within SCRAPER_REFRESH_DAYS of today are
+scraped again anyway, since the site keeps editing menus until they are served
+Standard library only (plus a supabase client passed in), so the Lambda image can copy it as-is
+"""
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MENU_DATE_FORMAT = "%a %B %d, %Y"
+REFRESH_DAYS = int(os.getenv("SCRAPER_REFRESH_DAYS", "2"))
+DATES_PAGE_SIZE = 1000  # PostgREST's default max rows per request
+
+
+def menu_date(date_text: str) -> Optional[date]:
+    """The day a dropdown/stored date ("Fri November 07, 2025" or "2025-11-07") stands for"""
+    for fmt in (MENU_DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_text.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def fetch_loaded_dates(client, halls: Iterable[str]) -> Dict[str, Set[str]]:
+    """{hall: {date}} already in food_items for `halls`, from the menu_dates view"""
+    halls = sorted(halls)
+    loaded: Dict[str, Set[str]] = {hall: set() for hall in halls}
+    offset = 0
+    while True:
+        response = client.table("menu_dates").select("location, date").in_(
+            "location", halls
+        ).order("location").order("date").range(offset, offset + DATES_PAGE_SIZE - 1).execute()
+        for row in response.data:
+            loaded.setdefault(row["location"], set()).add(row["date"])
+        if len(response.data) < DATES_PAGE_SIZE:
+            break
+        offset += DATES_PAGE_SIZE
+    return loaded
+
+
+class ScrapePlan:
+    """
+    Which of a hall's dropdown dates to scrape, given the dates already loaded
+
+    A date is scraped when it is not loaded for that hall, falls within
+    `refresh_days` of `today` (today and the next days; dates whose text cannot
+    be read count as stale) or is listed in `refresh_dates`. Pass the plan's
+    select() to the scrapers as select_dates.
+    """
+
+    def __init__(
+        self,
+        loaded: Dict[str, Set[str]],
+        refresh_days: int = REFRESH_DAYS,
+        refresh_dates: Iterable[str] = (),
+        today: Optional[date] = None,
+    ):
+        self.loaded = loaded
+        self.refresh_days = refresh_days
+        self.refresh_dates = {menu_date(text) or text for text in refresh_dates}
+        self.today = today or date.today()
+        self.scraped: Dict[str, int] = {}
+        self.skipped: Dict[str, List[str]] = {}  # hall -> date texts left out
+
+    def is_stale(self, date_text: str) -> bool:
+        day = menu_date(date_text)
+        if day is None or day in self.refresh_dates or date_text in self.refresh_dates:
+            return True
+        return 0 <= (day - self.today).days < self.refresh_days
+
+    def select(self, hall: str, dates: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """The (date_value, date_text) pairs of `dates` still to scrape for `hall`"""
+        loaded = self.loaded.get(hall, set())
+        selected, skipped = [], []
+        for value, text in dates:
+            if text not in loaded or self.is_stale(text):
+                selected.append((value, text))
+            else:
+                skipped.append(text)
+        self.scraped[hall] = len(selected)
+        self.skipped[hall] = skipped
+        return selected
+
+    def summary(self) -> str:
+        return (f"{sum(self.scraped.values())} dates to scrape, "
+                f"{sum(len(dates) for dates in self.skipped.values())} already loaded and skipped")
+
+
+def load_scrape_plan(
+    client,
+    halls: Iterable[str],
+    refresh_days: int = REFRESH_DAYS,
+    refresh_dates: Iterable[str] = (),
+) -> Optional[ScrapePlan]:
+    """
+    A ScrapePlan from the dates loaded for `halls`, or None (scrape everything)
+    when they cannot be read, e.g. before the menu_dates migration is applied
+    """
+    try:
+        loaded = fetch_loaded_dates(client, halls)
+    except Exception as e:
+        print(f"[INCREMENTAL] Could not read loaded dates, scraping every date: {e}")
+        return None
+    return ScrapePlan(loaded, refresh_days, refresh_dates)
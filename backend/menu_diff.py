@@ -0,0 +1,164 @@
+"""
+Menu Diff
+Content-hash diffing for food_items ingest
+Only new or changed rows are written and rows that disappeared from a menu are deleted,
+instead of re-upserting every item of every scraped date
+Standard library only (plus a supabase client passed in), so the Lambda image can copy it as-is
+"""
+import hashlib
+import json
+from typing import Dict, Iterable, List, Tuple
+
+# food_items upsert conflict key
+KEY_FIELDS = ("name", "location", "date", "meal_type")
+
+# Fields covered by content_hash: the item name and everything the menu says about it
+HASHED_FIELDS = (
+    "name",
+    "serving_size",
+    "calories",
+    "total_fat",
+    "sodium",
+    "total_carb",
+    "dietary_fiber",
+    "sugars",
+    "protein",
+)
+
+STORED_PAGE_SIZE = 1000  # PostgREST's default max rows per request
+WRITE_BATCH_SIZE = 500
+DELETE_BATCH_SIZE = 200  # Ids per delete_unreferenced_food_items call
+
+_FOREIGN_KEY_VIOLATION = "23503"
+
+
+def content_hash(row: Dict) -> str:
+    """Stable hash of a food item's name and nutrition fields"""
+    values = []
+    for field in HASHED_FIELDS:
+        value = row.get(field)
+        values.append(float(value) if isinstance(value, (int, float)) else value)
+    payload = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def food_item_key(row: Dict) -> Tuple:
+    return tuple(row.get(field) for field in KEY_FIELDS)
+
+
+def _menu_key(row: Dict) -> Tuple:
+    """A menu is one meal at one location on one date; removals are scoped to the menus being ingested"""
+    return (row.get("location"), row.get("date"), row.get("meal_type"))
+
+
+def diff_food_items(rows: Iterable[Dict], stored: Iterable[Dict]) -> Dict[str, List]:
+    """
+    Compare incoming food_items rows with the stored rows of the same menus
+
+    `stored` rows need id, the key fields and content_hash. Incoming rows sharing a
+    key are collapsed (last one wins). Stored rows without a hash (ingested before
+    hashing) count as changed. Stored rows of an ingested menu that are no longer on
+    it are returned for deletion; other menus are left alone.
+
+    Returns {"inserted": [rows], "changed": [rows], "unchanged": [rows], "removed_ids": [ids]},
+    with content_hash set on every incoming row.
+    """
+    incoming: Dict[Tuple, Dict] = {}
+    for row in rows:
+        incoming[food_item_key(row)] = {**row, "content_hash": content_hash(row)}
+    menus = {_menu_key(row) for row in incoming.values()}
+
+    stored_by_key: Dict[Tuple, Dict] = {}
+    removed_ids = []
+    for row in stored:
+        if _menu_key(row) not in menus:
+            continue
+        key = food_item_key(row)
+        if key in incoming:
+            stored_by_key[key] = row
+        else:
+            removed_ids.append(row["id"])
+
+    diff = {"inserted": [], "changed": [], "unchanged": [], "removed_ids": removed_ids}
+    for key, row in incoming.items():
+        existing = stored_by_key.get(key)
+        if existing is None:
+            diff["inserted"].append(row)
+        elif existing.get("content_hash") != row["content_hash"]:
+            diff["changed"].append(row)
+        else:
+            diff["unchanged"].append(row)
+    return diff
+
+
+def fetch_stored_food_items(client, rows: Iterable[Dict]) -> List[Dict]:
+    """Id, key and content_hash of every stored food item at the locations/dates of `rows`"""
+    locations = sorted({row.get("location") for row in rows if row.get("location") is not None})
+    dates = sorted({row.get("date") for row in rows if row.get("date") is not None})
+    if not locations or not dates:
+        return []
+
+    stored = []
+    offset = 0
+    while True:
+        response = client.table("food_items").select(
+            "id, " + ", ".join(KEY_FIELDS) + ", content_hash"
+        ).in_("location", locations).in_("date", dates).order("id").range(
+            offset, offset + STORED_PAGE_SIZE - 1
+        ).execute()
+        stored.extend(response.data)
+        if len(response.data) < STORED_PAGE_SIZE:
+            break
+        offset += STORED_PAGE_SIZE
+    return stored
+
+
+def sync_food_items(client, rows: List[Dict]) -> Dict[str, int]:
+    """
+    Diff `rows` against food_items and write only the difference
+
+    New and changed rows are upserted on the (name, location, date, meal_type) key,
+    rows removed from an ingested menu are deleted unless a meal entry, order item
+    or meal template references them. Unchanged rows cost nothing, so re-ingesting an identical menu issues no
+    writes at all (and does not bump the menu version). Returns {"inserted", "updated", "unchanged", "deleted"} counts.
+    """
+    rows = list(rows)
+    diff = diff_food_items(rows, fetch_stored_food_items(client, rows))
+
+    writes = diff["inserted"] + diff["changed"]
+    for i in range(0, len(writes), WRITE_BATCH_SIZE):
+        client.table("food_items").upsert(
+            writes[i:i + WRITE_BATCH_SIZE],
+            on_conflict=",".join(KEY_FIELDS)
+        ).execute()
+
+    removed_ids = []
+    for i in range(0, len(diff["removed_ids"]), DELETE_BATCH_SIZE):
+        batch = diff["removed_ids"][i:i + DELETE_BATCH_SIZE]
+        # Items someone logged, ordered or saved stay, so those rows keep the food details.
+        # The function checks and deletes in one statement; a meal logged concurrently can
+        # still trip the foreign key, and then this batch waits for the next ingest.
+        try:
+            deleted = client.rpc("delete_unreferenced_food_items", {"ids": batch}).execute()
+        except Exception as e:
+            if getattr(e, "code", None) != _FOREIGN_KEY_VIOLATION:
+                raise
+            continue
+        removed_ids.extend(deleted.data or [])
+
+    return {
+        "inserted": len(diff["inserted"]),
+        "updated": len(diff["changed"]),
+        "unchanged": len(diff["unchanged"]),
+        "deleted": len(removed_ids),
+    }
+
+
+def empty_summary() -> Dict[str, int]:
+    return {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+
+
+def add_summary(total: Dict[str, int], summary: Dict[str, int]) -> Dict[str, int]:
+    for name, count in summary.items():
+        total[name] = total.get(name, 0) + count
+    return total
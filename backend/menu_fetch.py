@@ -0,0 +1,260 @@
+"""
+Menu Fetch
+Browserless scraping of the FoodPro menus over plain HTTP (httpx)
+The hall page's date dropdown is read from its static HTML and each date's menu is
+requested from the same AJAX endpoint the dropdown calls, over one pooled client
+With a ParsePool (menu_html), each page is parsed in a worker as soon as it arrives
+Playwright (scrape_pool) is only used for halls this cannot handle
+Used by both the backend scraper and the Lambda (scraper_utils)
+"""
+import asyncio
+import html
+import json
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+
+from menu_replay import DEFAULT_REPLAY_DIR, get_recorder, replay_halls
+from scrape_pool import DEFAULT_MAX_PER_HOST, HostLimiter, OnMenu, SelectDates, timed
+
+FETCH_MODES = ("auto", "http", "browser", "replay")
+DEFAULT_FETCH_MODE = os.getenv("SCRAPER_FETCH_MODE", "auto")
+
+FOODPRO_AJAX_PATH = "/foodpro-menu-ajax"
+REQUEST_TIMEOUT = 20.0
+USER_AGENT = "Mozilla/5.0 (compatible; StudentEatsMenuScraper/1.0)"
+
+# Where the FoodPro location id (tid) shows up in a hall page, most specific first
+_TID_PATTERNS = (
+    re.compile(r"foodpro-menu-ajax\?tid=(\d+)"),
+    re.compile(r"""data-tid=["'](\d+)["']"""),
+    re.compile(r""""tid"\s*:\s*"?(\d+)"""),
+)
+_SELECT_RE = re.compile(r"<select[^>]*id=[\"']upcoming-foodpro[\"'][^>]*>(.*?)</select>", re.S | re.I)
+_OPTION_RE = re.compile(r"<option[^>]*value=[\"']([^\"']*)[\"'][^>]*>(.*?)</option>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# parse_html(html_content, date_text, hall_name) -> menu dict
+ParseHtml = Callable[[str, str, str], Dict]
+
+
+class FetchError(Exception):
+    """The direct endpoint could not serve a hall or date"""
+
+
+def discover_tid(page_html: str) -> Optional[str]:
+    for pattern in _TID_PATTERNS:
+        match = pattern.search(page_html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_date_options(page_html: str) -> List[Tuple[str, str]]:
+    """(value, text) of every option in the #upcoming-foodpro dropdown"""
+    select = _SELECT_RE.search(page_html)
+    if not select:
+        return []
+    return [
+        (html.unescape(value), html.unescape(_TAG_RE.sub("", text)).strip())
+        for value, text in _OPTION_RE.findall(select.group(1))
+    ]
+
+
+def menu_html_from_ajax(payload: Dict) -> str:
+    """
+    Rebuild the menu markup the dropdown renders from the AJAX response
+
+    The endpoint returns {meal: {category: "<li class='lightbox-nutrition'>...</li>..."}};
+    wrapping it in the page's meal/category elements lets the regular HTML parser read it.
+    """
+    parts = []
+    for meal, categories in payload.items():
+        if not isinstance(categories, dict):
+            continue
+        meal_id = html.escape(re.sub(r"\W+", "_", meal.lower()))
+        parts.append(f'<div id="{meal_id}_menu"><h2>{html.escape(meal.title())}</h2><div id="content_text">')
+        for category, items_html in categories.items():
+            parts.append(f'<h2 class="menu_category_name">{html.escape(category)}</h2>{items_html}')
+        parts.append("</div></div>")
+    return "".join(parts)
+
+
+def create_http_client(max_per_host: int = DEFAULT_MAX_PER_HOST) -> httpx.AsyncClient:
+    """One pooled (keep-alive) client for a whole scrape"""
+    return httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=max_per_host, max_keepalive_connections=max_per_host),
+    )
+
+
+async def fetch_hall_dates(client: httpx.AsyncClient, hall_url: str, limiter: HostLimiter) -> Tuple[str, List[Tuple[str, str]]]:
+    """Read a hall page and return (tid, [(date_value, date_text)])"""
+    async with limiter.slot(hall_url):
+        response = await client.get(hall_url)
+    response.raise_for_status()
+
+    tid = discover_tid(response.text)
+    dates = parse_date_options(response.text)
+    if not tid or not dates:
+        raise FetchError(f"no FoodPro location id or dates on {hall_url}")
+    return tid, dates
+
+
+async def fetch_menu_html(
+    client: httpx.AsyncClient,
+    hall_url: str,
+    tid: str,
+    date_value: str,
+    limiter: HostLimiter,
+) -> str:
+    """Fetch one date's menu from the AJAX endpoint and return it as menu HTML"""
+    url = urljoin(hall_url, FOODPRO_AJAX_PATH)
+    async with limiter.slot(url):
+        response = await client.get(
+            url,
+            params={"tid": tid, "date": date_value},
+            headers={"X-Requested-With": "XMLHttpRequest", "Referer": hall_url},
+        )
+    response.raise_for_status()
+
+    try:
+        payload = response.json()
+    except json.JSONDecodeError:
+        raise FetchError(f"menu endpoint did not return JSON for {date_value}")
+    if not isinstance(payload, dict):
+        raise FetchError(f"unexpected menu payload for {date_value}")
+    # A reply in some other shape would parse to an empty menu; let the browser read it instead
+    if not any(isinstance(categories, dict) and categories for categories in payload.values()):
+        raise FetchError(f"no meals or categories in the menu payload for {date_value}")
+    return menu_html_from_ajax(payload)
+
+
+async def fetch_halls(
+    halls: Dict[str, str],
+    parse_html: ParseHtml,
+    limiter: Optional[HostLimiter] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    select_dates: Optional[SelectDates] = None,
+    on_menu: Optional[OnMenu] = None,
+    parse_pool=None,
+) -> Tuple[Dict[str, List[Dict]], List[str]]:
+    """
+    Scrape every hall over HTTP, all dates concurrently (bounded by the limiter)
+
+    Returns (menus by hall, halls that failed). A hall fails as a whole when its
+    page or any of its dates cannot be fetched or parsed, or a date's reply has
+    no meals, so the fallback re-scrapes it completely and no hall ends up with
+    a partial week. With select_dates, only
+    the dates it returns for a hall are fetched. on_menu gets a hall's menus once
+    all of its dates have been fetched (never for a hall that failed).
+    With a parse_pool (menu_html.ParsePool), each date is parsed in the pool as
+    soon as it is fetched, while the other requests are still in flight, and
+    request times are recorded as "fetch" on its timeline.
+    """
+    limiter = limiter or HostLimiter()
+    own_client = client is None
+    client = client or create_http_client(limiter.max_per_host)
+    timeline = parse_pool.timeline if parse_pool is not None else None
+
+    async def fetch_date(hall_name: str, hall_url: str, tid: str, date_value: str, date_text: str):
+        with timed(timeline, "fetch"):
+            page_html = await fetch_menu_html(client, hall_url, tid, date_value, limiter)
+        menu = None
+        if parse_pool is not None:
+            menu = await parse_pool.parse(parse_html, page_html, date_text, hall_name)
+        return page_html, menu
+
+    async def scrape_hall(hall_name: str, hall_url: str) -> Optional[List[Dict]]:
+        try:
+            tid, dates = await fetch_hall_dates(client, hall_url, limiter)
+            recorder = get_recorder()
+            if recorder is not None:
+                recorder.record_dates(hall_name, dates)
+            if select_dates is not None:
+                dates = select_dates(hall_name, dates)
+            pages = await asyncio.gather(*(
+                fetch_date(hall_name, hall_url, tid, value, text) for value, text in dates
+            ))
+            if recorder is not None:
+                for (page_html, _), (_, text) in zip(pages, dates):
+                    recorder.record_menu(hall_name, text, page_html)
+            menus = [
+                menu if parse_pool is not None else parse_html(page_html, text, hall_name)
+                for (page_html, menu), (_, text) in zip(pages, dates)
+            ]
+        except Exception as e:
+            # Whatever went wrong (request, payload or parsing), the browser gets this hall
+            print(f"[HTTP] {hall_name}: {type(e).__name__}: {e}")
+            return None
+        # Outside the try, so a failing consumer stops the scrape instead of triggering the fallback
+        if on_menu is not None:
+            for menu in menus:
+                if menu:
+                    await on_menu(hall_name, menu)
+        return menus
+
+    try:
+        names = list(halls)
+        results = await asyncio.gather(*(scrape_hall(name, halls[name]) for name in names))
+    finally:
+        if own_client:
+            await client.aclose()
+
+    menus = {name: result for name, result in zip(names, results) if result is not None}
+    failed = [name for name, result in zip(names, results) if result is None]
+    return menus, failed
+
+
+async def scrape_with_fallback(
+    halls: Dict[str, str],
+    parse_html: ParseHtml,
+    browser_scrape: Callable[[Dict[str, str]], Awaitable[Dict[str, List[Dict]]]],
+    mode: str = DEFAULT_FETCH_MODE,
+    limiter: Optional[HostLimiter] = None,
+    select_dates: Optional[SelectDates] = None,
+    on_menu: Optional[OnMenu] = None,
+    parse_pool=None,
+) -> Dict[str, List[Dict]]:
+    """
+    Scrape halls over HTTP and fall back to the browser for whatever failed
+
+    mode="auto" (default) tries HTTP first, "http" never starts a browser and
+    "browser" skips HTTP. `browser_scrape(halls)` is the Playwright scraper for a
+    subset of halls; it is only called (and Chromium only launched) when needed.
+    "replay" reads a recorded scrape (SCRAPER_REPLAY_DIR) and makes no requests.
+    select_dates (see menu_dates) limits the HTTP and replay paths to the dates
+    still needed; browser_scrape must apply the same filter itself, and likewise
+    call on_menu for every menu it scrapes. parse_pool (menu_html.ParsePool)
+    moves HTTP page parsing off the event loop; replay parses inline.
+    """
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode: {mode}. Use one of: {', '.join(FETCH_MODES)}")
+    if mode == "replay":
+        menus = replay_halls(halls, parse_html, DEFAULT_REPLAY_DIR, select_dates)
+        if on_menu is not None:
+            for name, entries in menus.items():
+                for menu in entries:
+                    await on_menu(name, menu)
+        return menus
+    if mode == "browser":
+        return await browser_scrape(halls)
+
+    started = time.perf_counter()
+    menus, failed = await fetch_halls(
+        halls, parse_html, limiter, select_dates=select_dates, on_menu=on_menu, parse_pool=parse_pool
+    )
+    print(f"[HTTP] Scraped {len(menus)}/{len(halls)} halls in {time.perf_counter() - started:.1f}s")
+
+    if failed and mode == "auto":
+        print(f"[HTTP] Falling back to the browser for: {', '.join(failed)}")
+        menus.update(await browser_scrape({name: halls[name] for name in failed}))
+
+    # Keep the configured hall order
+    return {name: menus[name] for name in halls if name in menus}
@@ -0,0 +1,132 @@
+"""
+Menu Files
+The scraper's menu output: NDJSON, one compact {"hall", "date", "location", "meals"}
+menu per line, written as each menu is scraped instead of once at the end
+A .zst (or .gz) suffix compresses the stream; a .json suffix still writes the nested
+{hall: [entries]} document. read_menu_file reads any of them back (as do the
+upload endpoints and reload_menus.py)
+"""
+import gzip
+import json
+import os
+from typing import Dict, List, Optional
+
+from menu_ingest import SNIFF_CHARS, MenuStreamParser, StreamDecompressor, detect_compression, detect_menu_format
+
+DEFAULT_MENU_FILE = os.getenv("MENU_OUTPUT_FILE", "all_dining_halls_menus.ndjson")
+LEGACY_MENU_FILE = "all_dining_halls_menus.json"  # What scraper.py wrote before the NDJSON output
+ZSTD_LEVEL = 10
+
+
+def file_compression(path: str) -> Optional[str]:
+    """Compression a menu file gets from its suffix (.zst/.zstd or .gz/.gzip)"""
+    name = path.lower()
+    if name.endswith((".zst", ".zstd")):
+        return "zstd"
+    if name.endswith((".gz", ".gzip")):
+        return "gzip"
+    return None
+
+
+def menu_line(hall: str, menu: Dict) -> bytes:
+    """One NDJSON line: the menu entry with its hall first"""
+    return (json.dumps({"hall": hall, **menu}, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class MenuFileWriter:
+    """
+    Streams menus to `path` as they are scraped
+
+    write(hall, menu) appends one line; put is the same as an async on_menu hook
+    for the scrapers. Output goes to `path`.tmp, which replaces `path` on close(),
+    so a scrape that fails or finds nothing leaves the previous file in place
+    (merge_skipped_menus reads it while the new one is being written). A .json
+    path cannot be streamed: its menus are collected and written on close().
+    Used as a context manager, the file is closed on success and discarded on error.
+    """
+
+    def __init__(self, path: str = DEFAULT_MENU_FILE):
+        self.path = path
+        self.fmt = detect_menu_format(path)
+        self.compression = file_compression(path)
+        self.menus = 0
+        self.saved: Optional[bool] = None
+        self._document: Dict[str, List[Dict]] = {}
+        self._tmp = f"{path}.tmp"
+        self._raw = open(self._tmp, "wb")
+        self._out = self._raw
+        if self.compression == "zstd":
+            import zstandard
+            self._out = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._raw)
+        elif self.compression == "gzip":
+            self._out = gzip.GzipFile(fileobj=self._raw, mode="wb")
+
+    def write(self, hall: str, menu: Dict) -> None:
+        if self.fmt == "json":
+            self._document.setdefault(hall, []).append(menu)
+        else:
+            self._out.write(menu_line(hall, menu))
+        self.menus += 1
+
+    async def put(self, hall: str, menu: Dict) -> None:
+        self.write(hall, menu)
+
+    def write_menus(self, menus: Dict[str, List[Dict]]) -> None:
+        for hall, entries in menus.items():
+            for menu in entries:
+                self.write(hall, menu)
+
+    def _close_streams(self) -> None:
+        if not self._out.closed:
+            self._out.close()
+        if not self._raw.closed:
+            self._raw.close()
+
+    def close(self) -> bool:
+        """Finish the file and move it into place; False (previous file kept) if nothing was written"""
+        if self.saved is not None:
+            return self.saved
+        if self.fmt == "json":
+            self._out.write(json.dumps(self._document, indent=2, ensure_ascii=False).encode("utf-8"))
+        self._close_streams()
+        if self.menus:
+            os.replace(self._tmp, self.path)
+        else:
+            os.remove(self._tmp)
+        self.saved = bool(self.menus)
+        return self.saved
+
+    def abort(self) -> None:
+        """Discard what was written and keep the previous file"""
+        self._close_streams()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+        self.saved = False
+
+    def __enter__(self) -> "MenuFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_menus(data: bytes, filename: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """
+    {hall: [entries]} from menu file contents: the JSON document or NDJSON, optionally
+    gzip/zstd compressed (told apart by the magic bytes, `filename` and the data itself)
+    """
+    decompressor = StreamDecompressor(detect_compression(data[:4]))
+    data = decompressor.decompress(data) + decompressor.flush()
+    parser = MenuStreamParser(detect_menu_format(filename, head=data[:SNIFF_CHARS].decode("utf-8", "ignore")))
+    menus: Dict[str, List[Dict]] = {}
+    for hall, entry in parser.feed(data) + parser.close():
+        menus.setdefault(hall, []).append(entry)
+    return menus
+
+
+def read_menu_file(path: str) -> Dict[str, List[Dict]]:
+    with open(path, "rb") as f:
+        return read_menus(f.read(), path)
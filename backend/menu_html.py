@@ -0,0 +1,611 @@
+"""
+Menu HTML
+Single-pass parser for FoodPro menu pages
+One state machine consumes start/end/text events, driven by lxml's parser target
+interface when lxml is installed or by the standard library's HTMLParser otherwise,
+so no document tree is built and no element is visited twice
+DOM_EXTRACT_SCRIPT does the same walk inside the browser (extract_menu), so a
+Playwright scrape only ships the menu back instead of the serialized page
+HTML that is parsed here can go to a ParsePool, off the event loop, so page and
+network I/O keep going while a page is parsed
+Used by both the backend scraper and the Lambda (scraper_utils)
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from html.parser import HTMLParser
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from menu_replay import get_recorder
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the standard library parser gives the same results
+    etree = None
+
+PARSER_BACKENDS = ("lxml", "html.parser")
+DEFAULT_BACKEND = "lxml" if etree is not None else "html.parser"
+
+# How a scraper reads a loaded menu page: "dom" extracts it inside the browser,
+# "html" serializes the page and parses it here, "compare" does both and reports differences
+EXTRACT_MODES = ("dom", "html", "compare")
+DEFAULT_EXTRACT_MODE = os.getenv("SCRAPER_EXTRACT_MODE", "dom")
+
+# Where HTML is parsed: "process" or "thread" workers, or "inline" on the event loop (see ParsePool)
+PARSE_EXECUTORS = ("inline", "thread", "process")
+
+
+def default_parse_executor() -> str:
+    """
+    SCRAPER_PARSE_EXECUTOR, else "process", except on AWS Lambda, which has no
+    /dev/shm for a process pool and gets "thread"
+    """
+    return os.getenv("SCRAPER_PARSE_EXECUTOR") or ("thread" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "process")
+
+
+def default_parse_workers() -> int:
+    return int(os.getenv("SCRAPER_PARSE_WORKERS") or "2")
+
+# Output field -> data-* attribute on the item link
+NUTRITION_ATTRS = {
+    "calories": "data-calories",
+    "calories_from_fat": "data-calories-from-fat",
+    "total_fat": "data-total-fat",
+    "sat_fat": "data-sat-fat",
+    "trans_fat": "data-trans-fat",
+    "cholesterol": "data-cholesterol",
+    "sodium": "data-sodium",
+    "total_carb": "data-total-carb",
+    "dietary_fiber": "data-dietary-fiber",
+    "sugars": "data-sugars",
+    "protein": "data-protein",
+    "serving_size": "data-serving-size",
+}
+DETAIL_ATTRS = {
+    "allergens": "data-allergens",
+    "diet": "data-clean-diet-str",
+    "carbon_rating": "data-carbon-list",
+    "healthfulness": "data-healthfulness",
+    "ingredients": "data-ingredient-list",
+}
+
+# Attributes DOM_EXTRACT_SCRIPT reads from each item link, in this order
+EXTRACT_ATTRS = tuple(NUTRITION_ATTRS.values()) + tuple(DETAIL_ATTRS.values())
+
+# page.evaluate(MENU_MARKUP_SCRIPT) -> the location header and meal divs as standalone HTML,
+# what a recording (menu_replay) keeps of a browser-scraped page
+MENU_MARKUP_SCRIPT = """() => {
+    const header = document.querySelector('.singlepage-content-padding h1');
+    let markup = header ? header.outerHTML : '';
+    for (const mealDiv of document.querySelectorAll('div[id*="_menu"]')) markup += mealDiv.outerHTML;
+    return '<div class="singlepage-content-padding">' + markup + '</div>';
+}"""
+
+# Runs in the page (page.evaluate(DOM_EXTRACT_SCRIPT, {"attrs": list(EXTRACT_ATTRS)}))
+# and walks the live DOM the same way the HTML parser walks markup, returning only the menu as JSON:
+# {"location": str|null, "meals": [[meal, [[category, [[name, [attr values]]]]]]]}
+DOM_EXTRACT_SCRIPT = """({attrs}) => {
+    const text = (el) => {
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        const parts = [];
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            const part = node.nodeValue.trim();
+            if (part) parts.push(part);
+        }
+        return parts.join('');
+    };
+    const isCategory = (el) => el.tagName === 'H2' && el.classList.contains('menu_category_name');
+
+    const header = document.querySelector('.singlepage-content-padding h1');
+    const meals = [];
+    for (const mealDiv of document.querySelectorAll('div[id*="_menu"]')) {
+        const mealHeader = mealDiv.querySelector('h2');
+        const name = mealHeader ? text(mealHeader) : mealDiv.id.split('_menu').join('');
+        const categories = [];
+        const content = mealDiv.querySelector('div[id="content_text"]');
+        if (content) {
+            for (const category of content.querySelectorAll('h2.menu_category_name')) {
+                const items = [];
+                for (let el = category.nextElementSibling; el && !isCategory(el); el = el.nextElementSibling) {
+                    if (el.tagName !== 'LI' || !el.classList.contains('lightbox-nutrition')) continue;
+                    const link = el.querySelector('a');
+                    if (link) items.push([text(link), attrs.map((attr) => link.getAttribute(attr) || '')]);
+                }
+                categories.push([text(category), items]);
+            }
+        }
+        meals.push([name, categories]);
+    }
+    return {location: header ? text(header) : null, meals};
+}"""
+
+# Tags the standard library parser reports without a matching end tag
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+
+
+class MenuItem(NamedTuple):
+    """One menu item, in page order"""
+    meal: str
+    category: str
+    name: str
+    nutrition: Dict[str, str]
+    allergens: str
+    diet: str
+    carbon_rating: str
+    healthfulness: str
+    ingredients: str
+
+    def as_dict(self) -> Dict:
+        """The item in the scraped menu JSON shape"""
+        return {
+            "name": self.name,
+            "nutrition": dict(self.nutrition),
+            "allergens": self.allergens,
+            "diet": self.diet,
+            "carbon_rating": self.carbon_rating,
+            "healthfulness": self.healthfulness,
+            "ingredients": self.ingredients,
+        }
+
+
+class _Meal:
+    __slots__ = ("fallback_name", "name", "content_seen", "in_content", "categories")
+
+    def __init__(self, fallback_name: str):
+        self.fallback_name = fallback_name
+        self.name: Optional[str] = None   # Text of the first <h2> inside the meal div
+        self.content_seen = False         # Only the meal's first div#content_text counts
+        self.in_content = False
+        self.categories: List[Tuple[str, List[Dict]]] = []
+
+
+class _Capture:
+    """Stripped text of one element, joined the way BeautifulSoup's get_text(strip=True) does"""
+    __slots__ = ("parts",)
+
+    def __init__(self):
+        self.parts: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class _Element:
+    __slots__ = ("tag", "on_end", "category")
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.on_end = None
+        self.category: Optional[List[Dict]] = None  # Items of the category its latest <h2> child started
+
+
+class _MenuTarget:
+    """
+    Parser target (start/end/data/comment/close) that collects the menu in one pass
+
+    Matches the original BeautifulSoup walk: meals are divs whose id contains
+    "_menu", named by their first <h2>; categories are h2.menu_category_name
+    inside the meal's first div#content_text, and a category's items are the
+    li.lightbox-nutrition siblings that follow it up to the next category.
+    """
+
+    def __init__(self):
+        self.stack: List[_Element] = []
+        self.meals: List[_Meal] = []
+        self.open_meals: List[_Meal] = []
+        self.captures: List[_Capture] = []
+        self.text: List[str] = []
+        self.location: Optional[_Capture] = None
+        self.in_location_box = 0
+        self.item: Optional[Dict] = None
+
+    # Parser target interface
+
+    def start(self, tag: str, attrib) -> None:
+        self._flush_text()
+        element = _Element(tag)
+        parent = self.stack[-1] if self.stack else None
+        self.stack.append(element)
+        classes = (attrib.get("class") or "").split()
+
+        if "singlepage-content-padding" in classes:
+            self.in_location_box += 1
+            element.on_end = self._leave_location_box
+        if tag == "h1" and self.in_location_box and self.location is None:
+            self.location = self._capture(element)
+
+        if tag == "div":
+            element_id = attrib.get("id") or ""
+            if "_menu" in element_id:
+                meal = _Meal(element_id.replace("_menu", ""))
+                self.meals.append(meal)
+                self.open_meals.append(meal)
+                element.on_end = self._chain(element.on_end, lambda: self.open_meals.remove(meal))
+            elif element_id == "content_text":
+                for meal in self.open_meals:
+                    if not meal.content_seen:
+                        meal.content_seen = meal.in_content = True
+                        element.on_end = self._chain(element.on_end, self._leave_content(meal))
+
+        elif tag == "h2":
+            for meal in self.open_meals:
+                if meal.name is None:
+                    meal.name = ""
+                    capture = self._capture(element)
+                    element.on_end = self._chain(element.on_end, self._set_meal_name(meal, capture))
+            if "menu_category_name" in classes and parent is not None:
+                meals = [meal for meal in self.open_meals if meal.in_content]
+                # A category covers the h2's following siblings, so it is tracked on the parent;
+                # any category heading ends the previous one
+                parent.category = None
+                if meals:
+                    capture = self._capture(element)
+                    element.on_end = self._chain(element.on_end, self._start_category(parent, meals, capture))
+
+        elif tag == "li" and "lightbox-nutrition" in classes and parent is not None and parent.category is not None:
+            item = {"link": None}
+            items = parent.category
+            element.on_end = self._chain(element.on_end, lambda: self._add_item(item, items))
+            self.item = item
+
+        elif tag == "a" and self.item is not None and self.item["link"] is None:
+            self.item["link"] = (dict(attrib), self._capture(element))
+
+    def end(self, tag: str) -> None:
+        self._flush_text()
+        if not any(element.tag == tag for element in self.stack):
+            return  # Stray end tag
+        while self.stack:
+            element = self.stack.pop()
+            if element.on_end is not None:
+                element.on_end()
+            if element.tag == tag:
+                break
+
+    def data(self, text: str) -> None:
+        if self.captures:
+            self.text.append(text)
+
+    def comment(self, text: str) -> None:
+        self._flush_text()
+
+    def close(self) -> "_MenuTarget":
+        self._flush_text()
+        while self.stack:
+            self.end(self.stack[-1].tag)
+        return self
+
+    # Helpers
+
+    def _flush_text(self) -> None:
+        if not self.text:
+            return
+        text = "".join(self.text).strip()
+        self.text = []
+        if text:
+            for capture in self.captures:
+                capture.parts.append(text)
+
+    def _capture(self, element: _Element) -> _Capture:
+        capture = _Capture()
+        self.captures.append(capture)
+
+        def finish():
+            self.captures.remove(capture)
+
+        element.on_end = self._chain(element.on_end, finish)
+        return capture
+
+    @staticmethod
+    def _chain(first, second):
+        if first is None:
+            return second
+
+        def both():
+            first()
+            second()
+        return both
+
+    def _leave_location_box(self) -> None:
+        self.in_location_box -= 1
+
+    @staticmethod
+    def _leave_content(meal: _Meal):
+        def leave():
+            meal.in_content = False
+        return leave
+
+    @staticmethod
+    def _set_meal_name(meal: _Meal, capture: _Capture):
+        def set_name():
+            meal.name = capture.text
+        return set_name
+
+    @staticmethod
+    def _start_category(parent: _Element, meals: List[_Meal], capture: _Capture):
+        def start():
+            items: List[Dict] = []
+            for meal in meals:
+                meal.categories.append((capture.text, items))
+            parent.category = items
+        return start
+
+    def _add_item(self, item: Dict, items: List[Dict]) -> None:
+        if self.item is item:
+            self.item = None
+        if item["link"] is None:
+            return
+        attrib, capture = item["link"]
+        items.append(_item_record(capture.text, attrib))
+
+    def menu(self) -> Tuple[Optional[str], Dict[str, Dict[str, List[Dict]]]]:
+        """(location shown on the page or None, {meal: {category: [items]}})"""
+        meals = _assemble_meals(
+            (meal.name if meal.name is not None else meal.fallback_name, meal.categories)
+            for meal in self.meals
+        )
+        location = self.location.text if self.location is not None else None
+        return location or None, meals
+
+
+def _item_record(name: str, attrib) -> Dict:
+    record = {
+        "name": name,
+        "nutrition": {field: attrib.get(attr) or "" for field, attr in NUTRITION_ATTRS.items()},
+    }
+    for field, attr in DETAIL_ATTRS.items():
+        record[field] = attrib.get(attr) or ""
+    return record
+
+
+def _assemble_meals(meals: Iterable[Tuple[str, Iterable[Tuple[str, List[Dict]]]]]) -> Dict[str, Dict[str, List[Dict]]]:
+    """{meal: {category: [items]}} from (meal, [(category, items)]) in page order"""
+    assembled: Dict[str, Dict[str, List[Dict]]] = {}
+    for name, categories in meals:
+        # Later meals/categories with the same name replace earlier ones, as before
+        sections = assembled[name] = {}
+        for category, items in categories:
+            sections[category] = list(items)
+    return assembled
+
+
+class _StdlibDriver(HTMLParser):
+    """Feeds standard library HTMLParser events to a parser target"""
+
+    def __init__(self, target: _MenuTarget):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+        if tag in _VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in _VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def handle_comment(self, data):
+        self.target.comment(data)
+
+
+def _parse(html_content: str, backend: str = DEFAULT_BACKEND) -> _MenuTarget:
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {backend}. Use one of: {', '.join(PARSER_BACKENDS)}")
+    target = _MenuTarget()
+    if backend == "lxml":
+        if etree is None:
+            raise ValueError("The lxml backend needs lxml installed")
+        parser = etree.HTMLParser(target=target)
+        parser.feed(html_content)
+        return parser.close()
+
+    driver = _StdlibDriver(target)
+    driver.feed(html_content)
+    driver.close()
+    return target.close()
+
+
+def parse_menu_html(
+    html_content: str,
+    date_str: str,
+    location_name: str,
+    detect_location: bool = True,
+    backend: str = DEFAULT_BACKEND,
+) -> Dict:
+    """
+    Parse a menu page into {"date", "location", "meals": {meal: {category: [items]}}}
+
+    With detect_location the location shown on the page (".singlepage-content-padding h1")
+    replaces location_name when present.
+    """
+    location, meals = _parse(html_content, backend).menu()
+    return {
+        "date": date_str,
+        "location": location if detect_location and location else location_name,
+        "meals": meals,
+    }
+
+
+def menu_from_extracted(
+    extracted: Dict,
+    date_str: str,
+    location_name: str,
+    detect_location: bool = True,
+) -> Dict:
+    """parse_menu_html's result from what DOM_EXTRACT_SCRIPT returned"""
+    meals = _assemble_meals(
+        (meal, [
+            (category, [_item_record(name, dict(zip(EXTRACT_ATTRS, values))) for name, values in items])
+            for category, items in categories
+        ])
+        for meal, categories in extracted.get("meals") or []
+    )
+    location = extracted.get("location")
+    return {
+        "date": date_str,
+        "location": location if detect_location and location else location_name,
+        "meals": meals,
+    }
+
+
+def _timed_parse(parse_html: Callable[[str, str, str], Dict], html_content: str, date_str: str, location_name: str):
+    """Runs in the worker: the menu plus when parsing started and ended"""
+    started = time.perf_counter()
+    menu = parse_html(html_content, date_str, location_name)
+    return menu, started, time.perf_counter()
+
+
+class ParsePool:
+    """
+    Parses menu HTML in worker threads or processes instead of on the event loop
+
+    Only "process" parses pages in parallel. "thread" keeps the event loop free
+    so parsing overlaps the network waits, but the parsers hold the GIL, so one
+    page is parsed at a time. "inline" parses on the loop. Pages reach the pool
+    from the HTTP fetch and from browser pages in the "html" extract mode; the
+    default "dom" mode extracts in the browser and never uses it.
+
+    parse(parse_html, html_content, date_str, location_name) awaits
+    parse_html(...) in a worker; with executor="process" parse_html must be
+    picklable (a module-level function or a functools.partial of one). A
+    MenuPageCache.cached_parser wrapper is unwrapped: only the inner parser goes
+    to the worker and the parsed menu is checked against the cache here. Parse times are
+    recorded as "parse" on `timeline` (a scrape_pool.ScrapeTimeline), if given.
+    """
+
+    def __init__(self, executor: Optional[str] = None, workers: Optional[int] = None, timeline=None):
+        executor = executor or default_parse_executor()
+        workers = workers or default_parse_workers()
+        if executor not in PARSE_EXECUTORS:
+            raise ValueError(f"Unknown parse executor: {executor}. Use one of: {', '.join(PARSE_EXECUTORS)}")
+        self.executor = executor
+        self.timeline = timeline
+        self._pool: Optional[Executor] = None
+        if executor == "thread":
+            self._pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="menu-parse")
+        elif executor == "process":
+            self._pool = ProcessPoolExecutor(max(1, workers))
+
+    async def parse(
+        self,
+        parse_html: Callable[[str, str, str], Dict],
+        html_content: str,
+        date_str: str,
+        location_name: str,
+    ) -> Dict:
+        cache = getattr(parse_html, "page_cache", None)
+        if cache is not None:
+            parse_html = parse_html.parse_html
+
+        if self._pool is None:
+            menu, started, finished = _timed_parse(parse_html, html_content, date_str, location_name)
+        else:
+            menu, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _timed_parse, parse_html, html_content, date_str, location_name
+            )
+        if self.timeline is not None:
+            self.timeline.add("parse", started, finished)
+        if cache is not None:
+            cache.check(location_name, date_str, menu)
+        return menu
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def extract_menu(
+    page,
+    date_str: str,
+    location_name: str,
+    mode: str = DEFAULT_EXTRACT_MODE,
+    detect_location: bool = True,
+    cache=None,
+    parse_pool: Optional[ParsePool] = None,
+) -> Union[Dict, Awaitable[Dict]]:
+    """
+    Read the menu from a loaded Playwright page
+
+    "dom" (default) runs DOM_EXTRACT_SCRIPT in the browser, so only the menu
+    crosses over instead of the serialized page. "html" is the page.content() +
+    parse_menu_html path. "compare" runs both, prints the meals that differ and
+    returns the DOM result.
+
+    With a MenuPageCache (keyed by location_name and date_str), the menu is
+    checked against it, so one that is the same as last time is marked unchanged.
+
+    While recording (SCRAPER_RECORD_DIR), the menu markup is saved first, cached or not.
+
+    With a parse_pool, "html" returns as soon as the page has been serialized:
+    the result is a future for the menu, parsed in the pool, so the caller can
+    release the page for its next navigation before awaiting it.
+    """
+    if mode not in EXTRACT_MODES:
+        raise ValueError(f"Unknown extract mode: {mode}. Use one of: {', '.join(EXTRACT_MODES)}")
+
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record_menu(location_name, date_str, await page.evaluate(MENU_MARKUP_SCRIPT))
+
+    if mode == "html":
+        html_content = await page.content()
+        if parse_pool is not None:
+            return asyncio.ensure_future(_parse_and_check(
+                parse_pool, html_content, date_str, location_name, detect_location, cache
+            ))
+        menu = parse_menu_html(html_content, date_str, location_name, detect_location)
+        if cache is not None:
+            cache.check(location_name, date_str, menu)
+        return menu
+
+    extracted = await page.evaluate(DOM_EXTRACT_SCRIPT, {"attrs": list(EXTRACT_ATTRS)})
+    menu = menu_from_extracted(extracted, date_str, location_name, detect_location)
+    if cache is not None:
+        cache.check(location_name, date_str, menu)
+
+    if mode == "compare":
+        parsed = parse_menu_html(await page.content(), date_str, location_name, detect_location)
+        if parsed != menu:
+            meals = sorted(name for name in set(parsed["meals"]) | set(menu["meals"])
+                           if parsed["meals"].get(name) != menu["meals"].get(name))
+            print(f"[compare] {location_name} {date_str}: DOM and HTML extraction differ "
+                  f"(location {menu['location']!r} vs {parsed['location']!r}, meals {meals})")
+    return menu
+
+
+async def _parse_and_check(parse_pool, html_content, date_str, location_name, detect_location, cache) -> Dict:
+    parse = partial(parse_menu_html, detect_location=detect_location)
+    menu = await parse_pool.parse(parse, html_content, date_str, location_name)
+    if cache is not None:
+        cache.check(location_name, date_str, menu)
+    return menu
+
+
+def iter_menu_items(html_content: str, backend: str = DEFAULT_BACKEND) -> Iterator[MenuItem]:
+    """Every item on a menu page as a MenuItem, in page order"""
+    _, meals = _parse(html_content, backend).menu()
+    for meal, categories in meals.items():
+        for category, items in categories.items():
+            for item in items:
+                yield MenuItem(meal=meal, category=category, **item)
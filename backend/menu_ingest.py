@@ -0,0 +1,462 @@
+"""
+Menu Ingest
+Streaming decoder for dining hall menu uploads (JSON or NDJSON, optionally gzip/zstd compressed)
+Feeds batched upserts while the upload is still being read
+"""
+import codecs
+import json
+import re
+import zlib
+from concurrent.futures import Executor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from menu_diff import add_summary, empty_summary
+from menu_parallel import MIN_PARALLEL_SHARDS, Shard, parse_shards_async
+from nutrition_parsing import MenuErrors
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+DEFAULT_BATCH_SIZE = 500
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_ENTRY_CHARS = 8 * 1024 * 1024  # Refuse to buffer a single menu entry larger than this
+# A pending entry larger than this is tracked with a resumable scan instead of being
+# re-decoded on every chunk (which would make one large entry quadratic)
+SCAN_AFTER_CHARS = 256 * 1024
+
+_COMPRESSION_SUFFIXES = (".gz", ".gzip", ".zst", ".zstd")
+_NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+_NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# An NDJSON menu line opens with one of the entry's own keys; the nested document with a hall name
+_NDJSON_HEAD_RE = re.compile(r'\ufeff?\s*\{\s*"(?:hall|location|date|meals)"\s*:')
+SNIFF_CHARS = 256
+# What the incomplete-value scan jumps between: structural characters, and the body of a string
+_STRUCTURAL_RE = re.compile(r'["{}\[\]]')
+_STRING_BODY_RE = re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL)
+
+
+def detect_compression(head: bytes, content_encoding: Optional[str] = None) -> Optional[str]:
+    """Detect gzip/zstd compression from the Content-Encoding header or the magic bytes"""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return "gzip"
+    if encoding in ("zstd", "zst"):
+        return "zstd"
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def sniff_menu_format(head: str) -> str:
+    """Tell NDJSON from the nested JSON document by the first characters of the (decompressed) data"""
+    return "ndjson" if _NDJSON_HEAD_RE.match(head) else "json"
+
+
+def detect_menu_format(
+    filename: Optional[str] = None,
+    content_type: Optional[str] = None,
+    head: Optional[str] = None,
+    default: Optional[str] = "json",
+) -> Optional[str]:
+    """
+    Decide between the nested JSON document and NDJSON (one menu per line)
+    using the file extension (compression suffixes are ignored) or the content type,
+    else the start of the data (`head`) if given, else `default`
+    """
+    name = (filename or "").lower()
+    for suffix in _COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    if name.endswith(_NDJSON_SUFFIXES):
+        return "ndjson"
+    if (content_type or "").split(";")[0].strip().lower() in _NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    if head is not None:
+        return sniff_menu_format(head)
+    return default
+
+
+class StreamDecompressor:
+    """Incremental gzip/zstd decompressor (passes data through when uncompressed)"""
+
+    def __init__(self, compression: Optional[str]):
+        self.compression = compression
+        self._obj = self._new_decompressor()
+
+    def _new_decompressor(self):
+        if self.compression == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.compression == "zstd":
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj()
+        return None
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._obj is None:
+            return chunk
+        try:
+            out = self._obj.decompress(chunk)
+            # Concatenated gzip members (e.g. appended archives) start a fresh decompressor
+            while self.compression == "gzip" and self._obj.unused_data:
+                rest = self._obj.unused_data
+                self._obj = self._new_decompressor()
+                out += self._obj.decompress(rest)
+        except Exception as e:
+            raise ValueError(f"Could not decompress {self.compression} upload: {e}")
+        return out
+
+    def flush(self) -> bytes:
+        if self._obj is None or self.compression != "gzip":
+            return b""
+        return self._obj.flush()
+
+
+class MenuStreamParser:
+    """
+    Incremental parser for menu uploads
+
+    Yields (location, entry) pairs as soon as each menu entry is complete, so at most
+    one entry is buffered at a time.
+
+    fmt="json":   {"Worcester": [{"date": ..., "meals": {...}}, ...], ...}
+    fmt="ndjson": one {"hall": "Worcester", "date": ..., "meals": {...}} object per line
+                  ("location" is used when "hall" is missing)
+    """
+
+    def __init__(self, fmt: str = "json"):
+        if fmt not in ("json", "ndjson"):
+            raise ValueError(f"Unsupported menu format: {fmt}")
+        self.fmt = fmt
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._location: Optional[str] = None
+        self._line_no = 0
+        # Progress through an incomplete value or line, relative to the cursor, so the
+        # next chunk only scans what is new: (chars scanned, depth, inside a string) / chars scanned
+        self._scan: Optional[Tuple[int, int, bool]] = None
+        self._line_scanned = 0
+
+    def feed(self, data: bytes) -> List[Tuple[str, object]]:
+        """Feed raw (decompressed) bytes and return every entry completed by them"""
+        self._buf = self._buf[self._pos:] + self._text.decode(data)
+        self._pos = 0
+        return self._drain(final=False)
+
+    def close(self) -> List[Tuple[str, object]]:
+        """Flush the remaining input; raises ValueError if the document is truncated"""
+        self._buf = self._buf[self._pos:] + self._text.decode(b"", final=True)
+        self._pos = 0
+        entries = self._drain(final=True)
+        if self.fmt == "json" and self._state != "end":
+            raise ValueError("Unexpected end of menu JSON")
+        return entries
+
+    def _drain(self, final: bool) -> List[Tuple[str, object]]:
+        if self.fmt == "ndjson":
+            return self._drain_ndjson(final)
+        return self._drain_json(final)
+
+    def _drain_ndjson(self, final: bool) -> List[Tuple[str, object]]:
+        entries = []
+        while True:
+            newline = self._buf.find("\n", self._pos + self._line_scanned)
+            if newline == -1:
+                if not final:
+                    if len(self._buf) - self._pos > MAX_ENTRY_CHARS:
+                        raise ValueError(f"Line {self._line_no + 1} exceeds {MAX_ENTRY_CHARS} characters")
+                    self._line_scanned = len(self._buf) - self._pos
+                    break
+                line, self._pos = self._buf[self._pos:], len(self._buf)
+            else:
+                line, self._pos = self._buf[self._pos:newline], newline + 1
+            self._line_scanned = 0
+            self._line_no += 1
+
+            line = line.strip()
+            if line:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {self._line_no}: {e.msg}")
+                location = None
+                if isinstance(entry, dict):
+                    location = entry.pop("hall", None) or entry.get("location")
+                entries.append((location or f"line {self._line_no}", entry))
+
+            if newline == -1:
+                break
+        return entries
+
+    def _skip_ws(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in " \t\r\n":
+            pos += 1
+        self._pos = pos
+
+    def _scan_value(self) -> bool:
+        """
+        Whether the object, array or string at the cursor is complete in the buffer
+
+        Picks up where the previous call stopped, so a value that arrives over many
+        chunks is scanned once in total rather than once per chunk.
+        """
+        buf = self._buf
+        scanned, depth, in_string = self._scan or (0, 0, False)
+        i = self._pos + scanned
+        while True:
+            if in_string:
+                i = _STRING_BODY_RE.match(buf, i).end()
+                if i >= len(buf) or buf[i] != '"':  # Ran out of input, possibly mid-escape
+                    break
+                i += 1
+                in_string = False
+                if depth == 0:
+                    return True
+                continue
+            match = _STRUCTURAL_RE.search(buf, i)
+            if not match:
+                i = len(buf)
+                break
+            i = match.end()
+            if match.group() == '"':
+                in_string = True
+            elif match.group() in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth <= 0:
+                    return True
+        self._scan = (i - self._pos, depth, in_string)
+        return False
+
+    def _decode_value(self, final: bool):
+        """Decode one JSON value at the cursor; returns (ok, value)"""
+        # Once a large value is being scanned, only decode again when the scan says it is complete
+        resumed = self._scan is not None
+        if resumed and not final and not self._scan_value():
+            return self._incomplete()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if final or resumed:
+                raise ValueError(f"Invalid menu JSON: {e.msg}")
+            large = len(self._buf) - self._pos > SCAN_AFTER_CHARS
+            if large and self._buf[self._pos] in '{["' and self._scan_value():
+                raise ValueError(f"Invalid menu JSON: {e.msg}")  # Complete, so more input cannot help
+            return self._incomplete()
+        self._scan = None
+        self._pos = end
+        return True, value
+
+    def _incomplete(self):
+        if len(self._buf) - self._pos > MAX_ENTRY_CHARS:
+            raise ValueError(f"Menu entry exceeds {MAX_ENTRY_CHARS} characters")
+        return False, None
+
+    def _expect(self, ch: str, expected: str):
+        raise ValueError(f"Invalid menu JSON: expected {expected}, found {ch!r}")
+
+    def _drain_json(self, final: bool) -> List[Tuple[str, object]]:
+        entries = []
+        while True:
+            self._skip_ws()
+            if self._pos >= len(self._buf):
+                break
+            ch = self._buf[self._pos]
+            state = self._state
+
+            if state == "start":
+                if ch != "{":
+                    raise ValueError("Root must be a dictionary with location names as keys")
+                self._pos += 1
+                self._state = "key_or_end"
+            elif state in ("key", "key_or_end"):
+                if ch == "}" and state == "key_or_end":
+                    self._pos += 1
+                    self._state = "end"
+                    continue
+                if ch != '"':
+                    self._expect(ch, "a location name")
+                ok, location = self._decode_value(final)
+                if not ok:
+                    break
+                self._location = location
+                self._state = "colon"
+            elif state == "colon":
+                if ch != ":":
+                    self._expect(ch, "':'")
+                self._pos += 1
+                self._state = "list"
+            elif state == "list":
+                if ch != "[":
+                    raise ValueError(f"Location '{self._location}' must contain a list of menu entries")
+                self._pos += 1
+                self._state = "entry_or_end"
+            elif state in ("entry", "entry_or_end"):
+                if ch == "]" and state == "entry_or_end":
+                    self._pos += 1
+                    self._state = "after_list"
+                    continue
+                ok, entry = self._decode_value(final)
+                if not ok:
+                    break
+                entries.append((self._location, entry))
+                self._state = "after_entry"
+            elif state == "after_entry":
+                if ch == ",":
+                    self._state = "entry"
+                elif ch == "]":
+                    self._state = "after_list"
+                else:
+                    self._expect(ch, "',' or ']'")
+                self._pos += 1
+            elif state == "after_list":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "end"
+                else:
+                    self._expect(ch, "',' or '}'")
+                self._pos += 1
+            else:  # end
+                raise ValueError("Unexpected data after end of menu JSON")
+        return entries
+
+
+class MenuIngestError(ValueError):
+    """
+    An upload that turned out to be invalid partway through
+
+    Batches completed before the error are already written; `progress` holds the
+    ingest counts up to that point (same keys as ingest_menu_stream's result,
+    without errors) and `partial` says whether anything was written.
+    """
+
+    def __init__(self, message: str, progress: Dict[str, int]):
+        super().__init__(message)
+        self.progress = progress
+
+    @property
+    def partial(self) -> bool:
+        return any(self.progress.get(name) for name in ("inserted", "updated", "deleted"))
+
+
+async def ingest_menu_stream(
+    chunks: AsyncIterator[bytes],
+    nutrition_db,
+    fmt: Optional[str] = "json",
+    content_encoding: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    trusted: bool = False,
+    executor: Optional[Executor] = None,
+) -> Dict[str, object]:
+    """
+    Decode, validate and ingest a menu upload chunk by chunk
+
+    Each entry is validated and turned into food_items rows in a single pass as soon
+    as it is complete (see menu_rows); rows are diffed against the database and
+    written whenever a full batch is pending, so peak memory is bounded by
+    batch_size rather than the upload size. Batches only ever end between entries,
+    so a menu is always diffed as a whole. Invalid entries, meals, sections or items
+    are skipped and reported by JSON Pointer (e.g. /Worcester/3/meals/Lunch/Entree/2/name),
+    up to MAX_MENU_ERRORS messages. trusted=True skips validation for internal sources.
+
+    With a process pool `executor`, completed entries are collected into groups of
+    MIN_PARALLEL_SHARDS and parsed across the pool (sharded by hall and date)
+    while the event loop stays free.
+
+    fmt=None detects JSON or NDJSON from the start of the (decompressed) upload.
+
+    Returns a dict with items_processed, items_written (inserted + updated), entries,
+    the diff counts (inserted, updated, unchanged, deleted) and errors. An upload that
+    cannot be decoded raises MenuIngestError with what was written before that point.
+    """
+    parser = MenuStreamParser(fmt) if fmt is not None else None
+    head = b""
+    magic = b""
+    decompressor: Optional[StreamDecompressor] = None
+    entry_counts: Dict[str, int] = {}
+    shards: List[Shard] = []
+    parse_every = MIN_PARALLEL_SHARDS if executor is not None else 1
+    pending = []
+    errors = MenuErrors()
+    stats = {"items_processed": 0, "items_written": 0, "entries": 0}
+    diff = empty_summary()
+
+    async def flush():
+        if pending:
+            summary = await nutrition_db.sync_menu_items(pending)
+            add_summary(diff, summary)
+            stats["items_written"] += summary["inserted"] + summary["updated"]
+            pending.clear()
+
+    async def parse():
+        if shards:
+            rows = await parse_shards_async(shards, executor, errors, trusted)
+            shards.clear()
+            stats["items_processed"] += len(rows)
+            pending.extend(rows)
+            if len(pending) >= batch_size:
+                await flush()
+
+    async def consume(entries):
+        for location, entry in entries:
+            idx = entry_counts.get(location, 0)
+            entry_counts[location] = idx + 1
+            stats["entries"] += 1
+
+            shards.append((location, idx, entry))
+            if len(shards) >= parse_every:
+                await parse()
+
+    async def feed(data: bytes, final: bool = False):
+        nonlocal parser, head
+        if parser is None:
+            # Hold the data back until there is enough of it to tell the format
+            head += data
+            if len(head) < SNIFF_CHARS and not final:
+                return
+            text = head[:SNIFF_CHARS].decode("utf-8", "ignore")
+            parser = MenuStreamParser(sniff_menu_format(text))
+            data, head = head, b""
+        await consume(parser.feed(data))
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if decompressor is None:
+                # The magic bytes may arrive split over several small chunks
+                magic += chunk
+                if len(magic) < len(ZSTD_MAGIC) and not content_encoding:
+                    continue
+                decompressor = StreamDecompressor(detect_compression(magic, content_encoding))
+                chunk, magic = magic, b""
+            await feed(decompressor.decompress(chunk))
+
+        if decompressor is None:  # Shorter than a magic number (or empty)
+            decompressor = StreamDecompressor(detect_compression(magic, content_encoding))
+            await feed(decompressor.decompress(magic))
+        await feed(decompressor.flush(), final=True)
+        await consume(parser.close())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise MenuIngestError(str(e), {**stats, **diff}) from e
+    await parse()
+    await flush()
+
+    return {**stats, **diff, "errors": errors.as_list()}
+
+
+async def iter_upload_chunks(file, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read an UploadFile in fixed-size chunks"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,117 @@
+"""
+Menu Page Cache
+Content hashes of scraped menus per (hall, date), kept in a local JSON file
+A menu that hashes the same as last scrape is marked unchanged and left out of
+what goes to the database
+Standard library only, so the Lambda image can copy it as-is
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+DEFAULT_PAGE_CACHE_FILE = "menu_page_cache.json"
+CACHE_VERSION = 3  # 1 hashed the page markup, differently per scrape path; 2 also kept every menu
+
+
+def page_hash(content: Union[str, bytes]) -> str:
+    """128-bit blake2b hex digest of `content`"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def menu_hash(menu: Dict) -> str:
+    """
+    The key the cache compares: page_hash of the menu's location and meals as
+    compact JSON. Every scrape path (AJAX HTML, browser DOM or page HTML, replay)
+    ends in the same menu dict, so a page hashes the same whichever path read it
+    """
+    return page_hash(json.dumps(
+        {"location": menu.get("location"), "meals": menu.get("meals")},
+        ensure_ascii=False, separators=(",", ":"),
+    ))
+
+
+class MenuPageCache:
+    """
+    {hall: {date: {"hash", "scraped_at"}}} loaded from and saved to `path`
+
+    check() hashes each scraped menu with menu_hash, so the HTTP and browser
+    paths share entries and a fallback from one to the other does not reload
+    unchanged menus. Call save() only once the scraped menus have been stored,
+    so a failed load is retried on the next scrape rather than skipped.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PAGE_CACHE_FILE):
+        self.path = path
+        self.pages: Dict[str, Dict[str, Dict]] = {}
+        self.unchanged: Set[Tuple[str, str]] = set()
+        self.seen: Set[Tuple[str, str]] = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.pages = data.get("pages") or {}
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"[CACHE] Ignoring unreadable page cache {path}: {e}")
+
+    def check(self, hall: str, date_str: str, menu: Dict) -> Dict:
+        """Record a freshly scraped menu: unchanged if it hashes as last time, else its hash is stored"""
+        key = (hall, date_str)
+        content_hash = menu_hash(menu)
+        self.seen.add(key)
+        page = self.pages.get(hall, {}).get(date_str)
+        if page and page["hash"] == content_hash:
+            self.unchanged.add(key)
+        else:
+            self.unchanged.discard(key)
+            self.pages.setdefault(hall, {})[date_str] = {
+                "hash": content_hash,
+                "scraped_at": datetime.now(timezone.utc).isoformat(),
+            }
+        return menu
+
+    def cached_parser(self, parse_html: Callable[[str, str, str], Dict]) -> Callable[[str, str, str], Dict]:
+        """Wrap parse_html(html_content, date_str, hall) so every parsed menu goes through check()"""
+        def parse(html_content: str, date_str: str, hall: str) -> Dict:
+            return self.check(hall, date_str, parse_html(html_content, date_str, hall))
+        # So a ParsePool can parse in a worker and run check() on the event loop
+        parse.page_cache = self
+        parse.parse_html = parse_html
+        return parse
+
+    def changed_menus(self, menus: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """`menus` without the entries of unchanged pages (what still needs to be written)"""
+        return {
+            hall: [entry for entry in entries if (hall, entry.get("date")) not in self.unchanged]
+            for hall, entries in menus.items()
+        }
+
+    def save(self) -> None:
+        """
+        Write the cache, keeping only pages seen this scrape for halls that were
+        scraped (dates that left the dropdown drop out) and every other hall as is
+        """
+        if not self.path:
+            return
+        scraped_halls = {hall for hall, _ in self.seen}
+        pages = {}
+        for hall, dates in self.pages.items():
+            if hall in scraped_halls:
+                dates = {date: page for date, page in dates.items() if (hall, date) in self.seen}
+            if dates:
+                pages[hall] = dates
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "pages": pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.pages = pages
+
+    def summary(self) -> str:
+        return f"{len(self.unchanged)}/{len(self.seen)} pages unchanged since the last scrape"
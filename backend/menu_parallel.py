@@ -0,0 +1,160 @@
+"""
+Parallel Menu Parsing
+Shards menu documents by (hall, date) across a process pool
+Workers send back compact row tuples (ROW_FIELDS order) rather than dicts or models,
+which keeps pickling between processes cheap
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from nutrition_parsing import MAX_MENU_ERRORS, MenuErrors, menu_path, menu_rows
+
+# Column order of the row tuples returned by workers (the food_items columns menu_rows fills)
+ROW_FIELDS = (
+    "name",
+    "serving_size",
+    "calories",
+    "total_fat",
+    "sodium",
+    "total_carb",
+    "dietary_fiber",
+    "sugars",
+    "protein",
+    "location",
+    "date",
+    "meal_type",
+)
+
+SHARDS_PER_TASK = 16  # (hall, date) entries per worker call
+MIN_PARALLEL_SHARDS = 2 * SHARDS_PER_TASK  # Smaller loads parse faster in-process than via the pool
+
+# (hall, index of the entry within the hall, entry). The entry may still be a raw
+# NDJSON line, in which case hall is None and read from the line's "hall"/"location".
+Shard = Tuple[Optional[str], int, Union[Dict, str, bytes]]
+ShardResult = Tuple[List[tuple], int, List[str]]
+
+
+def create_parse_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for menu parsing, or None when parallel parsing is disabled (workers <= 1)
+
+    Workers are spawned rather than forked, so they are safe to start from a
+    running server and only import the standard-library parsing modules.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    if not workers or workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def parse_shards(shards: List[Shard], trusted: bool = False, error_limit: int = MAX_MENU_ERRORS) -> ShardResult:
+    """
+    Parse shards into row tuples (runs in the worker process)
+
+    Raw JSON lines are decoded here too, so the decoding also happens in parallel.
+    Returns (rows, error_total, error_messages).
+    """
+    errors = MenuErrors(error_limit)
+    rows = []
+    for hall, idx, entry in shards:
+        if isinstance(entry, (str, bytes)):
+            try:
+                entry = json.loads(entry)
+            except json.JSONDecodeError as e:
+                errors.add(menu_path(hall or f"line {idx + 1}"), f"invalid JSON: {e.msg}")
+                continue
+            if hall is None and isinstance(entry, dict):
+                hall = entry.pop("hall", None) or entry.get("location")
+            hall = hall or f"line {idx + 1}"
+        for row in menu_rows(entry, hall, errors, menu_path(hall, idx), trusted):
+            rows.append(tuple(row[field] for field in ROW_FIELDS))
+    return rows, errors.total, errors.messages
+
+
+def rows_from_tuples(rows: Iterable[tuple]) -> List[Dict]:
+    return [dict(zip(ROW_FIELDS, row)) for row in rows]
+
+
+def document_shards(json_data, errors: MenuErrors) -> List[Shard]:
+    """One shard per (hall, date) entry of a {hall: [entries]} document"""
+    if not isinstance(json_data, dict):
+        errors.add("", "root must be an object with location names as keys")
+        return []
+
+    shards = []
+    for hall, entries in json_data.items():
+        if not isinstance(entries, list):
+            errors.add(menu_path(hall), "must be a list of menu entries")
+            continue
+        shards.extend((hall, idx, entry) for idx, entry in enumerate(entries))
+    return shards
+
+
+def ndjson_shards(text: str) -> List[Shard]:
+    """One shard per non-empty NDJSON line, left undecoded for the workers"""
+    return [(None, idx, line) for idx, line in enumerate(text.splitlines()) if line.strip()]
+
+
+def _tasks(shards: List[Shard]) -> List[List[Shard]]:
+    return [shards[i:i + SHARDS_PER_TASK] for i in range(0, len(shards), SHARDS_PER_TASK)]
+
+
+def _collect(results: Iterable[ShardResult], errors: MenuErrors) -> List[Dict]:
+    rows = []
+    for task_rows, error_total, messages in results:
+        rows.extend(rows_from_tuples(task_rows))
+        errors.merge(error_total, messages)
+    return rows
+
+
+def parse_shards_parallel(
+    shards: List[Shard],
+    executor: Optional[Executor],
+    errors: Optional[MenuErrors] = None,
+    trusted: bool = False,
+) -> List[Dict]:
+    """
+    Parse shards across `executor` and return food_items row dicts in document order
+
+    Without an executor, or for loads too small to be worth the round trip, the
+    shards are parsed in-process.
+    """
+    errors = errors if errors is not None else MenuErrors()
+    if executor is None or len(shards) < MIN_PARALLEL_SHARDS:
+        return _collect([parse_shards(shards, trusted, errors.limit)], errors)
+
+    futures = [executor.submit(parse_shards, task, trusted, errors.limit) for task in _tasks(shards)]
+    return _collect((future.result() for future in futures), errors)
+
+
+async def parse_shards_async(
+    shards: List[Shard],
+    executor: Optional[Executor],
+    errors: MenuErrors,
+    trusted: bool = False,
+) -> List[Dict]:
+    """parse_shards_parallel for the event loop: waits on the pool without blocking it"""
+    if executor is None or len(shards) < MIN_PARALLEL_SHARDS:
+        return _collect([parse_shards(shards, trusted, errors.limit)], errors)
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, parse_shards, task, trusted, errors.limit)
+        for task in _tasks(shards)
+    ))
+    return _collect(results, errors)
+
+
+def parse_menu_document_parallel(
+    json_data,
+    executor: Optional[Executor],
+    errors: Optional[MenuErrors] = None,
+    trusted: bool = False,
+) -> List[Dict]:
+    """parse_menu_document sharded by (hall, date) across a process pool; same rows, same errors"""
+    errors = errors if errors is not None else MenuErrors()
+    return parse_shards_parallel(document_shards(json_data, errors), executor, errors, trusted)
@@ -0,0 +1,127 @@
+"""
+Menu Pipeline
+Streaming scrape-to-database ingest: scrape -> normalize -> write, overlapped
+Scraped (hall, date) menus flow through a bounded queue into a stage that turns
+them into food_items rows and cuts batches of whole menus, which a writer stage
+syncs (menu_diff) in a worker thread while scraping goes on. The first write
+starts as soon as a batch is full, and a crash loses at most the batch in flight
+Standard library only (plus a supabase client passed in), so the Lambda image can copy it as-is
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from menu_diff import add_summary, empty_summary, sync_food_items
+from nutrition_parsing import menu_rows
+
+MENU_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))  # Scraped menus waiting to be normalized
+BATCH_QUEUE_SIZE = 2  # Batches waiting to be written
+BATCH_ROWS = int(os.getenv("PIPELINE_BATCH_ROWS", "500"))
+
+_DONE = object()
+
+
+class MenuPipeline:
+    """
+    Bounded producer/consumer ingest of scraped menus
+
+    run(produce) calls produce(put); the scraper awaits put(hall, menu) for each
+    menu it reads (its on_menu hook), which blocks while the queue is full, so a
+    slow database slows the scrape instead of piling menus up in memory.
+
+    A batch is flushed once it holds at least `batch_rows` rows and always ends on
+    a menu boundary: menu_diff deletes stored items missing from an ingested meal,
+    so a meal's rows must never be split across batches. Menus for which
+    skip(hall, menu) is true (e.g. pages unchanged since the last scrape) are not
+    written. write_batch(rows) runs in a worker thread and returns menu_diff
+    counts; it defaults to sync_food_items(client, rows).
+    """
+
+    def __init__(
+        self,
+        client=None,
+        write_batch: Optional[Callable[[List[Dict]], Dict[str, int]]] = None,
+        skip: Optional[Callable[[str, Dict], bool]] = None,
+        batch_rows: int = BATCH_ROWS,
+        queue_size: int = MENU_QUEUE_SIZE,
+    ):
+        if write_batch is None:
+            if client is None:
+                raise ValueError("MenuPipeline needs a supabase client or a write_batch function")
+            write_batch = lambda rows: sync_food_items(client, rows)
+        self.write_batch = write_batch
+        self.skip = skip
+        self.batch_rows = batch_rows
+        self.queue_size = queue_size
+        self.summary = empty_summary()
+        self.menus = 0
+        self.menus_skipped = 0
+        self.rows = 0
+        self.batches = 0
+        self.first_write_after: Optional[float] = None
+        self._menus: Optional[asyncio.Queue] = None
+
+    async def put(self, hall: str, menu: Dict) -> None:
+        await self._menus.put((hall, menu))
+
+    async def run(self, produce: Callable[[Callable[[str, Dict], Awaitable[None]]], Awaitable]):
+        """Run produce(self.put) with the normalize and write stages; returns what produce returned"""
+        self._menus = asyncio.Queue(self.queue_size)
+        batches: asyncio.Queue = asyncio.Queue(BATCH_QUEUE_SIZE)
+        started = time.perf_counter()
+
+        async def scrape():
+            # No finally: if a stage fails, the queue may be full with nobody draining it,
+            # and the cancelled scrape must not wait on it. gather() then stops the others
+            result = await produce(self.put)
+            await self._menus.put(_DONE)
+            return result
+
+        async def normalize():
+            rows: List[Dict] = []
+            while True:
+                item = await self._menus.get()
+                if item is _DONE:
+                    break
+                hall, menu = item
+                self.menus += 1
+                if self.skip is not None and self.skip(hall, menu):
+                    self.menus_skipped += 1
+                    continue
+                rows.extend(menu_rows(menu, hall, trusted=True))
+                if len(rows) >= self.batch_rows:
+                    await batches.put(rows)
+                    rows = []
+            if rows:
+                await batches.put(rows)
+            await batches.put(_DONE)
+
+        async def write():
+            while True:
+                rows = await batches.get()
+                if rows is _DONE:
+                    break
+                if self.first_write_after is None:
+                    self.first_write_after = time.perf_counter() - started
+                add_summary(self.summary, await asyncio.to_thread(self.write_batch, rows))
+                self.rows += len(rows)
+                self.batches += 1
+                print(f"[PIPELINE] Batch {self.batches}: {len(rows)} rows written "
+                      f"({self.menus} menus scraped so far)")
+
+        tasks = [asyncio.ensure_future(stage()) for stage in (scrape, normalize, write)]
+        try:
+            result, _, _ = await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed: stop the others (batches already written stay written)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return result
+
+    def report(self) -> str:
+        first = f", first write after {self.first_write_after:.1f}s" if self.first_write_after is not None else ""
+        return (f"{self.menus} menus ({self.menus_skipped} unchanged) -> {self.rows} rows "
+                f"in {self.batches} batches{first}")
@@ -0,0 +1,113 @@
+"""
+Menu Replay
+Record/replay of scraped menu pages, so the scrapers can run without the live site
+Recording (SCRAPER_RECORD_DIR) saves each hall's dropdown options and every date's
+menu HTML as they are fetched, over HTTP or in the browser; SCRAPER_FETCH_MODE=replay
+serves a recorded directory to the same parser with no network access
+Standard library only, so the Lambda image can copy it as-is
+
+Layout: <root>/<hall>/dates.json ([[value, text], ...]) and <root>/<hall>/<date>.html
+"""
+import json
+import os
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_REPLAY_DIR = os.getenv(
+    "SCRAPER_REPLAY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "scrape"),
+)
+RECORD_DIR = os.getenv("SCRAPER_RECORD_DIR") or None
+
+DATES_FILE = "dates.json"
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def date_file_name(date_text: str) -> str:
+    """2025-11-07.html for "Fri November 07, 2025", a sanitized name otherwise"""
+    try:
+        stem = datetime.strptime(date_text.strip(), "%a %B %d, %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        stem = _UNSAFE_RE.sub("-", date_text).strip("-") or "date"
+    return f"{stem}.html"
+
+
+def _hall_dir(root: str, hall: str) -> str:
+    return os.path.join(root, _UNSAFE_RE.sub("-", hall).strip("-"))
+
+
+class ScrapeRecorder:
+    """Writes fetched dropdown options and menu HTML under `root`"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def record_dates(self, hall: str, dates: List[Tuple[str, str]]) -> None:
+        directory = _hall_dir(self.root, hall)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, DATES_FILE), "w", encoding="utf-8") as f:
+            json.dump([list(date) for date in dates], f, indent=2, ensure_ascii=False)
+
+    def record_menu(self, hall: str, date_text: str, html_content: str) -> None:
+        directory = _hall_dir(self.root, hall)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, date_file_name(date_text)), "w", encoding="utf-8") as f:
+            f.write(html_content)
+
+
+_recorder = ScrapeRecorder(RECORD_DIR) if RECORD_DIR else None
+
+
+def get_recorder() -> Optional[ScrapeRecorder]:
+    """The recorder for SCRAPER_RECORD_DIR, or None when not recording"""
+    return _recorder
+
+
+def set_recorder(recorder: Optional[ScrapeRecorder]) -> None:
+    global _recorder
+    _recorder = recorder
+
+
+def load_dates(hall: str, root: str = DEFAULT_REPLAY_DIR) -> List[Tuple[str, str]]:
+    with open(os.path.join(_hall_dir(root, hall), DATES_FILE), "r", encoding="utf-8") as f:
+        return [(value, text) for value, text in json.load(f)]
+
+
+def load_menu_html(hall: str, date_text: str, root: str = DEFAULT_REPLAY_DIR) -> str:
+    with open(os.path.join(_hall_dir(root, hall), date_file_name(date_text)), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def replay_halls(
+    halls: Dict[str, str],
+    parse_html: Callable[[str, str, str], Dict],
+    root: str = DEFAULT_REPLAY_DIR,
+    select_dates: Optional[Callable[[str, List[Tuple[str, str]]], List[Tuple[str, str]]]] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Menus for `halls` from a recorded directory, parsed like a live scrape
+
+    A hall without recorded dates is reported and skipped, as is a date whose
+    menu was not recorded. With select_dates, only the dates it returns are replayed.
+    """
+    menus = {}
+    for hall in halls:
+        try:
+            dates = load_dates(hall, root)
+        except (OSError, ValueError) as e:
+            print(f"[REPLAY] No recorded dates for {hall}: {e}")
+            continue
+        if select_dates is not None:
+            dates = select_dates(hall, dates)
+        hall_menus = []
+        for _, date_text in dates:
+            try:
+                html_content = load_menu_html(hall, date_text, root)
+            except OSError:
+                print(f"[REPLAY] No recorded menu for {date_text} at {hall}")
+                continue
+            hall_menus.append(parse_html(html_content, date_text, hall))
+        menus[hall] = hall_menus
+    print(f"[REPLAY] Loaded {sum(len(m) for m in menus.values())} menus from {root}")
+    return menus
@@ -0,0 +1,221 @@
+"""
+Menu Snapshots
+Typed Parquet snapshots of scraped menus, partitioned by hall and date
+Every scraped field is kept (allergens, diet, ingredients, carbon rating, full nutrition),
+so snapshots can be queried for analytics or turned back into menus and re-ingested
+"""
+import argparse
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from nutrition_parsing import NUTRIENT_UNITS, parse_nutrition_facts
+
+DEFAULT_SNAPSHOT_DIR = "menu_snapshots"
+
+# Raw nutrition keys in the order the scraper writes them
+NUTRITION_KEYS = tuple(NUTRIENT_UNITS) + ("serving_size",)
+
+ITEM_TEXT_FIELDS = ("allergens", "diet", "carbon_rating", "healthfulness", "ingredients")
+
+MENU_DATE_FORMATS = ("%a %B %d, %Y", "%Y-%m-%d")
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("hall", pa.string()), ("menu_date", pa.date32())]),
+    flavor="hive",
+)
+
+SNAPSHOT_SCHEMA = pa.schema(
+    [
+        ("hall", pa.string()),
+        ("menu_date", pa.date32()),
+        ("date", pa.string()),            # Date exactly as scraped ("Fri November 07, 2025")
+        ("location", pa.string()),        # Location name shown on the menu page
+        ("meal_type", pa.string()),
+        ("section", pa.string()),
+        ("position", pa.int32()),         # Order of the item within its section
+        ("name", pa.string()),
+        ("serving_size", pa.string()),
+    ]
+    + [(field, pa.float64()) for field in NUTRIENT_UNITS]
+    + [("nutrition", pa.struct([(key, pa.string()) for key in NUTRITION_KEYS]))]
+    + [(field, pa.string()) for field in ITEM_TEXT_FIELDS]
+    + [("scraped_at", pa.timestamp("us", tz="UTC"))]
+)
+
+
+def parse_menu_date(value: str) -> Optional[date]:
+    """Parse a scraped menu date ("Fri November 07, 2025" or "2025-11-07")"""
+    for fmt in MENU_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def menus_to_table(menus: Dict[str, List[Dict]], scraped_at: Optional[datetime] = None) -> pa.Table:
+    """
+    Flatten {hall: [menu entries]} (the scraper / all_dining_halls_menus.json shape)
+    into one row per item. Entries whose date cannot be parsed are skipped.
+    """
+    scraped_at = scraped_at or datetime.now(timezone.utc)
+    columns: Dict[str, list] = {name: [] for name in SNAPSHOT_SCHEMA.names}
+
+    for hall, entries in menus.items():
+        for entry in entries:
+            menu_date = parse_menu_date(entry.get("date", ""))
+            if menu_date is None:
+                continue
+            for meal_type, sections in (entry.get("meals") or {}).items():
+                for section, items in sections.items():
+                    for position, item in enumerate(items):
+                        nutrition = item.get("nutrition") or {}
+                        columns["hall"].append(hall)
+                        columns["menu_date"].append(menu_date)
+                        columns["date"].append(entry.get("date"))
+                        columns["location"].append(entry.get("location"))
+                        columns["meal_type"].append(meal_type)
+                        columns["section"].append(section)
+                        columns["position"].append(position)
+                        columns["name"].append(item.get("name", "Unknown"))
+                        columns["serving_size"].append(nutrition.get("serving_size"))
+                        for field, value in parse_nutrition_facts(nutrition).items():
+                            columns[field].append(value)
+                        columns["nutrition"].append({key: nutrition.get(key) for key in NUTRITION_KEYS})
+                        for field in ITEM_TEXT_FIELDS:
+                            columns[field].append(item.get(field))
+                        columns["scraped_at"].append(scraped_at)
+
+    return pa.Table.from_pydict(columns, schema=SNAPSHOT_SCHEMA)
+
+
+def write_snapshot(
+    menus: Dict[str, List[Dict]],
+    root: str = DEFAULT_SNAPSHOT_DIR,
+    scraped_at: Optional[datetime] = None,
+) -> int:
+    """
+    Write scraped menus to root/hall=<hall>/menu_date=<YYYY-MM-DD>/ as Parquet
+
+    Partitions touched by this scrape are replaced, others are left alone, so
+    re-scraping a week keeps older dates. Returns the number of rows written.
+    """
+    table = menus_to_table(menus, scraped_at)
+    if not table.num_rows:
+        return 0
+
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template="menu-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+    return table.num_rows
+
+
+def open_snapshots(root: str = DEFAULT_SNAPSHOT_DIR) -> ds.Dataset:
+    """Open every snapshot under `root` as one memory-mapped dataset"""
+    return ds.dataset(
+        root,
+        schema=SNAPSHOT_SCHEMA,
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def load_snapshots(
+    root: str = DEFAULT_SNAPSHOT_DIR,
+    halls: Optional[Iterable[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> pa.Table:
+    """
+    Load snapshot rows, optionally filtered to some halls and an inclusive
+    date range (YYYY-MM-DD). Filters prune whole partitions, and only the
+    requested columns are read.
+    """
+    dataset = open_snapshots(root)
+    conditions = []
+    if halls:
+        conditions.append(pc.field("hall").isin(list(halls)))
+    if start_date:
+        conditions.append(pc.field("menu_date") >= date.fromisoformat(start_date))
+    if end_date:
+        conditions.append(pc.field("menu_date") <= date.fromisoformat(end_date))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    sort_keys = [(name, "ascending") for name in ("hall", "menu_date", "position") if name in table.column_names]
+    return table.sort_by(sort_keys) if sort_keys else table
+
+
+def table_to_menus(table: pa.Table) -> Dict[str, List[Dict]]:
+    """
+    Rebuild {hall: [menu entries]} from snapshot rows, in the same shape the
+    scraper produces, so they can go through parse_dining_hall_menu /
+    the menu ingest (menu_ingest / menu_pipeline) again without re-scraping
+    """
+    menus: Dict[str, List[Dict]] = {}
+    entries: Dict[tuple, Dict] = {}
+
+    for row in table.sort_by([("hall", "ascending"), ("menu_date", "ascending")]).to_pylist():
+        key = (row["hall"], row["menu_date"])
+        entry = entries.get(key)
+        if entry is None:
+            entry = {"date": row["date"], "location": row["location"], "meals": {}}
+            entries[key] = entry
+            menus.setdefault(row["hall"], []).append(entry)
+
+        item = {"name": row["name"], "nutrition": dict(row["nutrition"] or {})}
+        for field in ITEM_TEXT_FIELDS:
+            item[field] = row[field]
+        entry["meals"].setdefault(row["meal_type"], {}).setdefault(row["section"], []).append(item)
+
+    return menus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write or export Parquet menu snapshots")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    write = subcommands.add_parser("write", help="Snapshot a scraped menu file (JSON or NDJSON, optionally .gz/.zst)")
+    write.add_argument("menu_file", nargs="?", default="all_dining_halls_menus.ndjson")
+    write.add_argument("--root", default=DEFAULT_SNAPSHOT_DIR)
+
+    export = subcommands.add_parser("export", help="Export snapshots back to a menu file (.json, .ndjson, .ndjson.zst)")
+    export.add_argument("output")
+    export.add_argument("--root", default=DEFAULT_SNAPSHOT_DIR)
+    export.add_argument("--hall", action="append", dest="halls")
+    export.add_argument("--start-date")
+    export.add_argument("--end-date")
+
+    args = parser.parse_args()
+
+    if args.command == "write":
+        from menu_files import read_menu_file
+        menus = read_menu_file(args.menu_file)
+        rows = write_snapshot(menus, args.root)
+        print(f"Wrote {rows} items to {args.root}")
+    else:
+        from menu_files import MenuFileWriter
+        table = load_snapshots(args.root, args.halls, args.start_date, args.end_date)
+        with MenuFileWriter(args.output) as menu_file:
+            menu_file.write_menus(table_to_menus(table))
+        print(f"Exported {table.num_rows} items to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Nutrition Aggregation
+Vectorized nutrient totals over meal entries (servings x nutrient matrix with NumPy group-by)
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NUTRIENTS = (
+    "calories",
+    "total_fat",
+    "sodium",
+    "total_carb",
+    "dietary_fiber",
+    "sugars",
+    "protein",
+)
+
+GROUP_KEYS = ("day", "week", "meal_category", "user")
+
+TREND_BUCKETS = ("day", "week", "month")
+
+# A logged day counts toward goal adherence when within this fraction of the goal
+GOAL_TOLERANCE = 0.10
+
+# Columns needed to aggregate meal_entries rows (food details embedded from food_items)
+AGGREGATION_SELECT = "profile_id, entry_date, meal_category, servings, food_items(" + ", ".join(NUTRIENTS) + ")"
+
+
+def empty_totals() -> Dict[str, float]:
+    """Zero totals in the shape returned by get_daily_totals"""
+    totals = {name: 0.0 for name in NUTRIENTS}
+    totals["meal_count"] = 0
+    return totals
+
+
+class NutrientFrame:
+    """
+    Meal entries as column arrays
+
+    Nutrients are stored as an (entries x nutrients) float matrix and scaled by
+    servings once, so totals for any grouping are one pass of np.bincount per
+    nutrient regardless of how many entries, days or users are involved.
+    Missing nutrient values count as 0.
+    """
+
+    def __init__(
+        self,
+        profile_ids: np.ndarray,
+        dates: np.ndarray,
+        categories: np.ndarray,
+        servings: np.ndarray,
+        nutrients: np.ndarray,
+    ):
+        self.profile_ids = profile_ids
+        self.dates = dates
+        self.categories = categories
+        self.servings = servings
+        self.nutrients = nutrients
+        self._weighted: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.servings)
+
+    @classmethod
+    def _from_columns(cls, profile_ids: list, dates: list, categories: list, servings: list, nutrients: list) -> "NutrientFrame":
+        return cls(
+            profile_ids=np.array(profile_ids, dtype=object),
+            dates=np.array(dates, dtype="datetime64[D]"),
+            categories=np.array(categories, dtype=object),
+            servings=np.array(servings, dtype=np.float64).reshape(-1),
+            nutrients=np.array(nutrients, dtype=np.float64).reshape(-1, len(NUTRIENTS)),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "NutrientFrame":
+        """Build from raw meal_entries rows with food_items embedded (see AGGREGATION_SELECT)"""
+        profile_ids, dates, categories, servings, nutrients = [], [], [], [], []
+        for row in rows:
+            food = row.get("food_items") or {}
+            profile_ids.append(row["profile_id"])
+            dates.append(str(row["entry_date"])[:10])
+            categories.append(row["meal_category"])
+            servings.append(row.get("servings") or 1.0)
+            nutrients.append([food.get(name) or 0.0 for name in NUTRIENTS])
+        return cls._from_columns(profile_ids, dates, categories, servings, nutrients)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "NutrientFrame":
+        """Build from MealEntryResponse objects"""
+        profile_ids, dates, categories, servings, nutrients = [], [], [], [], []
+        for entry in entries:
+            profile_ids.append(entry.profile_id)
+            dates.append(str(entry.entry_date)[:10])
+            categories.append(entry.meal_category)
+            servings.append(entry.servings or 1.0)
+            nutrients.append([getattr(entry, name) or 0.0 for name in NUTRIENTS])
+        return cls._from_columns(profile_ids, dates, categories, servings, nutrients)
+
+    @property
+    def weighted(self) -> np.ndarray:
+        """Nutrients scaled by servings (entries x nutrients)"""
+        if self._weighted is None:
+            self._weighted = self.nutrients * self.servings[:, None]
+        return self._weighted
+
+    def week_starts(self) -> np.ndarray:
+        """Monday of each entry's ISO week"""
+        return _bucket_starts(self.dates, "week")
+
+    def _key_column(self, key: str) -> np.ndarray:
+        if key == "day":
+            return self.dates
+        if key == "week":
+            return self.week_starts()
+        if key == "meal_category":
+            return self.categories
+        if key == "user":
+            return self.profile_ids
+        raise ValueError(f"Unknown group key: {key}. Use one of: {', '.join(GROUP_KEYS)}")
+
+    def _group_index(self, keys: Sequence[str]) -> Tuple[List[tuple], np.ndarray]:
+        """Map every entry to a dense group index; returns (sorted group keys, index per entry)"""
+        codes = []
+        labels = []
+        for key in keys:
+            uniques, inverse = np.unique(self._key_column(key), return_inverse=True)
+            labels.append([str(value) for value in uniques])
+            codes.append((inverse.reshape(-1), len(uniques)))
+
+        if len(codes) == 1:
+            inverse, _ = codes[0]
+            return [(label,) for label in labels[0]], inverse
+
+        # Combine per-key codes into one integer code, then compact to the groups that occur
+        combined = np.zeros(len(self), dtype=np.int64)
+        for inverse, size in codes:
+            combined = combined * size + inverse
+        present, index = np.unique(combined, return_inverse=True)
+        groups = []
+        for code in present.tolist():
+            parts = []
+            for (_, size), key_labels in zip(reversed(codes), reversed(labels)):
+                code, part = divmod(code, size)
+                parts.append(key_labels[part])
+            groups.append(tuple(reversed(parts)))
+        return groups, index.reshape(-1)
+
+    def totals(self) -> Dict[str, float]:
+        """Totals over every entry"""
+        totals = empty_totals()
+        if len(self):
+            for name, value in zip(NUTRIENTS, self.weighted.sum(axis=0).tolist()):
+                totals[name] = value
+            totals["meal_count"] = len(self)
+        return totals
+
+    def group_totals(self, *keys: str) -> Dict:
+        """
+        Totals grouped by one or more of: day, week, meal_category, user
+
+        Single key:    {key_value: totals}
+        Several keys:  {(key_value, ...): totals}
+        Day and week keys are ISO date strings (week = its Monday).
+        """
+        if not keys:
+            raise ValueError("At least one group key is required")
+        if not len(self):
+            return {}
+
+        groups, index = self._group_index(keys)
+        size = len(groups)
+        weighted = self.weighted
+        sums = np.empty((size, len(NUTRIENTS)), dtype=np.float64)
+        for column in range(len(NUTRIENTS)):
+            sums[:, column] = np.bincount(index, weights=weighted[:, column], minlength=size)
+        counts = np.bincount(index, minlength=size)
+
+        result = {}
+        for group, row, count in zip(groups, sums.tolist(), counts.tolist()):
+            totals = dict(zip(NUTRIENTS, row))
+            totals["meal_count"] = count
+            result[group[0] if len(keys) == 1 else group] = totals
+        return result
+
+    def daily_matrix(self, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Dense per-day totals for every date in [start_date, end_date]
+
+        Returns (dates, sums, meal_counts): dates is datetime64[D] of length n_days,
+        sums is (n_days x nutrients) and meal_counts has the entries per day.
+        Entries outside the range are ignored.
+        """
+        start = np.datetime64(start_date, "D")
+        n_days = int((np.datetime64(end_date, "D") - start).astype(np.int64)) + 1
+        dates = start + np.arange(max(n_days, 0))
+
+        offsets = (self.dates - start).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < n_days)
+        offsets = offsets[in_range]
+        weighted = self.weighted[in_range]
+
+        sums = np.empty((len(dates), len(NUTRIENTS)), dtype=np.float64)
+        for column in range(len(NUTRIENTS)):
+            sums[:, column] = np.bincount(offsets, weights=weighted[:, column], minlength=len(dates))
+        meal_counts = np.bincount(offsets, minlength=len(dates))
+        return dates, sums, meal_counts
+
+    def totals_by_day(self) -> Dict[str, Dict[str, float]]:
+        return self.group_totals("day")
+
+    def totals_by_week(self) -> Dict[str, Dict[str, float]]:
+        return self.group_totals("week")
+
+    def totals_by_category(self) -> Dict[str, Dict[str, float]]:
+        return self.group_totals("meal_category")
+
+    def totals_by_user(self) -> Dict[str, Dict[str, float]]:
+        return self.group_totals("user")
+
+
+def _bucket_starts(dates: np.ndarray, bucket: str) -> np.ndarray:
+    if bucket == "day":
+        return dates
+    if bucket == "week":
+        # 1970-01-01 (day 0) was a Thursday
+        days = dates.astype(np.int64)
+        return (days - (days + 3) % 7).astype("datetime64[D]")
+    if bucket == "month":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unknown bucket: {bucket}. Use one of: {', '.join(TREND_BUCKETS)}")
+
+
+def summarize_trends(
+    frame: NutrientFrame,
+    start_date: str,
+    end_date: str,
+    bucket: str,
+    goals: Optional[Dict[str, float]] = None,
+    tolerance: float = GOAL_TOLERANCE,
+) -> List[Dict]:
+    """
+    Downsample a date range into day/week/month buckets
+
+    Per bucket: summed totals, averages per logged day (days with at least one entry)
+    and, for every nutrient with a goal, the fraction of logged days within
+    `tolerance` of that daily goal. Buckets are clipped to the range.
+    """
+    dates, sums, meal_counts = frame.daily_matrix(start_date, end_date)
+    if not len(dates):
+        return []
+
+    starts, index = np.unique(_bucket_starts(dates, bucket), return_inverse=True)
+    index = index.reshape(-1)
+    size = len(starts)
+    logged = meal_counts > 0
+
+    bucket_sums = np.empty((size, len(NUTRIENTS)), dtype=np.float64)
+    for column in range(len(NUTRIENTS)):
+        bucket_sums[:, column] = np.bincount(index, weights=sums[:, column], minlength=size)
+    bucket_meals = np.bincount(index, weights=meal_counts, minlength=size).astype(np.int64)
+    bucket_days = np.bincount(index, minlength=size)
+    bucket_logged = np.bincount(index, weights=logged, minlength=size).astype(np.int64)
+    averages = bucket_sums / np.maximum(bucket_logged, 1)[:, None]
+
+    adherence = {}
+    for name, goal in (goals or {}).items():
+        if not goal or name not in NUTRIENTS:
+            continue
+        daily = sums[:, NUTRIENTS.index(name)]
+        on_target = logged & (np.abs(daily - goal) <= tolerance * goal)
+        hits = np.bincount(index, weights=on_target, minlength=size)
+        adherence[name] = hits / np.maximum(bucket_logged, 1)
+
+    # Last date of each bucket: the day before the next bucket starts (or the range end)
+    first_day = np.searchsorted(index, np.arange(size))
+    last_day = np.append(first_day[1:] - 1, len(dates) - 1)
+
+    buckets = []
+    for i in range(size):
+        totals = {name: round(value, 1) for name, value in zip(NUTRIENTS, bucket_sums[i].tolist())}
+        totals["meal_count"] = int(bucket_meals[i])
+        buckets.append({
+            "start_date": str(dates[first_day[i]]),
+            "end_date": str(dates[last_day[i]]),
+            "days": int(bucket_days[i]),
+            "days_logged": int(bucket_logged[i]),
+            "totals": totals,
+            "averages": {name: round(value, 1) for name, value in zip(NUTRIENTS, averages[i].tolist())},
+            "goal_adherence": {name: round(float(values[i]), 3) for name, values in adherence.items()},
+        })
+    return buckets
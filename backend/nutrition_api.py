@@ -2,35 +2,38 @@
 Nutrition API - FastAPI Service
 Complete nutrition tracking API with meal logging, food database, and profile management
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Body
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Body, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List
 from datetime import datetime, timedelta
+import hmac
 import os
-import json
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
 from nutrition_models import (
     UserProfileCreate, UserProfileResponse, UserProfileUpdate,
-    FoodItemCreate, FoodItemResponse,
-    MealEntryCreate, MealEntryResponse, MealEntryUpdate,
-    DailyNutritionTotals, MealsByCategory, WeeklyMealHistory,
+    FoodItemCreate, FoodItemResponse, FoodItemPartialResponse, FOOD_ITEM_FIELDS,
+    MealEntryCreate, MealEntryResponse, MealEntryUpdate, MealEntryBatchCreate, MEAL_ENTRY_LIST_ADAPTER,
+    MealTemplateCreate, MealTemplateResponse, MealTemplateLogRequest,
+    DailyNutritionTotals, MealsByCategory, WeeklyMealHistory, NutritionReport, NutritionTrends,
     MenuUploadResponse
 )
-from nutrition_db import NutritionDatabase
-from nutrition_utils import (
-    load_dining_hall_menus_from_json,
-    parse_dining_hall_menu,
-    validate_menu_json
-)
+from nutrition_db import NutritionDatabase, meal_history_payload
+from nutrition_aggregation import GROUP_KEYS, TREND_BUCKETS
+from nutrition_utils import encode_cursor, decode_cursor, parse_fields_param
+from nutrition_parsing import MenuErrors, menu_rows
+from menu_ingest import MenuIngestError, detect_menu_format, ingest_menu_stream, iter_upload_chunks
+from menu_parallel import create_parse_pool
 
 load_dotenv()
 
 app = FastAPI(
     title="StudentEats Nutrition API",
     description="Nutrition tracking and meal logging API for college students",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -40,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize Supabase
@@ -50,7 +54,68 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-nutrition_db = NutritionDatabase(supabase)
+nutrition_db = NutritionDatabase(
+    supabase,
+    profile_cache_ttl=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "30")),
+    menu_version_ttl=float(os.getenv("MENU_VERSION_CACHE_SECONDS", "30")),
+    profile_cache_size=int(os.getenv("PROFILE_CACHE_SIZE", "1024"))
+)
+
+MENU_CACHE_MAX_AGE = int(os.getenv("MENU_CACHE_MAX_AGE_SECONDS", "300"))
+
+# Worker processes for parsing large menu uploads (0 or 1 parses in-process)
+menu_parse_pool = create_parse_pool(int(os.getenv("MENU_PARSE_WORKERS", "0")))
+
+
+# Meal payloads are already validated models when they leave NutritionDatabase, so they
+# are serialized here with their precompiled serializers. Returning the bytes directly
+# skips FastAPI's response_model re-validation; response_model still documents the schema.
+def _json_response(content, status_code: int = 200) -> Response:
+    """Serialize a model (or list of meal entries) straight to a JSON response"""
+    if isinstance(content, list):
+        body = MEAL_ENTRY_LIST_ADAPTER.dump_json(content)
+    else:
+        body = content.model_dump_json()
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+async def menu_cache_headers(request: Request, response: Response):
+    """
+    Conditional caching for menu data, which only changes when a menu is ingested
+    
+    The ETag is the menu version, so a matching If-None-Match is answered with 304
+    before the endpoint queries anything. Cache-Control lets browsers and proxies
+    reuse responses for MENU_CACHE_MAX_AGE seconds.
+    """
+    version = await nutrition_db.get_menu_version()
+    if version is None:
+        return
+    
+    headers = {
+        "ETag": f'W/"menu-{version}"',
+        "Cache-Control": f"public, max-age={MENU_CACHE_MAX_AGE}"
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def _meals_by_category(meals: dict) -> MealsByCategory:
+    return MealsByCategory(
+        Breakfast=meals["Breakfast"],
+        Lunch=meals["Lunch"],
+        Dinner=meals["Dinner"]
+    )
 
 
 # ==================== ROOT ====================
@@ -133,7 +198,7 @@ async def create_food_item(food: FoodItemCreate):
 # ==================== FOOD ITEM ENDPOINTS ====================
 # NOTE: Order matters! More specific routes must come before generic ones
 
-@app.get("/api/nutrition/food-items/search", response_model=List[FoodItemResponse])
+@app.get("/api/nutrition/food-items/search", response_model=List[FoodItemResponse], dependencies=[Depends(menu_cache_headers)])
 async def search_food_items(
     q: str = Query("", description="Search query (empty string returns all items)"),
     limit: int = Query(50, le=200),
@@ -146,7 +211,7 @@ async def search_food_items(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/nutrition/food-items/available-dates")
+@app.get("/api/nutrition/food-items/available-dates", dependencies=[Depends(menu_cache_headers)])
 async def get_available_dates():
     """Get list of dates that have food items available"""
     try:
@@ -155,7 +220,7 @@ async def get_available_dates():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/nutrition/food-items/location/{location}/date/{date}", response_model=dict)
+@app.get("/api/nutrition/food-items/location/{location}/date/{date}", response_model=dict, dependencies=[Depends(menu_cache_headers)])
 async def get_menu_by_location_date(location: str, date: str):
     """
     Get dining hall menu for a specific location and date
@@ -168,19 +233,46 @@ async def get_menu_by_location_date(location: str, date: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/nutrition/food-items", response_model=List[FoodItemResponse])
+@app.get(
+    "/api/nutrition/food-items",
+    response_model=List[FoodItemPartialResponse],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(menu_cache_headers)]
+)
 async def list_food_items(
-    limit: int = Query(100, le=500, description="Maximum number of items to return"),
-    offset: int = Query(0, ge=0, description="Number of items to skip")
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of items to return"),
+    offset: int = Query(0, ge=0, description="Number of items to skip (prefer cursor for deep pages)"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id and name are always included)")
 ):
-    """List all food items with pagination"""
+    """
+    List all food items ordered by name with pagination
+    
+    Pages are keyed on (name, id): pass the X-Next-Cursor header of one page as
+    `cursor` to get the next one. The header is omitted on the last page.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        field_list = parse_fields_param(fields, FOOD_ITEM_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        return await nutrition_db.list_food_items(limit=limit, offset=offset)
+        rows, next_key = await nutrition_db.list_food_items_page(
+            limit=limit, after=after, offset=offset, fields=field_list
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if next_key:
+        response.headers["X-Next-Cursor"] = encode_cursor(*next_key)
+    return rows
 
 
-@app.get("/api/nutrition/food-items/{food_id}", response_model=FoodItemResponse)
+@app.get("/api/nutrition/food-items/{food_id}", response_model=FoodItemResponse, dependencies=[Depends(menu_cache_headers)])
 async def get_food_item(food_id: int):
     """Get food item by ID"""
     food = await nutrition_db.get_food_item(food_id)
@@ -199,36 +291,47 @@ async def create_meal_entry(entry: MealEntryCreate):
     If entry_date is not provided, defaults to today
     """
     try:
-        # Validate that food item exists
-        food = await nutrition_db.get_food_item(entry.food_item_id)
-        if not food:
-            raise HTTPException(status_code=404, detail=f"Food item {entry.food_item_id} not found")
-        
-        result = await nutrition_db.create_meal_entry(entry)
-        return result
-    except HTTPException:
-        raise
+        # A missing food item surfaces as a foreign key violation from the insert
+        return _json_response(await nutrition_db.create_meal_entry(entry), status_code=201)
     except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
         import traceback
         print(f"ERROR in create_meal_entry: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to create meal entry: {str(e)}")
 
 
+@app.post("/api/nutrition/meals:batch", response_model=List[MealEntryResponse], status_code=201)
+async def create_meal_entries_batch(batch: MealEntryBatchCreate):
+    """
+    Log several meal entries (e.g. a full tray) in one request
+    
+    Items inherit the batch's entry_date (default today) and meal_category unless
+    they set their own. Returns 404 without writing anything if any food item is missing.
+    """
+    try:
+        return _json_response(await nutrition_db.create_meal_entries(batch), status_code=201)
+    except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Failed to create meal entries: {str(e)}")
+
+
 @app.get("/api/nutrition/meals/{entry_id}", response_model=MealEntryResponse)
 async def get_meal_entry(entry_id: int):
     """Get meal entry by ID with food details"""
     meal = await nutrition_db.get_meal_entry(entry_id)
     if not meal:
         raise HTTPException(status_code=404, detail=f"Meal entry {entry_id} not found")
-    return meal
+    return _json_response(meal)
 
 
 @app.patch("/api/nutrition/meals/{entry_id}", response_model=MealEntryResponse)
 async def update_meal_entry(entry_id: int, update: MealEntryUpdate):
     """Update meal entry servings"""
     try:
-        return await nutrition_db.update_meal_entry_servings(entry_id, update.servings)
+        return _json_response(await nutrition_db.update_meal_entry_servings(entry_id, update.servings))
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -250,11 +353,7 @@ async def get_todays_meals(user_id: str):
     today = datetime.now().date().isoformat()
     try:
         meals = await nutrition_db.get_meals_for_date(user_id, today)
-        return MealsByCategory(
-            Breakfast=meals["Breakfast"],
-            Lunch=meals["Lunch"],
-            Dinner=meals["Dinner"]
-        )
+        return _json_response(_meals_by_category(meals))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -268,11 +367,7 @@ async def get_meals_by_date(user_id: str, date: str):
     """
     try:
         meals = await nutrition_db.get_meals_for_date(user_id, date)
-        return MealsByCategory(
-            Breakfast=meals["Breakfast"],
-            Lunch=meals["Lunch"],
-            Dinner=meals["Dinner"]
-        )
+        return _json_response(_meals_by_category(meals))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -286,53 +381,64 @@ async def get_meal_history(
     Get meal history for a user
     
     Returns meals and daily totals for the specified number of days (default: 7)
+    
+    The payload is reshaped from the database rows and rendered with orjson,
+    without building a model per meal.
     """
     try:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days - 1)
+        start, end = start_date.isoformat(), end_date.isoformat()
         
-        meals_by_date = await nutrition_db.get_meals_date_range(
-            user_id,
-            start_date.isoformat(),
-            end_date.isoformat()
-        )
-        
-        # Calculate daily totals
-        daily_totals = {}
-        for date_str, meals in meals_by_date.items():
-            totals = await nutrition_db.get_daily_totals(user_id, date_str)
-            daily_totals[date_str] = DailyNutritionTotals(
-                date=date_str,
-                calories=totals["calories"],
-                total_fat=totals["total_fat"],
-                sodium=totals["sodium"],
-                total_carb=totals["total_carb"],
-                dietary_fiber=totals["dietary_fiber"],
-                sugars=totals["sugars"],
-                protein=totals["protein"],
-                meal_count=totals["meal_count"]
-            )
-        
-        # Convert meals to MealsByCategory format
-        formatted_meals = {}
-        for date_str, meals in meals_by_date.items():
-            formatted_meals[date_str] = MealsByCategory(
-                Breakfast=meals["Breakfast"],
-                Lunch=meals["Lunch"],
-                Dinner=meals["Dinner"]
-            )
-        
-        return WeeklyMealHistory(
-            profile_id=user_id,
-            start_date=start_date.isoformat(),
-            end_date=end_date.isoformat(),
-            meals_by_date=formatted_meals,
-            daily_totals=daily_totals
-        )
+        rows = await nutrition_db.get_meal_rows_range(user_id, start, end)
+        return ORJSONResponse(meal_history_payload(user_id, start, end, rows))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ==================== MEAL TEMPLATE ENDPOINTS ====================
+
+@app.post("/api/nutrition/meal-templates", response_model=MealTemplateResponse, status_code=201)
+async def create_meal_template(template: MealTemplateCreate):
+    """Save a named meal (set of food items and servings) for one-call logging"""
+    try:
+        return await nutrition_db.create_meal_template(template)
+    except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/nutrition/meal-templates/user/{user_id}", response_model=List[MealTemplateResponse])
+async def get_meal_templates(user_id: str):
+    """List a user's saved meal templates"""
+    try:
+        return await nutrition_db.get_meal_templates(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/api/nutrition/meal-templates/{template_id}")
+async def delete_meal_template(template_id: int):
+    """Delete a saved meal template"""
+    success = await nutrition_db.delete_meal_template(template_id)
+    if not success:
+        raise HTTPException(status_code=404, detail=f"Meal template {template_id} not found")
+    return {"message": f"Meal template {template_id} deleted successfully"}
+
+
+@app.post("/api/nutrition/meal-templates/{template_id}/log", response_model=List[MealEntryResponse], status_code=201)
+async def log_meal_template(template_id: int, request: Optional[MealTemplateLogRequest] = None):
+    """Log every item of a saved template as meal entries (defaults to today)"""
+    try:
+        entries = await nutrition_db.log_meal_template(template_id, request or MealTemplateLogRequest())
+        return _json_response(entries, status_code=201)
+    except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== NUTRITION TOTALS ENDPOINTS ====================
 
 @app.get("/api/nutrition/totals/user/{user_id}/today", response_model=DailyNutritionTotals)
@@ -380,12 +486,131 @@ async def get_daily_totals(user_id: str, date: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== REPORT ENDPOINTS ====================
+
+MAX_REPORT_DAYS = 366
+
+# Shared secret for cross-user endpoints; unset disables them
+ADMIN_API_KEY = os.getenv("NUTRITION_ADMIN_KEY")
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Allow the request only with an X-Admin-Key header matching NUTRITION_ADMIN_KEY"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (NUTRITION_ADMIN_KEY is not set)")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Key header")
+
+
+def _parse_report_params(start_date: Optional[str], end_date: Optional[str], group_by: str, allowed: tuple):
+    """Validate report query params; defaults to the last 7 days"""
+    try:
+        end = datetime.fromisoformat(end_date).date() if end_date else datetime.now().date()
+        start = datetime.fromisoformat(start_date).date() if start_date else end - timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end - start).days + 1 > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Reports cover at most {MAX_REPORT_DAYS} days")
+    
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    invalid = [key for key in keys if key not in allowed]
+    if invalid or len(set(keys)) != len(keys):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid group_by: {group_by}. Use a comma-separated list of: {', '.join(allowed)}"
+        )
+    return start.isoformat(), end.isoformat(), keys
+
+
+@app.get("/api/nutrition/reports/user/{user_id}", response_model=NutritionReport)
+async def get_user_nutrition_report(
+    user_id: str,
+    start_date: Optional[str] = Query(None, description="First date (YYYY-MM-DD), defaults to 6 days before end_date"),
+    end_date: Optional[str] = Query(None, description="Last date (YYYY-MM-DD), defaults to today"),
+    group_by: str = Query("day", description="Comma-separated: day, week, meal_category")
+):
+    """
+    Nutrient totals for one user over a date range
+    
+    Example: ?start_date=2025-10-01&end_date=2025-10-31&group_by=week,meal_category
+    """
+    start, end, keys = _parse_report_params(start_date, end_date, group_by, ("day", "week", "meal_category"))
+    try:
+        return await nutrition_db.get_nutrition_report(start, end, keys, profile_id=user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/nutrition/reports/all", response_model=NutritionReport, dependencies=[Depends(require_admin_key)])
+async def get_all_users_nutrition_report(
+    start_date: Optional[str] = Query(None, description="First date (YYYY-MM-DD), defaults to 6 days before end_date"),
+    end_date: Optional[str] = Query(None, description="Last date (YYYY-MM-DD), defaults to today"),
+    group_by: str = Query("user", description="Comma-separated: day, week, meal_category, user")
+):
+    """
+    Admin report: nutrient totals across every user over a date range
+    
+    Requires the X-Admin-Key header (NUTRITION_ADMIN_KEY).
+    
+    Example: ?group_by=user,week for per-user weekly totals
+    """
+    start, end, keys = _parse_report_params(start_date, end_date, group_by, GROUP_KEYS)
+    try:
+        return await nutrition_db.get_nutrition_report(start, end, keys)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+MAX_TREND_DAYS = 731
+
+
+@app.get("/api/nutrition/trends/user/{user_id}", response_model=NutritionTrends)
+async def get_nutrition_trends(
+    user_id: str,
+    period: str = Query("90d", alias="range", pattern=r"^\d+[dw]$", description="Period ending today, e.g. 30d, 12w, 365d"),
+    bucket: str = Query("week", description="Aggregation bucket: day, week or month"),
+    end_date: Optional[str] = Query(None, description="Last date (YYYY-MM-DD), defaults to today")
+):
+    """
+    Downsampled nutrition trend for charts
+    
+    Returns one compact bucket per day/week/month with summed totals, averages per
+    logged day and goal adherence (share of logged days within 10% of the profile's
+    daily goals). A year of weekly data is 53 buckets.
+    """
+    if bucket not in TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket: {bucket}. Use one of: {', '.join(TREND_BUCKETS)}")
+    
+    days = int(period[:-1]) * (7 if period.endswith("w") else 1)
+    if not 1 <= days <= MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"range must cover 1 to {MAX_TREND_DAYS} days")
+    
+    try:
+        end = datetime.fromisoformat(end_date).date() if end_date else datetime.now().date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="end_date must be in YYYY-MM-DD format")
+    start = end - timedelta(days=days - 1)
+    
+    try:
+        return await nutrition_db.get_nutrition_trends(user_id, start.isoformat(), end.isoformat(), bucket)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== MENU UPLOAD ENDPOINTS ====================
 
 @app.post("/api/nutrition/upload-menu", response_model=MenuUploadResponse)
-async def upload_menu_json(file: UploadFile = File(...)):
+async def upload_menu_json(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Override format detection")
+):
     """
-    Upload dining hall menu data from JSON file
+    Upload dining hall menu data from a JSON or NDJSON file
+    
+    Files may be gzip or zstd compressed. The upload is parsed incrementally and
+    written in batches, so large multi-week archives do not need to fit in memory.
     
     Expected JSON structure:
     {
@@ -400,45 +625,71 @@ async def upload_menu_json(file: UploadFile = File(...)):
             }
         ]
     }
+    
+    NDJSON (.ndjson/.jsonl, e.g. the scraper's all_dining_halls_menus.ndjson.zst): one
+    {"hall": "Dining Hall Name", "date": ..., "meals": {...}} per line. Files named
+    neither way are detected from their first bytes.
+    """
+    fmt = format or detect_menu_format(file.filename, file.content_type, default=None)
+    return await _ingest_menu_upload(iter_upload_chunks(file), fmt)
+
+
+@app.post("/api/nutrition/upload-menu/stream", response_model=MenuUploadResponse)
+async def upload_menu_stream(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Override format detection")
+):
+    """
+    Upload dining hall menu data as a raw request body
+    
+    Same formats as /api/nutrition/upload-menu, but batches are written while the
+    body is still being received. Use Content-Encoding (gzip/zstd) or send the
+    compressed bytes directly, and Content-Type application/x-ndjson for NDJSON
+    (other content types are detected from the first bytes of the body).
     """
+    fmt = format or detect_menu_format(content_type=request.headers.get("content-type"), default=None)
+    return await _ingest_menu_upload(
+        request.stream(),
+        fmt,
+        content_encoding=request.headers.get("content-encoding")
+    )
+
+
+async def _ingest_menu_upload(chunks, fmt: Optional[str], content_encoding: Optional[str] = None) -> MenuUploadResponse:
+    """Run a streaming menu ingest and map its result/errors onto the upload response"""
     try:
-        # Read and parse JSON
-        content = await file.read()
-        json_data = json.loads(content)
-        
-        # Validate structure
-        is_valid, errors = validate_menu_json(json_data)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail={"message": "Invalid JSON structure", "errors": errors})
-        
-        # Parse food items
-        food_items = load_dining_hall_menus_from_json(json_data)
-        
-        # Insert items into database
-        items_created = 0
-        items_updated = 0
-        upload_errors = []
-        
-        for food_item in food_items:
-            try:
-                result = await nutrition_db.create_food_item(food_item)
-                if result:
-                    items_created += 1
-            except Exception as e:
-                items_updated += 1  # Likely a duplicate, which is fine
-        
-        return MenuUploadResponse(
-            success=True,
-            items_processed=len(food_items),
-            items_created=items_created,
-            items_updated=items_updated,
-            errors=upload_errors
+        result = await ingest_menu_stream(
+            chunks, nutrition_db, fmt=fmt, content_encoding=content_encoding, executor=menu_parse_pool
         )
-    
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file")
+    except MenuIngestError as e:
+        # Earlier batches may already be written, so say what was
+        progress = e.progress
+        raise HTTPException(status_code=400, detail={
+            "message": "Invalid menu upload" + (" (partially loaded)" if e.partial else ""),
+            "errors": [str(e)],
+            "partial": e.partial,
+            "entries_read": progress["entries"],
+            "committed": {
+                "items_created": progress["inserted"],
+                "items_updated": progress["updated"],
+                "items_unchanged": progress["unchanged"],
+                "items_deleted": progress["deleted"],
+            },
+        })
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail={"message": "Invalid menu upload", "errors": [str(e)]})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return MenuUploadResponse(
+        success=not result["errors"],
+        items_processed=result["items_processed"],
+        items_created=result["inserted"],
+        items_updated=result["updated"],
+        items_unchanged=result["unchanged"],
+        items_deleted=result["deleted"],
+        errors=result["errors"]
+    )
 
 
 @app.post("/api/nutrition/upload-menu/location", response_model=MenuUploadResponse)
@@ -456,29 +707,24 @@ async def upload_location_menu(location: str, menu_data: dict = Body(...)):
         }
     }
     """
+    # Validate and parse in one pass; any problem rejects the upload
+    errors = MenuErrors()
+    rows = menu_rows(menu_data, location, errors)
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "Invalid menu upload", "errors": errors.as_list()})
+    
     try:
-        # Parse food items
-        food_items = parse_dining_hall_menu(menu_data, location)
-        
-        # Insert items into database
-        items_created = 0
-        items_updated = 0
-        upload_errors = []
-        
-        for food_item in food_items:
-            try:
-                result = await nutrition_db.create_food_item(food_item)
-                if result:
-                    items_created += 1
-            except Exception as e:
-                items_updated += 1
+        # Write only new/changed items; items dropped from these meals are removed
+        summary = await nutrition_db.sync_menu_items(rows)
         
         return MenuUploadResponse(
             success=True,
-            items_processed=len(food_items),
-            items_created=items_created,
-            items_updated=items_updated,
-            errors=upload_errors
+            items_processed=len(rows),
+            items_created=summary["inserted"],
+            items_updated=summary["updated"],
+            items_unchanged=summary["unchanged"],
+            items_deleted=summary["deleted"],
+            errors=[]
         )
     
     except Exception as e:
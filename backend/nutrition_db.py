@@ -2,22 +2,210 @@
 Nutrition Database Interface
 All database operations for nutrition tracking
 """
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import re
+import time
+from postgrest import APIError
 from supabase import Client
 from nutrition_models import (
     UserProfileCreate, UserProfileResponse, UserProfileUpdate,
     FoodItemCreate, FoodItemResponse,
-    MealEntryCreate, MealEntryResponse,
+    MealEntryCreate, MealEntryResponse, MEAL_ENTRY_LIST_ADAPTER,
+    MealEntryBatchCreate, MealEntryBatchItem,
+    MealTemplateCreate, MealTemplateResponse, MealTemplateLogRequest,
+    NutritionTotals, NutritionReportGroup, NutritionReport, NutritionTrends,
     calculate_user_metrics
 )
+from nutrition_aggregation import NutrientFrame, AGGREGATION_SELECT, empty_totals, summarize_trends
+from menu_diff import sync_food_items
+
+
+MEAL_ENTRY_SELECT = "*, food_items(*)"
+
+# profiles goal column -> nutrient it targets
+PROFILE_GOAL_COLUMNS = {
+    "goal_calories": "calories",
+    "goal_protein": "protein",
+    "goal_carbs": "total_carb",
+    "goal_fat": "total_fat",
+}
+AGGREGATION_PAGE_SIZE = 1000  # PostgREST's default max rows per request
+
+_FOREIGN_KEY_VIOLATION = "23503"
+_MISSING_KEY_RE = re.compile(r"Key \((\w+)\)=\(([^)]*)\)")
+
+
+def _returning(query, columns: str):
+    """
+    Make an insert/update return the written rows with `columns` (embeds included)
+    
+    Sets PostgREST's select parameter on the write itself, so the joined row comes
+    back in the same response instead of needing a follow-up read.
+    """
+    query.request.params = query.request.params.set("select", columns)
+    return query
+
+
+def _missing_reference_error(e: APIError) -> Optional[Exception]:
+    """Turn a foreign key violation from PostgREST into a "... not found" error"""
+    if e.code != _FOREIGN_KEY_VIOLATION:
+        return None
+    match = _MISSING_KEY_RE.search(e.details or "")
+    if not match:
+        return Exception(f"Referenced row not found: {e.details or e.message}")
+    column, value = match.groups()
+    if column == "food_item_id":
+        return Exception(f"Food item {value} not found")
+    if column == "profile_id":
+        return Exception(f"Profile {value} not found")
+    return Exception(f"{column} {value} not found")
+
+
+def _quote_filter_value(value: str) -> str:
+    """Quote a value for a PostgREST or=() filter (names may contain commas, dots and parentheses)"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def profile_from_row(data: Dict) -> UserProfileResponse:
+    """
+    Build a UserProfileResponse from a raw `profiles` row
+    
+    Fills defaults for unset fields and computes BMR/TDEE when they are not stored.
+    """
+    # Get imperial values from database
+    height_inches = data.get("height_inches")
+    weight_lbs = data.get("weight_lbs")
+
+    # Convert to metric (cm and kg)
+    height_cm = float(height_inches) * 2.54 if height_inches else None
+    weight_kg = float(weight_lbs) / 2.20462 if weight_lbs else None
+    
+    # Get age, sex, activity_level with defaults if None
+    age = data.get("age") or 25  # Default age if not set
+    sex = data.get("sex") or "Other"
+    activity_level = data.get("activity_level") or 2  # Default to light activity
+    
+    # Use BMR/TDEE from database if available, otherwise calculate
+    bmr = float(data.get("bmr")) if data.get("bmr") else 0.0
+    tdee = float(data.get("tdee")) if data.get("tdee") else 0.0
+    
+    # If height and weight are available but BMR/TDEE aren't, calculate them
+    if height_cm and weight_kg and (bmr == 0.0 or tdee == 0.0):
+        bmr, tdee = calculate_user_metrics(weight_kg, height_cm, age, sex, activity_level)
+    
+    # If height_cm or weight_kg are None, use default values
+    if height_cm is None:
+        height_cm = 170.0  # Default height
+    if weight_kg is None:
+        weight_kg = 70.0  # Default weight
+    
+    return UserProfileResponse(
+        id=data["id"],
+        email=data.get("email"),
+        full_name=data.get("full_name"),
+        age=age,
+        sex=sex,
+        height_cm=height_cm,
+        weight_kg=weight_kg,
+        activity_level=activity_level,
+        bmr=bmr,
+        tdee=tdee,
+        created_at=data.get("created_at")
+    )
+
+
+def meal_entry_fields(data: Dict, food_data: Optional[Dict] = None) -> Dict:
+    """Flatten a meal_entries row and its food_items row (embedded or given) into MealEntryResponse fields"""
+    if food_data is None:
+        food_data = data.get("food_items") or {}
+    
+    return {
+        "id": data["id"],
+        "profile_id": data["profile_id"],
+        "food_item_id": data["food_item_id"],
+        "entry_date": data["entry_date"],
+        "meal_category": data["meal_category"],
+        "servings": data["servings"],
+        "created_at": data.get("created_at"),
+        "food_name": food_data.get("name"),
+        "serving_size": food_data.get("serving_size"),
+        "calories": food_data.get("calories"),
+        "total_fat": food_data.get("total_fat"),
+        "sodium": food_data.get("sodium"),
+        "total_carb": food_data.get("total_carb"),
+        "dietary_fiber": food_data.get("dietary_fiber"),
+        "sugars": food_data.get("sugars"),
+        "protein": food_data.get("protein"),
+        "location": food_data.get("location")
+    }
+
+
+def meal_entry_from_row(data: Dict, food_data: Optional[Dict] = None) -> MealEntryResponse:
+    """Build a MealEntryResponse from a meal_entries row and its food_items row (embedded or given)"""
+    return MealEntryResponse.model_validate(meal_entry_fields(data, food_data))
+
+
+def meal_entries_from_rows(rows: List[Dict]) -> List[MealEntryResponse]:
+    """Build MealEntryResponses for many rows with a single validator call"""
+    return MEAL_ENTRY_LIST_ADAPTER.validate_python([meal_entry_fields(row) for row in rows])
+
+
+def meal_history_payload(profile_id: str, start_date: str, end_date: str, rows: List[Dict]) -> Dict:
+    """
+    WeeklyMealHistory-shaped dict built straight from meal_entries rows
+    
+    Skips model construction for every meal: the rows are only reshaped, and daily
+    totals come from one NutrientFrame over the same rows.
+    """
+    meals_by_date = {}
+    current_date = datetime.fromisoformat(start_date).date()
+    end = datetime.fromisoformat(end_date).date()
+    while current_date <= end:
+        meals_by_date[current_date.isoformat()] = {"Breakfast": [], "Lunch": [], "Dinner": []}
+        current_date += timedelta(days=1)
+    
+    for row in rows:
+        meals_by_date[row["entry_date"][:10]][row["meal_category"]].append(meal_entry_fields(row))
+    
+    totals_by_day = NutrientFrame.from_rows(rows).totals_by_day()
+    return {
+        "profile_id": profile_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "meals_by_date": meals_by_date,
+        "daily_totals": {
+            date_str: {"date": date_str, **(totals_by_day.get(date_str) or empty_totals())}
+            for date_str in meals_by_date
+        }
+    }
 
 
 class NutritionDatabase:
     """Database interface for nutrition operations"""
     
-    def __init__(self, supabase_client: Client):
+    def __init__(
+        self,
+        supabase_client: Client,
+        profile_cache_ttl: float = 30.0,
+        menu_version_ttl: float = 30.0,
+        profile_cache_size: int = 1024,
+    ):
         self.client = supabase_client
+        # user_id -> (expires_at, profile), least recently used first. Writes through
+        # this class refresh the entry; the short TTL bounds staleness for writes made
+        # elsewhere (the frontend updates `profiles` directly). At most
+        # profile_cache_size profiles are kept, so memory does not grow with every
+        # user the API has ever seen.
+        self.profile_cache_ttl = profile_cache_ttl
+        self.profile_cache_size = profile_cache_size
+        self._profile_cache: "OrderedDict[str, Tuple[float, UserProfileResponse]]" = OrderedDict()
+        # (expires_at, version). A trigger bumps menu_version on every food_items write,
+        # including the Lambda ingest; writes through this class drop the cached value.
+        self.menu_version_ttl = menu_version_ttl
+        self._menu_version: Optional[Tuple[float, Optional[int]]] = None
     
     # ==================== USER/PROFILE OPERATIONS ====================
     
@@ -55,6 +243,7 @@ class NutritionDatabase:
         
         if response.data:
             result = response.data[0]
+            self._cache_profile(profile_from_row(result))
             return UserProfileResponse(
                 id=result["id"],
                 email=result.get("email"),
@@ -72,56 +261,32 @@ class NutritionDatabase:
         raise Exception("Failed to create/update profile")
     
     async def get_profile(self, user_id: str) -> Optional[UserProfileResponse]:
-        """Get user profile by ID"""
+        """Get user profile by ID (served from the profile cache while fresh)"""
+        cached = self._profile_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            self._profile_cache.move_to_end(user_id)
+            return cached[1]
+        
         response = self.client.table("profiles").select("*").eq("id", user_id).execute()
         
         if response.data:
-            data = response.data[0]
-            
-            # Get imperial values from database
-            height_inches = data.get("height_inches")
-            weight_lbs = data.get("weight_lbs")
-
-            # Convert to metric (cm and kg)
-            height_cm = float(height_inches) * 2.54 if height_inches else None
-            weight_kg = float(weight_lbs) / 2.20462 if weight_lbs else None
-            
-            # Get age, sex, activity_level with defaults if None
-            age = data.get("age") or 25  # Default age if not set
-            sex = data.get("sex") or "Other"
-            activity_level = data.get("activity_level") or 2  # Default to light activity
-            
-            # Use BMR/TDEE from database if available, otherwise calculate
-            bmr = float(data.get("bmr")) if data.get("bmr") else 0.0
-            tdee = float(data.get("tdee")) if data.get("tdee") else 0.0
-            
-            # If height and weight are available but BMR/TDEE aren't, calculate them
-            if height_cm and weight_kg and (bmr == 0.0 or tdee == 0.0):
-                from nutrition_models import calculate_user_metrics
-                bmr, tdee = calculate_user_metrics(weight_kg, height_cm, age, sex, activity_level)
-            
-            # If height_cm or weight_kg are None, use default values
-            if height_cm is None:
-                height_cm = 170.0  # Default height
-            if weight_kg is None:
-                weight_kg = 70.0  # Default weight
-            
-            return UserProfileResponse(
-                id=data["id"],
-                email=data.get("email"),
-                full_name=data.get("full_name"),
-                age=age,
-                sex=sex,
-                height_cm=height_cm,
-                weight_kg=weight_kg,
-                activity_level=activity_level,
-                bmr=bmr,
-                tdee=tdee,
-                created_at=data.get("created_at")
-            )
+            return self._cache_profile(profile_from_row(response.data[0]))
         
+        self.invalidate_profile(user_id)
         return None
     
+    def _cache_profile(self, profile: UserProfileResponse) -> UserProfileResponse:
+        """Store a profile (with its computed BMR/TDEE) in the cache, evicting the least recently used"""
+        self._profile_cache[profile.id] = (time.monotonic() + self.profile_cache_ttl, profile)
+        self._profile_cache.move_to_end(profile.id)
+        while len(self._profile_cache) > max(self.profile_cache_size, 0):
+            self._profile_cache.popitem(last=False)
+        return profile
+    
+    def invalidate_profile(self, user_id: str):
+        """Drop a cached profile, e.g. after it was written outside this service"""
+        self._profile_cache.pop(user_id, None)
+    
     async def update_profile(self, user_id: str, updates: UserProfileUpdate) -> UserProfileResponse:
         """Update specific fields of user profile"""
         # Get current profile
@@ -165,25 +330,37 @@ class NutritionDatabase:
         response = self.client.table("profiles").update(data).eq("id", user_id).execute()
         
         if response.data:
-            result = response.data[0]
-            return UserProfileResponse(
-                id=result["id"],
-                email=result.get("email"),
-                full_name=result.get("full_name"),
-                age=result["age"],
-                sex=result["sex"],
-                height_cm=result["height_cm"],
-                weight_kg=result["weight_kg"],
-                activity_level=result["activity_level"],
-                bmr=result["bmr"],
-                tdee=result["tdee"],
-                created_at=result.get("created_at")
-            )
+            return self._cache_profile(profile_from_row(response.data[0]))
         
+        self.invalidate_profile(user_id)
         raise Exception("Failed to update profile")
     
     # ==================== FOOD ITEM OPERATIONS ====================
     
+    async def get_menu_version(self) -> Optional[int]:
+        """
+        Current menu version (bumped by every food_items write), cached briefly
+        
+        Returns None when the menu_version table is unavailable, so callers can
+        skip conditional caching instead of failing.
+        """
+        cached = self._menu_version
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        try:
+            response = self.client.table("menu_version").select("version").limit(1).execute()
+            version = response.data[0]["version"] if response.data else None
+        except Exception:
+            version = None
+        
+        self._menu_version = (time.monotonic() + self.menu_version_ttl, version)
+        return version
+    
+    def invalidate_menu_version(self):
+        """Forget the cached menu version, e.g. after an ingest"""
+        self._menu_version = None
+    
     async def create_food_item(self, food: FoodItemCreate) -> FoodItemResponse:
         """Create a new food item or return existing if duplicate"""
         data = {
@@ -204,6 +381,7 @@ class NutritionDatabase:
         # Try to insert, if duplicate exists, get existing
         try:
             response = self.client.table("food_items").insert(data).execute()
+            self.invalidate_menu_version()
             if response.data:
                 item = response.data[0]
                 return FoodItemResponse(**item)
@@ -221,7 +399,21 @@ class NutritionDatabase:
                     return FoodItemResponse(**item)
         
         raise Exception(f"Failed to create food item: {food.name}")
-    
+
+    async def sync_menu_items(self, rows: List[Dict]) -> Dict[str, int]:
+        """
+        Write scraped menu items (food_items rows from menu_rows), touching only rows whose content changed
+
+        Items are compared by content hash with what is stored for the same
+        (location, date, meal_type) menus: new and changed items are upserted,
+        items no longer on those menus are deleted and unchanged ones are skipped.
+        Returns {"inserted", "updated", "unchanged", "deleted"} counts.
+        """
+        summary = sync_food_items(self.client, rows)
+        if summary["inserted"] or summary["updated"] or summary["deleted"]:
+            self.invalidate_menu_version()
+        return summary
+
     async def get_food_item(self, food_id: int) -> Optional[FoodItemResponse]:
         """Get food item by ID"""
         response = self.client.table("food_items").select("*").eq("id", food_id).execute()
@@ -280,9 +472,40 @@ class NutritionDatabase:
     
     async def list_food_items(self, limit: int = 100, offset: int = 0) -> List[FoodItemResponse]:
         """List all food items with pagination"""
-        response = self.client.table("food_items").select("*").order("name").limit(limit).offset(offset).execute()
+        response = self.client.table("food_items").select("*").order("name").order("id").limit(limit).offset(offset).execute()
         return [FoodItemResponse(**item) for item in response.data]
     
+    async def list_food_items_page(
+        self,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None,
+        offset: int = 0,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """
+        List food items ordered by (name, id) with keyset pagination
+        
+        `after` is the (name, id) of the last row of the previous page, so each page is
+        an index range scan instead of scanning and discarding `offset` rows.
+        `fields` limits the projected columns (id and name are always included).
+        Returns (rows, key of the last row if the page is full, else None).
+        """
+        columns = ",".join(dict.fromkeys(["id", "name", *fields])) if fields else "*"
+        query = self.client.table("food_items").select(columns)
+        
+        if after:
+            name, item_id = after
+            quoted = _quote_filter_value(name)
+            query = query.or_(f"name.gt.{quoted},and(name.eq.{quoted},id.gt.{int(item_id)})")
+        elif offset:
+            query = query.offset(offset)
+        
+        response = query.order("name").order("id").limit(limit).execute()
+        rows = response.data
+        
+        next_key = (rows[-1]["name"], rows[-1]["id"]) if rows and len(rows) == limit else None
+        return rows, next_key
+    
     # ==================== MEAL ENTRY OPERATIONS ====================
     
     async def create_meal_entry(self, entry: MealEntryCreate) -> MealEntryResponse:
@@ -298,107 +521,101 @@ class NutritionDatabase:
             "servings": entry.servings
         }
         
-        response = self.client.table("meal_entries").insert(data).execute()
+        response = self._write_meal_entries(self.client.table("meal_entries").insert(data))
         if not response.data:
             raise Exception("Failed to create meal entry")
         
-        meal_entry = response.data[0]
+        return meal_entry_from_row(response.data[0])
+    
+    async def create_meal_entries(self, batch: MealEntryBatchCreate) -> List[MealEntryResponse]:
+        """
+        Log several meal entries at once
+        
+        Every entry is written with one multi-row insert that returns the rows with
+        their food details embedded, in the order of batch.items. A missing food item
+        fails the whole insert.
+        """
+        default_date = batch.entry_date or datetime.now().date().isoformat()
+        rows = [
+            {
+                "profile_id": batch.profile_id,
+                "food_item_id": item.food_item_id,
+                "entry_date": item.entry_date or default_date,
+                "meal_category": item.meal_category or batch.meal_category,
+                "servings": item.servings
+            }
+            for item in batch.items
+        ]
+        
+        response = self._write_meal_entries(self.client.table("meal_entries").insert(rows))
+        if not response.data:
+            raise Exception("Failed to create meal entries")
+        
+        return meal_entries_from_rows(response.data)
+    
+    def _write_meal_entries(self, query):
+        """Execute a meal_entries insert/update returning the rows joined with food_items"""
+        try:
+            return _returning(query, MEAL_ENTRY_SELECT).execute()
+        except APIError as e:
+            error = _missing_reference_error(e)
+            if error:
+                raise error from e
+            raise
+    
+    async def _get_food_items_by_ids(self, food_ids: List[int]) -> Dict[int, Dict]:
+        """Fetch food rows by ID in one query; raises if any ID does not exist"""
+        unique_ids = sorted(set(food_ids))
+        response = self.client.table("food_items").select("*").in_("id", unique_ids).execute()
+        foods = {food["id"]: food for food in response.data}
+        
+        missing = [food_id for food_id in unique_ids if food_id not in foods]
+        if missing:
+            raise Exception(f"Food items not found: {', '.join(str(food_id) for food_id in missing)}")
         
-        # Fetch with food item details
-        return await self.get_meal_entry(meal_entry["id"])
+        return foods
     
     async def get_meal_entry(self, entry_id: int) -> Optional[MealEntryResponse]:
         """Get meal entry by ID with food details"""
         response = self.client.table("meal_entries").select(
-            "*, food_items(*)"
+            MEAL_ENTRY_SELECT
         ).eq("id", entry_id).execute()
         
         if response.data:
-            data = response.data[0]
-            food_data = data.get("food_items", {})
-            
-            return MealEntryResponse(
-                id=data["id"],
-                profile_id=data["profile_id"],
-                food_item_id=data["food_item_id"],
-                entry_date=data["entry_date"],
-                meal_category=data["meal_category"],
-                servings=data["servings"],
-                created_at=data.get("created_at"),
-                food_name=food_data.get("name"),
-                serving_size=food_data.get("serving_size"),
-                calories=food_data.get("calories"),
-                total_fat=food_data.get("total_fat"),
-                sodium=food_data.get("sodium"),
-                total_carb=food_data.get("total_carb"),
-                dietary_fiber=food_data.get("dietary_fiber"),
-                sugars=food_data.get("sugars"),
-                protein=food_data.get("protein"),
-                location=food_data.get("location")
-            )
+            return meal_entry_from_row(response.data[0])
         
         return None
     
     async def get_meals_for_date(self, profile_id: str, date: str) -> Dict[str, List[MealEntryResponse]]:
         """Get all meals for a profile on a specific date, grouped by meal category"""
         response = self.client.table("meal_entries").select(
-            "*, food_items(*)"
+            MEAL_ENTRY_SELECT
         ).eq("profile_id", profile_id).eq("entry_date", date).execute()
         
         meals_by_category = {"Breakfast": [], "Lunch": [], "Dinner": []}
         
-        for data in response.data:
-            food_data = data.get("food_items", {})
-            
-            entry = MealEntryResponse(
-                id=data["id"],
-                profile_id=data["profile_id"],
-                food_item_id=data["food_item_id"],
-                entry_date=data["entry_date"],
-                meal_category=data["meal_category"],
-                servings=data["servings"],
-                created_at=data.get("created_at"),
-                food_name=food_data.get("name"),
-                serving_size=food_data.get("serving_size"),
-                calories=food_data.get("calories"),
-                total_fat=food_data.get("total_fat"),
-                sodium=food_data.get("sodium"),
-                total_carb=food_data.get("total_carb"),
-                dietary_fiber=food_data.get("dietary_fiber"),
-                sugars=food_data.get("sugars"),
-                protein=food_data.get("protein"),
-                location=food_data.get("location")
-            )
-            
+        for entry in meal_entries_from_rows(response.data):
             meals_by_category[entry.meal_category].append(entry)
         
         return meals_by_category
     
-    async def get_meals_date_range(self, profile_id: str, start_date: str, end_date: str) -> Dict[str, Dict[str, List[MealEntryResponse]]]:
-        """Get meals for a date range"""
-        result = {}
-        
-        start = datetime.fromisoformat(start_date).date()
-        end = datetime.fromisoformat(end_date).date()
-        
-        current_date = start
-        while current_date <= end:
-            date_str = current_date.isoformat()
-            result[date_str] = await self.get_meals_for_date(profile_id, date_str)
-            current_date += timedelta(days=1)
-        
-        return result
+    async def get_meal_rows_range(self, profile_id: str, start_date: str, end_date: str) -> List[Dict]:
+        """Raw meal_entries rows (food_items embedded) for a date range, in one query"""
+        response = self.client.table("meal_entries").select(
+            MEAL_ENTRY_SELECT
+        ).eq("profile_id", profile_id).gte("entry_date", start_date).lte("entry_date", end_date).order("id").execute()
+        return response.data
     
     async def update_meal_entry_servings(self, entry_id: int, servings: float) -> MealEntryResponse:
         """Update servings for a meal entry"""
-        response = self.client.table("meal_entries").update(
-            {"servings": servings}
-        ).eq("id", entry_id).execute()
+        response = self._write_meal_entries(
+            self.client.table("meal_entries").update({"servings": servings}).eq("id", entry_id)
+        )
         
         if not response.data:
             raise Exception(f"Meal entry {entry_id} not found")
         
-        return await self.get_meal_entry(entry_id)
+        return meal_entry_from_row(response.data[0])
     
     async def delete_meal_entry(self, entry_id: int) -> bool:
         """Delete a meal entry"""
@@ -407,29 +624,135 @@ class NutritionDatabase:
     
     async def get_daily_totals(self, profile_id: str, date: str) -> Dict[str, float]:
         """Calculate total nutrition for a profile on a specific date"""
-        meals = await self.get_meals_for_date(profile_id, date)
-        
-        totals = {
-            "calories": 0.0,
-            "total_fat": 0.0,
-            "sodium": 0.0,
-            "total_carb": 0.0,
-            "dietary_fiber": 0.0,
-            "sugars": 0.0,
-            "protein": 0.0,
-            "meal_count": 0
+        frame = await self.get_nutrient_frame(date, date, profile_id=profile_id)
+        return frame.totals()
+    
+    async def get_nutrient_frame(self, start_date: str, end_date: str, profile_id: Optional[str] = None) -> NutrientFrame:
+        """
+        Load meal entries in a date range as a NutrientFrame for aggregation
+        
+        Only the columns needed for totals are fetched. Without profile_id every
+        user's entries are loaded (admin reports), paging past PostgREST's row limit.
+        """
+        rows = []
+        offset = 0
+        while True:
+            query = self.client.table("meal_entries").select(AGGREGATION_SELECT)
+            if profile_id:
+                query = query.eq("profile_id", profile_id)
+            response = query.gte("entry_date", start_date).lte("entry_date", end_date).order(
+                "id"
+            ).range(offset, offset + AGGREGATION_PAGE_SIZE - 1).execute()
+            
+            rows.extend(response.data)
+            if len(response.data) < AGGREGATION_PAGE_SIZE:
+                break
+            offset += AGGREGATION_PAGE_SIZE
+        
+        return NutrientFrame.from_rows(rows)
+    
+    async def get_nutrition_report(
+        self,
+        start_date: str,
+        end_date: str,
+        group_by: List[str],
+        profile_id: Optional[str] = None
+    ) -> NutritionReport:
+        """
+        Nutrient totals over a date range grouped by any of: day, week, meal_category, user
+        
+        Covers every user when profile_id is not given.
+        """
+        frame = await self.get_nutrient_frame(start_date, end_date, profile_id=profile_id)
+        grouped = frame.group_totals(*group_by) if group_by else {}
+        
+        groups = []
+        for key, totals in grouped.items():
+            values = key if isinstance(key, tuple) else (key,)
+            groups.append(NutritionReportGroup(group=dict(zip(group_by, values)), **totals))
+        
+        return NutritionReport(
+            profile_id=profile_id,
+            start_date=start_date,
+            end_date=end_date,
+            group_by=group_by,
+            totals=NutritionTotals(**frame.totals()),
+            groups=groups
+        )
+    
+    async def get_nutrition_goals(self, profile_id: str) -> Dict[str, float]:
+        """Daily nutrient goals from the profile; the calorie goal falls back to TDEE"""
+        response = self.client.table("profiles").select("*").eq("id", profile_id).execute()
+        if not response.data:
+            return {}
+        
+        row = response.data[0]
+        goals = {
+            nutrient: float(row[column])
+            for column, nutrient in PROFILE_GOAL_COLUMNS.items()
+            if row.get(column)
         }
+        if "calories" not in goals:
+            tdee = self._cache_profile(profile_from_row(row)).tdee
+            if tdee:
+                goals["calories"] = round(tdee)
+        return goals
+    
+    async def get_nutrition_trends(self, profile_id: str, start_date: str, end_date: str, bucket: str) -> NutritionTrends:
+        """Per-bucket sums, averages and goal adherence over a date range"""
+        goals = await self.get_nutrition_goals(profile_id)
+        frame = await self.get_nutrient_frame(start_date, end_date, profile_id=profile_id)
+        
+        return NutritionTrends(
+            profile_id=profile_id,
+            start_date=start_date,
+            end_date=end_date,
+            bucket=bucket,
+            goals=goals,
+            buckets=summarize_trends(frame, start_date, end_date, bucket, goals)
+        )
+    
+    # ==================== MEAL TEMPLATE OPERATIONS ====================
+    
+    async def create_meal_template(self, template: MealTemplateCreate) -> MealTemplateResponse:
+        """Save a named set of food items that can be logged with one call"""
+        await self._get_food_items_by_ids([item.food_item_id for item in template.items])
         
-        for category in meals.values():
-            for entry in category:
-                servings = entry.servings or 1.0
-                totals["calories"] += (entry.calories or 0) * servings
-                totals["total_fat"] += (entry.total_fat or 0) * servings
-                totals["sodium"] += (entry.sodium or 0) * servings
-                totals["total_carb"] += (entry.total_carb or 0) * servings
-                totals["dietary_fiber"] += (entry.dietary_fiber or 0) * servings
-                totals["sugars"] += (entry.sugars or 0) * servings
-                totals["protein"] += (entry.protein or 0) * servings
-                totals["meal_count"] += 1
-        
-        return totals
+        response = self.client.table("meal_templates").insert(template.model_dump()).execute()
+        if not response.data:
+            raise Exception("Failed to create meal template")
+        
+        return MealTemplateResponse(**response.data[0])
+    
+    async def get_meal_template(self, template_id: int) -> Optional[MealTemplateResponse]:
+        """Get meal template by ID"""
+        response = self.client.table("meal_templates").select("*").eq("id", template_id).execute()
+        if response.data:
+            return MealTemplateResponse(**response.data[0])
+        return None
+    
+    async def get_meal_templates(self, profile_id: str) -> List[MealTemplateResponse]:
+        """List a user's meal templates by name"""
+        response = self.client.table("meal_templates").select("*").eq("profile_id", profile_id).order("name").execute()
+        return [MealTemplateResponse(**template) for template in response.data]
+    
+    async def delete_meal_template(self, template_id: int) -> bool:
+        """Delete a meal template"""
+        response = self.client.table("meal_templates").delete().eq("id", template_id).execute()
+        return len(response.data) > 0
+    
+    async def log_meal_template(self, template_id: int, request: MealTemplateLogRequest) -> List[MealEntryResponse]:
+        """Log every item of a template as meal entries in one batch"""
+        template = await self.get_meal_template(template_id)
+        if not template:
+            raise Exception(f"Meal template {template_id} not found")
+        
+        return await self.create_meal_entries(MealEntryBatchCreate(
+            profile_id=template.profile_id,
+            meal_category=request.meal_category or template.meal_category,
+            entry_date=request.entry_date,
+            items=[
+                MealEntryBatchItem(food_item_id=item.food_item_id, servings=item.servings)
+                for item in template.items
+            ]
+        ))
@@ -2,7 +2,7 @@
 Nutrition Data Models
 Pydantic models for FastAPI with BMR/TDEE calculations
 """
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 from typing import Optional
 from datetime import datetime
 
@@ -80,6 +80,27 @@ class FoodItemResponse(FoodItemBase):
         from_attributes = True
 
 
+class FoodItemPartialResponse(BaseModel):
+    """Food item restricted to the columns requested with `fields=` (unrequested columns are omitted)"""
+    id: int
+    name: str
+    serving_size: Optional[str] = None
+    calories: Optional[int] = None
+    total_fat: Optional[float] = None
+    sodium: Optional[float] = None
+    total_carb: Optional[float] = None
+    dietary_fiber: Optional[float] = None
+    sugars: Optional[float] = None
+    protein: Optional[float] = None
+    location: Optional[str] = None
+    date: Optional[str] = None
+    meal_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+FOOD_ITEM_FIELDS = tuple(FoodItemPartialResponse.model_fields)
+
+
 class MealEntryBase(BaseModel):
     """Base meal entry fields"""
     food_item_id: int = Field(..., gt=0)
@@ -121,6 +142,53 @@ class MealEntryResponse(MealEntryBase):
         from_attributes = True
 
 
+# Precompiled validator/serializer for lists of meal entries: one call covers the
+# whole list instead of one model construction per row
+MEAL_ENTRY_LIST_ADAPTER = TypeAdapter(list[MealEntryResponse])
+
+
+class MealEntryBatchItem(BaseModel):
+    """One item of a batch meal log (entry_date/meal_category fall back to the batch values)"""
+    food_item_id: int = Field(..., gt=0)
+    servings: float = Field(1.0, gt=0, le=20)
+    meal_category: Optional[str] = Field(None, pattern="^(Breakfast|Lunch|Dinner)$")
+    entry_date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+
+
+class MealEntryBatchCreate(BaseModel):
+    """Log several meal entries (e.g. a full tray) in one request"""
+    profile_id: str = Field(..., description="User profile UUID")
+    meal_category: str = Field("Lunch", pattern="^(Breakfast|Lunch|Dinner)$")
+    entry_date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date in YYYY-MM-DD format, defaults to today")
+    items: list[MealEntryBatchItem] = Field(..., min_length=1, max_length=100)
+
+
+class MealTemplateItem(BaseModel):
+    """Food item saved in a meal template"""
+    food_item_id: int = Field(..., gt=0)
+    servings: float = Field(1.0, gt=0, le=20)
+
+
+class MealTemplateCreate(BaseModel):
+    """Create a saved meal template"""
+    profile_id: str = Field(..., description="User profile UUID")
+    name: str = Field(..., min_length=1, max_length=100)
+    meal_category: str = Field("Lunch", pattern="^(Breakfast|Lunch|Dinner)$")
+    items: list[MealTemplateItem] = Field(..., min_length=1, max_length=100)
+
+
+class MealTemplateResponse(MealTemplateCreate):
+    """Saved meal template"""
+    id: int
+    created_at: Optional[datetime] = None
+
+
+class MealTemplateLogRequest(BaseModel):
+    """Log a saved template; overrides the template's meal category if given"""
+    entry_date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date in YYYY-MM-DD format, defaults to today")
+    meal_category: Optional[str] = Field(None, pattern="^(Breakfast|Lunch|Dinner)$")
+
+
 class DailyNutritionTotals(BaseModel):
     """Daily nutrition totals"""
     date: str
@@ -150,6 +218,54 @@ class WeeklyMealHistory(BaseModel):
     daily_totals: dict[str, DailyNutritionTotals]
 
 
+class NutritionTotals(BaseModel):
+    """Nutrient totals over a set of meal entries"""
+    calories: float = 0.0
+    total_fat: float = 0.0
+    sodium: float = 0.0
+    total_carb: float = 0.0
+    dietary_fiber: float = 0.0
+    sugars: float = 0.0
+    protein: float = 0.0
+    meal_count: int = 0
+
+
+class NutritionReportGroup(NutritionTotals):
+    """Totals for one group, e.g. {"day": "2025-11-10", "meal_category": "Lunch"}"""
+    group: dict[str, str]
+
+
+class NutritionReport(BaseModel):
+    """Nutrient totals over a date range, overall and per group"""
+    profile_id: Optional[str] = None  # None for reports over all users
+    start_date: str
+    end_date: str
+    group_by: list[str]
+    totals: NutritionTotals
+    groups: list[NutritionReportGroup]
+
+
+class NutritionTrendBucket(BaseModel):
+    """One day/week/month of a nutrition trend"""
+    start_date: str
+    end_date: str
+    days: int
+    days_logged: int
+    totals: NutritionTotals
+    averages: dict[str, float]  # Per logged day
+    goal_adherence: dict[str, float] = {}  # Fraction of logged days within 10% of the daily goal
+
+
+class NutritionTrends(BaseModel):
+    """Downsampled nutrition trend for charts"""
+    profile_id: str
+    start_date: str
+    end_date: str
+    bucket: str
+    goals: dict[str, float] = {}
+    buckets: list[NutritionTrendBucket]
+
+
 class MenuUploadRequest(BaseModel):
     """Request to upload dining hall menu data"""
     location: str = Field(..., description="Dining hall location")
@@ -163,6 +279,8 @@ class MenuUploadResponse(BaseModel):
     items_processed: int
     items_created: int
     items_updated: int
+    items_unchanged: int = 0
+    items_deleted: int = 0
     errors: list[str] = []
 
 
@@ -0,0 +1,250 @@
+"""
+Nutrition Parsing
+Shared parser for scraped menus: nutrition strings ("25.9g", "680mg", "<1g", "2-3g")
+and single-pass validation of menu entries into food_items rows
+Used by the API ingest (nutrition_utils, menu_ingest) and the Lambda scraper (lambda_function)
+Standard library only, so it can be copied into the Lambda image as-is
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+# A leading number, an optional "<"/"less than" qualifier, an optional range
+# ("2-3", "2 to 3") and an optional unit. Anything after the unit is ignored,
+# so "1.5.0g" reads as 1.5 rather than failing.
+_VALUE_RE = re.compile(
+    r"""^\s*
+    (?P<lt><\s*=?|less\s+than\s+)?
+    (?P<num>\d+(?:\.\d+)?|\.\d+)
+    (?:\s*(?:-|–|to)\s*(?P<upper>\d+(?:\.\d+)?|\.\d+))?
+    \s*(?P<unit>mcg|µg|ug|mg|kg|g|kcal|cal|%)?
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Grams per unit (calorie units are only compared with each other)
+_UNIT_SCALE = {
+    "kg": 1000.0,
+    "g": 1.0,
+    "mg": 0.001,
+    "mcg": 0.000001,
+    "µg": 0.000001,
+    "ug": 0.000001,
+}
+
+# "<1g" means somewhere between 0 and 1g; count it as half the bound
+LESS_THAN_FACTOR = 0.5
+
+# Canonical unit of every nutrient field the scraper captures
+NUTRIENT_UNITS = {
+    "calories": "kcal",
+    "calories_from_fat": "kcal",
+    "total_fat": "g",
+    "sat_fat": "g",
+    "trans_fat": "g",
+    "cholesterol": "mg",
+    "sodium": "mg",
+    "total_carb": "g",
+    "dietary_fiber": "g",
+    "sugars": "g",
+    "protein": "g",
+}
+
+
+@lru_cache(maxsize=8192)
+def _parse_string(value: str, unit: Optional[str]) -> float:
+    match = _VALUE_RE.match(value)
+    if not match:
+        return 0.0
+
+    number = float(match.group("num"))
+    upper = match.group("upper")
+    if upper is not None:
+        number = (number + float(upper)) / 2
+    if match.group("lt"):
+        number *= LESS_THAN_FACTOR
+
+    raw_unit = (match.group("unit") or "").lower()
+    if unit and raw_unit in _UNIT_SCALE and unit in _UNIT_SCALE and raw_unit != unit:
+        number = number * _UNIT_SCALE[raw_unit] / _UNIT_SCALE[unit]
+    return number
+
+
+def parse_nutrition_value(value: Union[str, int, float, None], unit: Optional[str] = None) -> float:
+    """
+    Extract the numeric value from a nutrition string (e.g. '25.9g' -> 25.9)
+
+    If `unit` is given ("g", "mg", "mcg", ...), mass values are converted to it
+    ('680mg' -> 0.68 for unit="g"); values without a unit are assumed to already
+    be in it. Ranges use their midpoint and "<" values half their bound.
+    Raw strings repeat heavily across a menu, so results are memoized.
+    """
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    return _parse_string(value, unit)
+
+
+def parse_nutrition_facts(nutrition: Dict) -> Dict[str, float]:
+    """Parse every known nutrient of a scraped `nutrition` dict into its canonical unit (missing -> 0)"""
+    return {
+        field: parse_nutrition_value(nutrition.get(field), unit)
+        for field, unit in NUTRIENT_UNITS.items()
+    }
+
+
+# ==================== MENU ENTRIES ====================
+
+MAX_MENU_ERRORS = 50
+MAX_NAME_LENGTH = 200  # FoodItemBase.name
+
+
+def menu_path(*parts) -> str:
+    """JSON Pointer (RFC 6901) to a spot in a menu document, e.g. /Worcester/3/meals/Lunch"""
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in parts)
+
+
+class MenuErrors:
+    """
+    Path-addressed menu errors, capped at `limit` messages
+
+    Every error is counted, but only the first `limit` are kept, so a badly broken
+    upload cannot produce an unbounded error report.
+    """
+
+    def __init__(self, limit: int = MAX_MENU_ERRORS):
+        self.limit = limit
+        self.total = 0
+        self.messages: List[str] = []
+
+    def __len__(self) -> int:
+        return self.total
+
+    def add(self, path: str, message: str):
+        self.total += 1
+        if len(self.messages) < self.limit:
+            self.messages.append(f"{path or '/'}: {message}")
+
+    def merge(self, total: int, messages: List[str]):
+        """Fold in errors collected elsewhere (e.g. by a worker process)"""
+        self.total += total
+        self.messages.extend(messages[:max(self.limit - len(self.messages), 0)])
+
+    def as_list(self) -> List[str]:
+        if self.total > len(self.messages):
+            return self.messages + [f"{self.total - len(self.messages)} more errors omitted"]
+        return list(self.messages)
+
+
+def _food_row(item: Dict, nutrition: Dict, location: str, date: str, meal_type: str) -> Dict:
+    facts = parse_nutrition_facts(nutrition)
+    return {
+        "name": item.get("name", "Unknown"),
+        "serving_size": nutrition.get("serving_size", "1 serving"),
+        "calories": int(facts["calories"]),
+        "total_fat": facts["total_fat"],
+        "sodium": facts["sodium"],
+        "total_carb": facts["total_carb"],
+        "dietary_fiber": facts["dietary_fiber"],
+        "sugars": facts["sugars"],
+        "protein": facts["protein"],
+        "location": location,
+        "date": date,
+        "meal_type": meal_type,
+    }
+
+
+def _item_error(item, nutrition) -> Optional[tuple]:
+    """First problem with an item as (field, message), mirroring FoodItemCreate's constraints"""
+    name = item.get("name", "Unknown")
+    if not isinstance(name, str) or not name:
+        return "name", "must be a non-empty string"
+    if len(name) > MAX_NAME_LENGTH:
+        return "name", f"must be at most {MAX_NAME_LENGTH} characters"
+    if not isinstance(nutrition, dict):
+        return "nutrition", "must be an object"
+    serving_size = nutrition.get("serving_size", "1 serving")
+    if not isinstance(serving_size, str) or not serving_size:
+        return "nutrition/serving_size", "must be a non-empty string"
+    for field in NUTRIENT_UNITS:
+        value = nutrition.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int, float))):
+            return f"nutrition/{field}", "must be a string or number"
+        if isinstance(value, (int, float)) and value < 0:
+            return f"nutrition/{field}", "must not be negative"
+    # Parsed strings are never negative, so no further checks are needed
+    return None
+
+
+def menu_rows(
+    entry: Dict,
+    location: str,
+    errors: Optional[MenuErrors] = None,
+    path: str = "",
+    trusted: bool = False,
+) -> List[Dict]:
+    """
+    Validate one menu entry ({"date", "meals": {meal: {section: [items]}}}) and
+    turn it into food_items rows in the same pass
+
+    Structural problems with the entry itself (not an object, missing date/meals)
+    skip the whole entry; a bad meal, section or item only skips that part. Each
+    problem is reported to `errors` under its JSON Pointer, prefixed with `path`.
+
+    trusted=True skips validation for internal sources (the Lambda scraper) whose
+    output always has the scraper's shape.
+    """
+    if trusted:
+        date = entry.get("date", "")
+        return [
+            _food_row(item, item.get("nutrition", {}), location, date, meal_type)
+            for meal_type, sections in entry.get("meals", {}).items()
+            for items in sections.values()
+            for item in items
+        ]
+
+    errors = errors if errors is not None else MenuErrors()
+    if not isinstance(entry, dict):
+        errors.add(path, "menu entry must be an object")
+        return []
+
+    date = entry.get("date")
+    meals = entry.get("meals")
+    valid = True
+    if date is None:
+        errors.add(path + "/date", "missing")
+        valid = False
+    elif not isinstance(date, str):
+        errors.add(path + "/date", "must be a string")
+        valid = False
+    if meals is None:
+        errors.add(path + "/meals", "missing")
+        valid = False
+    elif not isinstance(meals, dict):
+        errors.add(path + "/meals", "must be an object of meals")
+        valid = False
+    if not valid:
+        return []
+
+    rows = []
+    for meal_type, sections in meals.items():
+        if not isinstance(sections, dict):
+            errors.add(path + menu_path("meals", meal_type), "must be an object of sections")
+            continue
+        for section, items in sections.items():
+            if not isinstance(items, list):
+                errors.add(path + menu_path("meals", meal_type, section), "must be a list of items")
+                continue
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors.add(path + menu_path("meals", meal_type, section, index), "item must be an object")
+                    continue
+                nutrition = item.get("nutrition", {})
+                problem = _item_error(item, nutrition)
+                if problem:
+                    field, message = problem
+                    errors.add(path + menu_path("meals", meal_type, section, index) + "/" + field, message)
+                    continue
+                rows.append(_food_row(item, nutrition, location, date, meal_type))
+    return rows
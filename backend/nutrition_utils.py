@@ -2,21 +2,16 @@
 Nutrition Utilities
 Data loading and menu parsing utilities
 """
+import base64
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
+from menu_files import read_menu_file, read_menus
 from nutrition_models import FoodItemCreate
+from nutrition_parsing import MenuErrors, menu_path, menu_rows
 
-
-def parse_nutrition_value(value: str) -> float:
-    """Extract numeric value from nutrition string (e.g., '25.9g' -> 25.9)"""
-    if not value:
-        return 0.0
-    # Remove units and convert to float
-    numeric_str = ''.join(c for c in value if c.isdigit() or c == '.')
-    try:
-        return float(numeric_str) if numeric_str else 0.0
-    except ValueError:
-        return 0.0
+# A menus document ({hall: [entries]}), or the raw contents of a menu file: the JSON
+# document or the scraper's NDJSON, optionally gzip/zstd compressed
+MenuData = Union[dict, bytes, str]
 
 
 def parse_dining_hall_menu(menu_data: dict, location: str) -> List[FoodItemCreate]:
@@ -42,42 +37,52 @@ def parse_dining_hall_menu(menu_data: dict, location: str) -> List[FoodItemCreat
             }
         }
     }
-    """
-    food_items = []
     
-    date = menu_data.get("date", "")
-    meals = menu_data.get("meals", {})
+    Raises ValueError listing the problems if the menu is malformed.
+    """
+    errors = MenuErrors()
+    rows = menu_rows(menu_data, location, errors)
+    if errors:
+        raise ValueError("Invalid menu: " + "; ".join(errors.as_list()))
+    return [FoodItemCreate(**row) for row in rows]
+
+
+def as_menu_document(json_data: MenuData) -> dict:
+    """The {hall: [entries]} document for MenuData; raises ValueError if raw contents cannot be read"""
+    if isinstance(json_data, str):
+        json_data = json_data.encode("utf-8")
+    if isinstance(json_data, bytes):
+        return read_menus(json_data)
+    return json_data
+
+
+def parse_menu_document(json_data, errors: Optional[MenuErrors] = None, trusted: bool = False) -> List[Dict]:
+    """
+    Validate a complete dining hall menus document and build food_items rows in one pass
     
-    # Process each meal type (Breakfast, Lunch, Dinner)
-    for meal_type, meal_sections in meals.items():
-        # Each meal type has sections (like "Grab n'Go Breakfast", "Entree", etc.)
-        for section_name, items in meal_sections.items():
-            for item in items:
-                nutrition = item.get("nutrition", {})
-                
-                # Create FoodItem with the required nutritional fields
-                food_item = FoodItemCreate(
-                    name=item.get("name", "Unknown"),
-                    serving_size=nutrition.get("serving_size", "1 serving"),
-                    calories=int(parse_nutrition_value(nutrition.get("calories", "0"))),
-                    total_fat=parse_nutrition_value(nutrition.get("total_fat", "0g")),
-                    sodium=parse_nutrition_value(nutrition.get("sodium", "0mg")),
-                    total_carb=parse_nutrition_value(nutrition.get("total_carb", "0g")),
-                    dietary_fiber=parse_nutrition_value(nutrition.get("dietary_fiber", "0g")),
-                    sugars=parse_nutrition_value(nutrition.get("sugars", "0g")),
-                    protein=parse_nutrition_value(nutrition.get("protein", "0g")),
-                    location=location,
-                    date=date,
-                    meal_type=meal_type
-                )
-                food_items.append(food_item)
+    Problems are added to `errors` with their JSON Pointer (e.g.
+    "/Worcester/3/meals/Lunch/Entree/2/name: must be a non-empty string") and the
+    offending entry, section or item is skipped; everything valid is returned.
+    """
+    errors = errors if errors is not None else MenuErrors()
+    if not isinstance(json_data, dict):
+        errors.add("", "root must be an object with location names as keys")
+        return []
     
-    return food_items
+    rows = []
+    for location, entries in json_data.items():
+        if not isinstance(entries, list):
+            errors.add(menu_path(location), "must be a list of menu entries")
+            continue
+        for idx, entry in enumerate(entries):
+            rows.extend(menu_rows(entry, location, errors, menu_path(location, idx), trusted))
+    return rows
 
 
-def load_dining_hall_menus_from_json(json_data: dict) -> List[FoodItemCreate]:
+def load_dining_hall_menus_from_json(json_data: MenuData) -> List[FoodItemCreate]:
     """
-    Load food items from the complete dining hall menus JSON file
+    Load food items from the complete dining hall menus JSON file (or its contents
+    as NDJSON, one {"hall": ..., "date": ..., "meals": ...} per line, as the scraper writes it)
     
     Expected structure:
     {
@@ -90,23 +95,24 @@ def load_dining_hall_menus_from_json(json_data: dict) -> List[FoodItemCreate]:
         "Franklin Dining Commons": [ ... ]
     }
     
-    Returns a list of FoodItemCreate objects
+    Returns a list of FoodItemCreate objects; raises ValueError if the document is malformed
     """
-    food_items = []
-    
-    # Iterate through each dining hall location
-    for location, entries in json_data.items():
-        for entry in entries:
-            items = parse_dining_hall_menu(entry, location)
-            food_items.extend(items)
-    
-    return food_items
+    errors = MenuErrors()
+    rows = parse_menu_document(as_menu_document(json_data), errors)
+    if errors:
+        raise ValueError("Invalid menu: " + "; ".join(errors.as_list()))
+    return [FoodItemCreate(**row) for row in rows]
 
 
-def get_available_dates(json_data: dict) -> List[str]:
+def load_dining_hall_menus_from_file(path: str) -> List[FoodItemCreate]:
+    """Load food items from a menu file (.json, .ndjson, optionally .gz/.zst)"""
+    return load_dining_hall_menus_from_json(read_menu_file(path))
+
+
+def get_available_dates(json_data: MenuData) -> List[str]:
     """Get list of available dates from the JSON file"""
     dates = set()
-    for location, entries in json_data.items():
+    for location, entries in as_menu_document(json_data).items():
         for entry in entries:
             date = entry.get("date", "")
             if date:
@@ -115,38 +121,49 @@ def get_available_dates(json_data: dict) -> List[str]:
     return sorted(list(dates))
 
 
-def get_available_locations(json_data: dict) -> List[str]:
+def get_available_locations(json_data: MenuData) -> List[str]:
     """Get list of available dining hall locations from the JSON file"""
-    return sorted(list(json_data.keys()))
+    return sorted(list(as_menu_document(json_data).keys()))
 
 
-def validate_menu_json(json_data: dict) -> tuple[bool, List[str]]:
+def validate_menu_json(json_data: MenuData) -> tuple[bool, List[str]]:
     """
     Validate the structure of menu JSON data
-    Returns (is_valid, list_of_errors)
+    Returns (is_valid, list_of_errors); use parse_menu_document to validate and parse together
     """
-    errors = []
-    
-    if not isinstance(json_data, dict):
-        errors.append("Root must be a dictionary with location names as keys")
-        return False, errors
-    
-    for location, entries in json_data.items():
-        if not isinstance(entries, list):
-            errors.append(f"Location '{location}' must contain a list of menu entries")
-            continue
-        
-        for idx, entry in enumerate(entries):
-            if not isinstance(entry, dict):
-                errors.append(f"Entry {idx} in '{location}' must be a dictionary")
-                continue
-            
-            if "date" not in entry:
-                errors.append(f"Entry {idx} in '{location}' missing 'date' field")
-            
-            if "meals" not in entry:
-                errors.append(f"Entry {idx} in '{location}' missing 'meals' field")
-            elif not isinstance(entry["meals"], dict):
-                errors.append(f"Entry {idx} in '{location}' 'meals' must be a dictionary")
-    
-    return len(errors) == 0, errors
+    errors = MenuErrors()
+    try:
+        json_data = as_menu_document(json_data)
+    except (ValueError, UnicodeDecodeError) as e:
+        return False, [str(e)]
+    parse_menu_document(json_data, errors)
+    return not errors, errors.as_list()
+
+
+def encode_cursor(name: str, item_id: int) -> str:
+    """Encode a (name, id) keyset position as an opaque URL-safe cursor"""
+    raw = json.dumps([name, item_id], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(name, str) or not isinstance(item_id, int):
+            raise TypeError
+        return name, item_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def parse_fields_param(fields: Optional[str], allowed: Tuple[str, ...]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` parameter; raises ValueError on unknown columns"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return requested or None
@@ -0,0 +1,91 @@
+"""
+Reload Archived Menus
+Re-ingests menus from a scraped JSON/NDJSON archive (optionally gzip/zstd) or a
+Parquet snapshot directory without re-scraping
+
+Entries are parsed across a process pool, sharded by (hall, date), and written with
+the content-hash diff, so reloading a season only writes what actually changed.
+
+Usage (from backend/):
+    python reload_menus.py all_dining_halls_menus.json
+    python reload_menus.py season.ndjson.zst --workers 8
+    python reload_menus.py menu_snapshots --hall Worcester --start-date 2025-09-01 --dry-run
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from menu_diff import sync_food_items
+from menu_ingest import SNIFF_CHARS, StreamDecompressor, detect_compression, detect_menu_format
+from menu_parallel import create_parse_pool, document_shards, ndjson_shards, parse_shards_parallel
+from nutrition_parsing import MenuErrors
+
+
+def read_shards(source: str, args, errors: MenuErrors):
+    """(hall, date) shards from a snapshot directory, JSON document or NDJSON file"""
+    if os.path.isdir(source):
+        from menu_snapshots import load_snapshots, table_to_menus
+        table = load_snapshots(source, args.halls, args.start_date, args.end_date)
+        return document_shards(table_to_menus(table), errors)
+
+    with open(source, "rb") as f:
+        data = f.read()
+    decompressor = StreamDecompressor(detect_compression(data[:4]))
+    text = (decompressor.decompress(data) + decompressor.flush()).decode("utf-8-sig")
+
+    if detect_menu_format(source, head=text[:SNIFF_CHARS]) == "ndjson":
+        return ndjson_shards(text)
+    menus = json.loads(text)
+    if args.halls and isinstance(menus, dict):
+        menus = {hall: entries for hall, entries in menus.items() if hall in args.halls}
+    return document_shards(menus, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reload archived menus into food_items")
+    parser.add_argument("source", help="JSON/NDJSON file (.gz/.zst accepted) or Parquet snapshot directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parse processes (1 = in-process)")
+    parser.add_argument("--hall", action="append", dest="halls", help="Only reload this hall (repeatable)")
+    parser.add_argument("--start-date", help="Snapshot directories only: first menu date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Snapshot directories only: last menu date (YYYY-MM-DD)")
+    parser.add_argument("--trusted", action="store_true", help="Skip validation (archives written by the scraper)")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and report without touching the database")
+    args = parser.parse_args()
+
+    errors = MenuErrors()
+    started = time.perf_counter()
+    shards = read_shards(args.source, args, errors)
+    read_seconds = time.perf_counter() - started
+
+    pool = create_parse_pool(args.workers)
+    try:
+        started = time.perf_counter()
+        rows = parse_shards_parallel(shards, pool, errors, args.trusted)
+        parse_seconds = time.perf_counter() - started
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Read {len(shards)} menus in {read_seconds:.2f}s, parsed {len(rows)} items in {parse_seconds:.2f}s")
+    for message in errors.as_list():
+        print(f"  [ERROR] {message}")
+
+    if args.dry_run:
+        return
+
+    load_dotenv()
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+
+    summary = sync_food_items(create_client(url, key), rows)
+    print(f"[SUCCESS] {summary['inserted']} inserted, {summary['updated']} updated, "
+          f"{summary['unchanged']} unchanged, {summary['deleted']} deleted")
+
+
+if __name__ == "__main__":
+    main()
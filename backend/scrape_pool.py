@@ -0,0 +1,342 @@
+"""
+Scrape Pool
+Concurrent dining hall scraping over a bounded pool of Playwright pages
+Requests to the same host are capped and spaced out (per-host politeness), pages
+skip images, fonts, media and third-party requests, and a date switch waits for
+the menu markup to change rather than for network idle plus a fixed sleep
+Used by both the backend scraper and the Lambda (scraper_utils)
+"""
+import asyncio
+import inspect
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from menu_replay import get_recorder
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+except ImportError:  # Only needed when a real browser is driven
+    PlaywrightTimeoutError = TimeoutError
+
+DEFAULT_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))
+DEFAULT_MAX_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", "4"))
+DEFAULT_MIN_INTERVAL = float(os.getenv("SCRAPER_MIN_INTERVAL_SECONDS", "0.25"))
+
+BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "1") != "0"
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+# Extra hosts pages may load from besides the dining halls' own (comma separated)
+EXTRA_ALLOWED_HOSTS = tuple(host.strip() for host in os.getenv("SCRAPER_ALLOWED_HOSTS", "").split(",") if host.strip())
+
+MENU_TIMEOUT_MS = int(os.getenv("SCRAPER_MENU_TIMEOUT_MS", "10000"))
+MENU_QUIET_MS = 150  # The menu markup must stop changing for this long before it is read
+
+# True if the date is already selected and its menu shown; otherwise starts recording
+# when the menu markup (meal divs, or whatever holds them) last changed
+_WATCH_MENU_SCRIPT = """(dateValue) => {
+    const MEAL = 'div[id*="_menu"]';
+    const select = document.getElementById('upcoming-foodpro');
+    if (select && select.value === dateValue && document.querySelector(MEAL)) return true;
+
+    const watch = window.__menuWatch || (window.__menuWatch = {});
+    if (watch.observer) watch.observer.disconnect();
+    watch.changedAt = 0;
+    const isMenu = (node) => node && node.nodeType === 1 && (node.matches(MEAL) || node.closest(MEAL) || node.querySelector(MEAL));
+    watch.observer = new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            const target = m.target.nodeType === 1 ? m.target : m.target.parentElement;
+            if (isMenu(target) || [...m.addedNodes, ...m.removedNodes].some(isMenu)) {
+                watch.changedAt = performance.now();
+                return;
+            }
+        }
+    });
+    watch.observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+    return false;
+}"""
+
+_MENU_SETTLED_SCRIPT = """(quietMs) => {
+    const watch = window.__menuWatch;
+    return Boolean(watch && watch.changedAt && performance.now() - watch.changedAt >= quietMs);
+}"""
+
+# get_dates(page, hall_url) -> [(date_value, date_text)]; also leaves the page on the hall's menu
+GetDates = Callable[[object, str], Awaitable[List[Tuple[str, str]]]]
+# get_menu(page, date_value, date_text, hall_name) -> menu dict or None, or an awaitable
+# of it when parsing was handed to a ParsePool (awaited once the page is released)
+GetMenu = Callable[[object, str, str, str], Awaitable[Optional[Dict]]]
+# select_dates(hall_name, dates) -> the dates to scrape (e.g. ScrapePlan.select in menu_dates)
+SelectDates = Callable[[str, List[Tuple[str, str]]], List[Tuple[str, str]]]
+# on_menu(hall_name, menu) is awaited for every menu as soon as it is scraped (e.g. MenuPipeline.put)
+OnMenu = Callable[[str, Dict], Awaitable[None]]
+
+
+class HostLimiter:
+    """
+    Per-host politeness: at most `max_per_host` requests in flight to one host,
+    and consecutive requests to it start at least `min_interval` seconds apart
+    """
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PER_HOST, min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval = max(0.0, min_interval)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with semaphore:
+            async with lock:
+                wait = self._last_start.get(host, 0.0) + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_start[host] = time.monotonic()
+            yield
+
+
+class ScrapeTimeline:
+    """
+    Busy intervals per kind of work ("browser", "fetch", "parse"), on the
+    time.perf_counter() clock (shared by worker processes on Linux), to show how
+    much parsing overlapped page/network I/O
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[Tuple[float, float]]] = {}
+
+    def add(self, kind: str, start: float, end: float) -> None:
+        self.spans.setdefault(kind, []).append((start, end))
+
+    @contextmanager
+    def span(self, kind: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(kind, start, time.perf_counter())
+
+    @staticmethod
+    def _union(spans: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        merged: List[Tuple[float, float]] = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def busy(self, *kinds: str) -> float:
+        """Wall time during which any of `kinds` was running"""
+        spans = [span for kind in kinds for span in self.spans.get(kind, [])]
+        return sum(end - start for start, end in self._union(spans))
+
+    def overlap(self, kind: str, others: Iterable[str]) -> float:
+        """Wall time during which `kind` ran while any of `others` was running too"""
+        mine = self._union(self.spans.get(kind, []))
+        theirs = self._union(span for other in others for span in self.spans.get(other, []))
+        total, i = 0.0, 0
+        for start, end in mine:
+            while i < len(theirs) and theirs[i][1] <= start:
+                i += 1
+            j = i
+            while j < len(theirs) and theirs[j][0] < end:
+                total += min(end, theirs[j][1]) - max(start, theirs[j][0])
+                j += 1
+        return total
+
+    def report(self) -> str:
+        io_kinds = [kind for kind in self.spans if kind != "parse"]
+        parse = self.busy("parse")
+        hidden = self.overlap("parse", io_kinds)
+        io = ", ".join(f"{kind} {self.busy(kind):.2f}s" for kind in io_kinds) or "no I/O"
+        share = f" ({hidden / parse:.0%})" if parse else ""
+        return (f"parse {parse:.2f}s busy in {len(self.spans.get('parse', []))} pages, {io}; "
+                f"{hidden:.2f}s of parsing overlapped I/O{share}, {time.perf_counter() - self.started:.2f}s wall")
+
+
+def timed(timeline: Optional[ScrapeTimeline], kind: str):
+    """timeline.span(kind), or nothing without a timeline"""
+    return timeline.span(kind) if timeline is not None else nullcontext()
+
+
+def _site_host(url_or_host: str) -> str:
+    host = urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def resource_blocker(allowed_hosts: Iterable[str]):
+    """
+    Playwright route handler that aborts images, fonts, media and any request to
+    a host other than `allowed_hosts` (and their subdomains)
+    """
+    sites = {_site_host(host) for host in allowed_hosts} | {_site_host(host) for host in EXTRA_ALLOWED_HOSTS}
+
+    async def handle(route):
+        request = route.request
+        host = _site_host(request.url)
+        first_party = any(host == site or host.endswith("." + site) for site in sites)
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or not first_party:
+            await route.abort()
+        else:
+            await route.continue_()
+    return handle
+
+
+async def select_menu_date(page, date_value: str, timeout_ms: int = MENU_TIMEOUT_MS) -> bool:
+    """
+    Pick a date in the #upcoming-foodpro dropdown and wait until its menu is in place
+
+    Waits for the menu markup to change and then stay unchanged for MENU_QUIET_MS,
+    instead of network idle plus a fixed sleep. A date that is already selected
+    and shown (the page's initial one) is not re-selected. Returns False (after
+    timeout_ms) if the menu never changed, e.g. the site re-rendered nothing.
+    """
+    if await page.evaluate(_WATCH_MENU_SCRIPT, date_value):
+        return True
+    await page.select_option('#upcoming-foodpro', value=date_value)
+    try:
+        await page.wait_for_function(_MENU_SETTLED_SCRIPT, arg=MENU_QUIET_MS, timeout=timeout_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+class PagePool:
+    """
+    A fixed number of isolated browser contexts with one page each
+
+    Pages are handed out one task at a time; `current_url` remembers which
+    hall menu each page has loaded so a task can skip re-navigating. With
+    `allowed_hosts`, every context blocks images, fonts, media and third-party
+    requests (SCRAPER_BLOCK_RESOURCES=0 turns this off).
+    """
+
+    def __init__(self, browser, size: int = DEFAULT_CONCURRENCY, allowed_hosts: Optional[Iterable[str]] = None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.current_url: Dict[object, str] = {}
+        self.allowed_hosts = list(allowed_hosts) if allowed_hosts is not None else None
+        self._contexts = []
+        self._pages: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> "PagePool":
+        for _ in range(self.size):
+            context = await self.browser.new_context()
+            if BLOCK_RESOURCES and self.allowed_hosts is not None:
+                await context.route("**/*", resource_blocker(self.allowed_hosts))
+            self._contexts.append(context)
+            self._pages.put_nowait(await context.new_page())
+        return self
+
+    async def __aexit__(self, *exc):
+        for context in self._contexts:
+            await context.close()
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self._pages.get()
+        try:
+            yield page
+        finally:
+            self._pages.put_nowait(page)
+
+
+async def scrape_halls(
+    browser,
+    halls: Dict[str, str],
+    get_dates: GetDates,
+    get_menu: GetMenu,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: Optional[HostLimiter] = None,
+    select_dates: Optional[SelectDates] = None,
+    on_menu: Optional[OnMenu] = None,
+    timeline: Optional[ScrapeTimeline] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Scrape every date of every hall concurrently over `concurrency` pages
+
+    First each hall's date list is read (halls in parallel), then every
+    (hall, date) menu is fetched on whichever page is free. Menus come back per
+    hall in dropdown order, as the sequential scraper returned them. A hall
+    whose dates cannot be read, or a date that fails, is reported and skipped.
+    With select_dates, only the dates it returns for a hall are fetched.
+    on_menu gets each menu as soon as its page is read, in completion order.
+    When get_menu hands parsing to a worker pool (returns an awaitable), the page
+    goes back to the pool first, so the next date's navigation overlaps the parse.
+    Time spent in get_menu is recorded as "browser" on the timeline.
+    """
+    limiter = limiter or HostLimiter()
+
+    async with PagePool(browser, concurrency, allowed_hosts=halls.values()) as pool:
+
+        async def open_hall(page, hall_url: str) -> List[Tuple[str, str]]:
+            async with limiter.slot(hall_url):
+                dates = await get_dates(page, hall_url)
+            pool.current_url[page] = hall_url
+            return dates
+
+        async def hall_dates(hall_name: str, hall_url: str) -> List[Tuple[str, str]]:
+            try:
+                async with pool.page() as page:
+                    return await open_hall(page, hall_url)
+            except Exception as e:
+                print(f"Error scraping {hall_name}: {e}")
+                return []
+
+        async def hall_menu(hall_name: str, hall_url: str, date_value: str, date_text: str) -> Optional[Dict]:
+            async with pool.page() as page:
+                try:
+                    if pool.current_url.get(page) != hall_url:
+                        await open_hall(page, hall_url)
+                    async with limiter.slot(hall_url):
+                        with timed(timeline, "browser"):
+                            menu = await get_menu(page, date_value, date_text, hall_name)
+                except Exception as e:
+                    # The page may be left mid-navigation; reload the hall before reusing it
+                    pool.current_url.pop(page, None)
+                    print(f"Error fetching menu for {date_text} at {hall_name}: {e}")
+                    return None
+            if inspect.isawaitable(menu):
+                try:
+                    menu = await menu
+                except Exception as e:
+                    print(f"Error parsing menu for {date_text} at {hall_name}: {e}")
+                    return None
+            # Outside the page slot, so a full queue downstream does not hold a browser page
+            if menu and on_menu is not None:
+                await on_menu(hall_name, menu)
+            return menu
+
+        started = time.perf_counter()
+        names = list(halls)
+        date_lists = await asyncio.gather(*(hall_dates(name, halls[name]) for name in names))
+        recorder = get_recorder()
+        if recorder is not None:
+            for name, dates in zip(names, date_lists):
+                if dates:
+                    recorder.record_dates(name, dates)
+        if select_dates is not None:
+            date_lists = [select_dates(name, dates) for name, dates in zip(names, date_lists)]
+
+        tasks = {
+            name: [asyncio.ensure_future(hall_menu(name, halls[name], value, text)) for value, text in dates]
+            for name, dates in zip(names, date_lists)
+        }
+        all_menus = {}
+        for name in names:
+            menus = await asyncio.gather(*tasks[name])
+            all_menus[name] = [menu for menu in menus if menu]
+
+        scraped = sum(len(menus) for menus in all_menus.values())
+        total = sum(len(dates) for dates in date_lists)
+        print(f"Scraped {scraped}/{total} menus from {len(names)} halls in "
+              f"{time.perf_counter() - started:.1f}s ({pool.size} pages)")
+        return all_menus
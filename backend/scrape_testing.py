@@ -0,0 +1,138 @@
+"""
+Scrape Testing
+Fakes and fixture loaders shared by the scraper tests (test_menu_*.py, test_parse_pool.py):
+the saved menu pages and the menus they were scraped into, a Playwright page stand-in,
+a fake dining site for driving menu_fetch through httpx.MockTransport, and a
+nutrition database stand-in for the upload tests (test_menu_files.py, test_menu_ingest.py)
+"""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from menu_fetch import fetch_halls, scrape_with_fallback
+from menu_html import DETAIL_ATTRS, NUTRITION_ATTRS, parse_menu_html
+from scrape_pool import HostLimiter
+
+HERE = Path(__file__).parent
+FIXTURES = sorted((HERE / "fixtures" / "menu_html").glob("*.html"))
+SCRAPED_MENUS_FILE = HERE / "all_dining_halls_menus.json"
+
+HALLS = {
+    "Berkshire": "https://umassdining.com/menu/berkshire-grab-n-go-menu",
+    "Worcester": "https://umassdining.com/menu/worcester-grab-n-go",
+    "Franklin": "https://umassdining.com/menu/franklin-grab-n-go",
+    "Hampshire": "https://umassdining.com/menu/hampshire-grab-n-go",
+}
+
+
+def scraped_menus() -> Dict[str, List[Dict]]:
+    """A fresh copy of the checked-in scrape (what fixtures/scrape replays to)"""
+    with open(SCRAPED_MENUS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_menu(path: Path) -> Tuple[str, Dict]:
+    """The hall and scraped menu entry a fixtures/menu_html page was saved from"""
+    hall, day = path.stem.split("-", 1)
+    for entry in scraped_menus()[hall.title()]:
+        if time.strftime("%Y-%m-%d", time.strptime(entry["date"], "%a %B %d, %Y")) == day:
+            return hall.title(), entry
+    raise LookupError(path.name)
+
+
+def fixture_page(path: Path = None) -> Tuple[str, Dict, str]:
+    """(hall, menu entry, page HTML) of a saved page, the first one by default"""
+    path = path or FIXTURES[0]
+    hall, entry = fixture_menu(path)
+    return hall, entry, path.read_text(encoding="utf-8")
+
+
+def extracted_from_menu(entry: Dict) -> Dict:
+    """What DOM_EXTRACT_SCRIPT returns for a page showing `entry`"""
+    return {
+        "location": entry["location"],
+        "meals": [
+            [meal, [
+                [category, [
+                    [item["name"], [item["nutrition"][field] for field in NUTRITION_ATTRS] + [item[field] for field in DETAIL_ATTRS]]
+                    for item in items
+                ]]
+                for category, items in categories.items()
+            ]]
+            for meal, categories in entry["meals"].items()
+        ],
+    }
+
+
+class FakePage:
+    """A loaded Playwright page: content() is the page HTML, evaluate() the DOM extraction"""
+
+    def __init__(self, html_content, extracted):
+        self.html_content = html_content
+        self.extracted = extracted
+        self.calls = []
+
+    async def content(self):
+        self.calls.append("content")
+        return self.html_content
+
+    async def evaluate(self, script, arg=None):
+        self.calls.append("evaluate")
+        return self.extracted
+
+
+async def no_browser(halls):
+    raise AssertionError("this scrape must not start a browser")
+
+
+def replay_scrape(**kwargs) -> Dict[str, List[Dict]]:
+    """Scrape the checked-in recording (fixtures/scrape); kwargs go to scrape_with_fallback"""
+    return asyncio.run(scrape_with_fallback(HALLS, parse_menu_html, no_browser, mode="replay", **kwargs))
+
+
+OATMEAL = "<li class='lightbox-nutrition'><a data-calories='150' data-allergens='Oats'>Oatmeal</a></li>"
+
+
+class FoodProSite:
+    """
+    The dining site as menu_fetch sees it: every hall page offers `dates`, and the
+    menu endpoint answers with payload(hall_url, date_value), by default one
+    breakfast category holding as many oatmeals as the date's day of month
+    """
+
+    def __init__(self, dates=(("11/07/2025", "Fri November 07, 2025"), ("11/08/2025", "Sat November 08, 2025")),
+                 payload: Optional[Callable[[str, str], object]] = None):
+        self.dates = list(dates)
+        self.payload = payload or (lambda hall_url, date_value: {"breakfast": {"Hot Cereal": OATMEAL * int(date_value[3:5])}})
+        self.requests: List[httpx.Request] = []
+
+    def page(self) -> str:
+        options = "".join(f'<option value="{value}">{text}</option>' for value, text in self.dates)
+        return f'<script>var url = "/foodpro-menu-ajax?tid=42";</script><select id="upcoming-foodpro">{options}</select>'
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.startswith("/menu/"):
+            return httpx.Response(200, text=self.page())
+        hall_url = request.headers["Referer"]
+        return httpx.Response(200, json=self.payload(hall_url, request.url.params["date"]))
+
+    async def fetch(self, halls: Dict[str, str] = HALLS, parse_html=parse_menu_html, **kwargs):
+        """fetch_halls against this site; returns (menus, failed halls)"""
+        async with httpx.AsyncClient(transport=httpx.MockTransport(self.handle)) as client:
+            return await fetch_halls(halls, parse_html, HostLimiter(4, 0), client, **kwargs)
+
+
+class FakeNutritionDB:
+    """Collects what ingest_menu_stream writes; every row counts as inserted"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def sync_menu_items(self, rows):
+        self.rows.extend(rows)
+        return {"inserted": len(rows), "updated": 0, "unchanged": 0, "deleted": 0}
@@ -1,11 +1,18 @@
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import json
 import asyncio
+import argparse
 import os
 from datetime import datetime, timedelta
+from functools import partial
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from menu_snapshots import DEFAULT_SNAPSHOT_DIR, write_snapshot
+from scrape_pool import DEFAULT_CONCURRENCY, ScrapeTimeline, scrape_halls, select_menu_date
+from menu_fetch import DEFAULT_FETCH_MODE, scrape_with_fallback
+from menu_html import ParsePool, extract_menu, parse_menu_html
+from menu_page_cache import DEFAULT_PAGE_CACHE_FILE, MenuPageCache
+from menu_dates import load_scrape_plan, menu_date
+from menu_files import DEFAULT_MENU_FILE, LEGACY_MENU_FILE, MenuFileWriter, read_menu_file
 
 
 async def get_available_dates(page, base_url):
@@ -21,7 +28,7 @@ async def get_available_dates(page, base_url):
     """
     
     print(f"Fetching available dates from {base_url}...")
-    await page.goto(base_url, wait_until='networkidle')
+    await page.goto(base_url, wait_until='domcontentloaded')
     
     # Wait for dropdown to load
     await page.wait_for_selector('#upcoming-foodpro', timeout=10000)
@@ -42,98 +49,20 @@ async def get_available_dates(page, base_url):
 
 def parse_menu_from_html(html_content, date_str, location_name):
     """
-    Parse menu data from HTML content
+    Parse menu data from HTML content (single pass, see menu_html)
     
     Args:
         html_content: HTML string
         date_str: Date string for the menu
-        location_name: Name of the location
+        location_name: Name of the location, replaced by the one shown on the page if any
         
     Returns:
         dict: Menu data
     """
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Initialize result structure
-    menu_data = {
-        'date': date_str,
-        'location': location_name,
-        'meals': {}
-    }
-    
-    # Extract location name from page (if available, overrides passed name)
-    location_header = soup.select_one('.singlepage-content-padding h1')
-    if location_header:
-        detected_location = location_header.get_text(strip=True)
-        if detected_location:
-            menu_data['location'] = detected_location
-    
-    # Find all meal periods (breakfast, lunch, etc.)
-    meal_divs = soup.find_all('div', id=lambda x: x and '_menu' in x)
-    
-    for meal_div in meal_divs:
-        # Get meal type
-        meal_type = meal_div.get('id').replace('_menu', '')
-        meal_header = meal_div.find('h2')
-        meal_name = meal_header.get_text(strip=True) if meal_header else meal_type
-        
-        menu_data['meals'][meal_name] = {}
-        
-        # Find the content div
-        content_div = meal_div.find('div', {'id': 'content_text'})
-        
-        if content_div:
-            # Find all category headers
-            categories = content_div.find_all('h2', {'class': 'menu_category_name'})
-            
-            for category in categories:
-                category_name = category.get_text(strip=True)
-                menu_data['meals'][meal_name][category_name] = []
-                
-                # Find all items until the next category
-                current = category.find_next_sibling()
-                
-                while current:
-                    # Stop if we hit another category
-                    if current.name == 'h2' and 'menu_category_name' in current.get('class', []):
-                        break
-                    
-                    # Look for menu items
-                    if current.name == 'li' and 'lightbox-nutrition' in current.get('class', []):
-                        link = current.find('a')
-                        if link:
-                            item_data = {
-                                'name': link.get_text(strip=True),
-                                'nutrition': {
-                                    'calories': link.get('data-calories', ''),
-                                    'calories_from_fat': link.get('data-calories-from-fat', ''),
-                                    'total_fat': link.get('data-total-fat', ''),
-                                    'sat_fat': link.get('data-sat-fat', ''),
-                                    'trans_fat': link.get('data-trans-fat', ''),
-                                    'cholesterol': link.get('data-cholesterol', ''),
-                                    'sodium': link.get('data-sodium', ''),
-                                    'total_carb': link.get('data-total-carb', ''),
-                                    'dietary_fiber': link.get('data-dietary-fiber', ''),
-                                    'sugars': link.get('data-sugars', ''),
-                                    'protein': link.get('data-protein', ''),
-                                    'serving_size': link.get('data-serving-size', '')
-                                },
-                                'allergens': link.get('data-allergens', ''),
-                                'diet': link.get('data-clean-diet-str', ''),
-                                'carbon_rating': link.get('data-carbon-list', ''),
-                                'healthfulness': link.get('data-healthfulness', ''),
-                                'ingredients': link.get('data-ingredient-list', '')
-                            }
-                            
-                            menu_data['meals'][meal_name][category_name].append(item_data)
-                    
-                    current = current.find_next_sibling()
-    
-    return menu_data
+    return parse_menu_html(html_content, date_str, location_name)
 
 
-async def get_menu_for_date(page, date_value, date_text, location_name):
+async def get_menu_for_date(page, date_value, date_text, location_name, cache=None, parse_pool=None):
     """
     Get menu for a specific date by selecting it in the dropdown
     
@@ -142,6 +71,7 @@ async def get_menu_for_date(page, date_value, date_text, location_name):
         date_value: Date value to select (e.g., "11/07/2025")
         date_text: Human-readable date text
         location_name: Name of the location
+        cache: Optional MenuPageCache; an unchanged page is not extracted again
         
     Returns:
         dict: Menu data
@@ -150,20 +80,12 @@ async def get_menu_for_date(page, date_value, date_text, location_name):
     print(f"Fetching menu for {date_text} at {location_name}...")
     
     try:
-        # Select the dropdown option
-        await page.select_option('#upcoming-foodpro', value=date_value)
-        
-        # Wait for content to load
-        await page.wait_for_load_state('networkidle')
+        # Select the dropdown option and wait for its menu to be rendered
+        if not await select_menu_date(page, date_value):
+            print(f"[WARNING] Menu did not change for {date_text} at {location_name}; reading the page as is")
         
-        # Additional delay to ensure content is rendered
-        await asyncio.sleep(1)
-        
-        # Get the page source after content loads
-        html_content = await page.content()
-        
-        # Parse the menu
-        menu_data = parse_menu_from_html(html_content, date_text, location_name)
+        # Read the menu inside the browser (SCRAPER_EXTRACT_MODE=html parses page.content() instead)
+        menu_data = await extract_menu(page, date_text, location_name, cache=cache, parse_pool=parse_pool)
         
         return menu_data
         
@@ -204,9 +126,6 @@ async def get_all_menus_for_dining_hall(page, base_url, location_name):
             
             if menu_data:
                 hall_menus.append(menu_data)
-            
-            # Small delay between requests
-            await asyncio.sleep(1)
         
         return hall_menus
         
@@ -215,42 +134,107 @@ async def get_all_menus_for_dining_hall(page, base_url, location_name):
         return []
 
 
-async def get_all_dining_hall_menus():
+DINING_HALLS = {
+    "Berkshire": "https://umassdining.com/menu/berkshire-grab-n-go-menu",
+    "Worcester": "https://umassdining.com/menu/worcester-grab-n-go", 
+    "Franklin": "https://umassdining.com/menu/franklin-grab-n-go",
+    "Hampshire": "https://umassdining.com/menu/hampshire-grab-n-go"
+}
+
+
+async def get_dining_hall_menus_with_browser(dining_halls, concurrency: int = DEFAULT_CONCURRENCY, cache=None, select_dates=None, on_menu=None, parse_pool=None):
     """
-    Scrape menus from all 4 dining halls
+    Scrape the given halls with headless Chromium
     
-    Returns:
-        dict: Dictionary with location names as keys and menu lists as values
+    Halls and their dates are scraped concurrently over `concurrency` browser
+    pages, with per-host politeness limits (see scrape_pool). With a parse_pool,
+    SCRAPER_EXTRACT_MODE=html pages are parsed there while the page moves on.
     """
-    
-    dining_halls = {
-        "Berkshire": "https://umassdining.com/menu/berkshire-grab-n-go-menu",
-        "Worcester": "https://umassdining.com/menu/worcester-grab-n-go", 
-        "Franklin": "https://umassdining.com/menu/franklin-grab-n-go",
-        "Hampshire": "https://umassdining.com/menu/hampshire-grab-n-go"
-    }
-    
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        
-        all_menus = {}
         
         try:
-            for hall_name, hall_url in dining_halls.items():
-                menus = await get_all_menus_for_dining_hall(page, hall_url, hall_name)
-                all_menus[hall_name] = menus
-            
-            return all_menus
+            return await scrape_halls(
+                browser, dining_halls, get_available_dates, partial(get_menu_for_date, cache=cache, parse_pool=parse_pool),
+                concurrency=concurrency, select_dates=select_dates, on_menu=on_menu,
+                timeline=parse_pool.timeline if parse_pool else None
+            )
             
         finally:
             await browser.close()
 
 
-def save_menus_to_json(menus, filename='all_dining_halls_menus.json'):
-    """Save all scraped menu data to JSON file"""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(menus, f, indent=2, ensure_ascii=False)
+async def get_all_dining_hall_menus(mode: str = DEFAULT_FETCH_MODE, concurrency: int = DEFAULT_CONCURRENCY, cache=None, select_dates=None, on_menu=None):
+    """
+    Scrape menus from all 4 dining halls
+    
+    By default menus are fetched over plain HTTP (see menu_fetch) and Chromium is
+    only launched for halls that cannot be fetched that way; mode="browser" always uses Chromium.
+    With a MenuPageCache, pages whose menu markup is unchanged reuse the cached menu.
+    With select_dates (see menu_dates), only the dates it returns for a hall are scraped.
+    on_menu(hall, menu) is awaited for each menu as soon as it is scraped (see menu_pipeline).
+    Page HTML is parsed in a ParsePool (SCRAPER_PARSE_EXECUTOR) while other pages are still
+    loading; how much of the parsing that hid is printed as [TIMING].
+    
+    Returns:
+        dict: Dictionary with location names as keys and menu lists as values
+    """
+    with ParsePool(timeline=ScrapeTimeline()) as parse_pool:
+        menus = await scrape_with_fallback(
+            DINING_HALLS,
+            cache.cached_parser(parse_menu_from_html) if cache else parse_menu_from_html,
+            lambda halls: get_dining_hall_menus_with_browser(halls, concurrency, cache, select_dates, on_menu, parse_pool),
+            mode=mode,
+            select_dates=select_dates,
+            on_menu=on_menu,
+            parse_pool=parse_pool
+        )
+    if parse_pool.timeline.spans:
+        print(f"[TIMING] {parse_pool.timeline.report()}")
+    return menus
+
+
+def load_skipped_menus(plan, filename=DEFAULT_MENU_FILE):
+    """
+    The entries of dates an incremental scrape skipped (already in the database),
+    from the previous menu file, by hall
+
+    When `filename` does not exist yet (the first run after switching to NDJSON
+    output), the previous run's all_dining_halls_menus.json is read instead.
+    """
+    if not os.path.exists(filename) and os.path.exists(LEGACY_MENU_FILE):
+        print(f"[INCREMENTAL] {filename} not found; carrying skipped dates over from {LEGACY_MENU_FILE}")
+        filename = LEGACY_MENU_FILE
+    try:
+        previous = read_menu_file(filename)
+    except (OSError, ValueError):
+        previous = {}
+
+    kept = {}
+    for hall_name, dates in plan.skipped.items():
+        skipped = set(dates)
+        kept[hall_name] = [entry for entry in previous.get(hall_name, []) if entry.get('date') in skipped]
+        if len(kept[hall_name]) < len(skipped):
+            print(f"[INCREMENTAL] {len(skipped) - len(kept[hall_name])} skipped {hall_name} dates are not in {filename}")
+    return kept
+
+
+def merge_skipped_menus(menus, skipped):
+    """Add the skipped entries (load_skipped_menus) to the scraped menus, so every date in the dropdown is there"""
+    merged = {}
+    for hall_name in dict.fromkeys(list(menus) + list(skipped)):
+        entries = skipped.get(hall_name, []) + menus.get(hall_name, [])
+        merged[hall_name] = sorted(entries, key=lambda entry: menu_date(entry.get('date', '')) or datetime.max.date())
+    return merged
+
+
+def save_menus_to_json(menus, filename=DEFAULT_MENU_FILE):
+    """
+    Save all scraped menu data to a menu file: NDJSON (one compact menu per line),
+    zstd/gzip compressed for a .zst/.gz name, or the nested JSON document for .json
+    """
+    with MenuFileWriter(filename) as menu_file:
+        menu_file.write_menus(menus)
     print(f"Menu data saved to {filename}")
 
 
@@ -340,28 +324,65 @@ def delete_past_week_data(supabase: Client):
         raise
 
 
-async def main():
+async def main(full: bool = False, refresh_dates=(), output: str = DEFAULT_MENU_FILE):
     print("UMass Dining Menu Scraper - All 4 Dining Halls")
 
-    # Step 1: Scrape all menus
-    all_menus = await get_all_dining_hall_menus()
+    # Dates already in the database are skipped unless stale (see menu_dates); --full scrapes them all
+    plan = None
+    if not full and DEFAULT_FETCH_MODE != "replay":
+        try:
+            plan = load_scrape_plan(get_supabase_client(), DINING_HALLS, refresh_dates=refresh_dates)
+        except ValueError as e:
+            print(f"[INCREMENTAL] {e}; scraping every date")
+
+    # Step 1: Scrape all menus (pages unchanged since the last run are not parsed again),
+    # writing each to the menu file as soon as it is scraped
+    cache = MenuPageCache(os.getenv("MENU_PAGE_CACHE", DEFAULT_PAGE_CACHE_FILE))
+    with MenuFileWriter(output) as menu_file:
+        scraped_menus = await get_all_dining_hall_menus(
+            cache=cache, select_dates=plan.select if plan else None, on_menu=menu_file.put
+        )
+        all_menus = scraped_menus
+        if plan:
+            print(f"[INCREMENTAL] {plan.summary()}")
+            skipped = load_skipped_menus(plan, output)
+            menu_file.write_menus(skipped)
+            all_menus = merge_skipped_menus(scraped_menus, skipped)
 
     if all_menus:
         print_summary(all_menus)
-        save_menus_to_json(all_menus)
+        print(f"Menu data saved to {output} ({menu_file.menus} menus)")
+        cache.save()
+        print(f"Page cache: {cache.summary()}")
+        try:
+            rows = write_snapshot(scraped_menus, os.getenv("MENU_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+            print(f"Snapshot: {rows} items written to Parquet")
+        except Exception as e:
+            print(f"[WARNING] Failed to write Parquet snapshot: {e}")
 
         # Step 2: Delete past week's data from Supabase (after successful scraping)
+        if DEFAULT_FETCH_MODE == "replay":
+            print("\n[REPLAY] Menus came from a recording; leaving the database alone")
+            return
         try:
             supabase = get_supabase_client()
             deleted_count = delete_past_week_data(supabase)
             print(f"\n[SUCCESS] Cleanup complete: {deleted_count} old items removed from database")
         except Exception as e:
             print(f"\n[WARNING] Failed to delete past week's data: {e}")
-            print("  (New menu data was still saved to JSON)")
+            print(f"  (New menu data was still saved to {output})")
     else:
         print("No menus were scraped.")
 
 
 # Example usage
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape the UMass dining hall menus")
+    parser.add_argument("--full", action="store_true",
+                        help="Scrape every date in the dropdown, not just those missing from the database")
+    parser.add_argument("--refresh", action="append", default=[], metavar="DATE",
+                        help="Scrape this date again even if loaded (YYYY-MM-DD or 'Fri November 07, 2025'; repeatable)")
+    parser.add_argument("--output", default=DEFAULT_MENU_FILE,
+                        help="Menu file: .ndjson (default), .ndjson.zst/.gz compressed, or .json for the nested document")
+    args = parser.parse_args()
+    asyncio.run(main(full=args.full, refresh_dates=args.refresh, output=args.output))
\ No newline at end of file
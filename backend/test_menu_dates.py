@@ -0,0 +1,105 @@
+"""
+Incremental scraping (menu_dates): which dates a ScrapePlan keeps for a hall
+(never loaded, inside the refresh window, or asked for with refresh_dates), how
+the loaded dates are paged out of the menu_dates view, that an unreadable view
+means a full scrape, and that a replayed scrape only returns the kept dates.
+The Supabase query chain is faked (FakeClient).
+"""
+from datetime import date
+
+import menu_dates
+from menu_dates import ScrapePlan, fetch_loaded_dates, load_scrape_plan, menu_date
+from scrape_testing import HALLS, replay_scrape
+
+DATES = [
+    ("11/07/2025", "Fri November 07, 2025"),
+    ("11/08/2025", "Sat November 08, 2025"),
+    ("11/09/2025", "Sun November 09, 2025"),
+    ("11/10/2025", "Mon November 10, 2025"),
+]
+
+
+class FakeQuery:
+    """The menu_dates query chain, answering with the requested range of `rows`"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.locations = None
+        self.start = self.end = 0
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.locations = set(values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        rows = [row for row in self.rows if row["location"] in self.locations]
+        return type("Response", (), {"data": rows[self.start:self.end + 1]})()
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == "menu_dates"
+        return FakeQuery(self.rows)
+
+
+def test_menu_date_formats():
+    assert menu_date("Fri November 07, 2025") == date(2025, 11, 7)
+    assert menu_date("2025-11-07") == date(2025, 11, 7)
+    assert menu_date("Upcoming") is None
+
+
+def test_plan_skips_loaded_dates_outside_refresh_window():
+    loaded = {"Worcester": {text for _, text in DATES[:3]}}
+    plan = ScrapePlan(loaded, refresh_days=2, today=date(2025, 11, 9))
+
+    assert plan.select("Worcester", DATES) == DATES[2:]  # Sunday is today, Monday was never loaded
+    assert plan.skipped["Worcester"] == [DATES[0][1], DATES[1][1]]
+    assert plan.select("Franklin", DATES) == DATES
+    assert plan.summary() == "6 dates to scrape, 2 already loaded and skipped"
+
+    plan = ScrapePlan(loaded, refresh_days=0, refresh_dates=["2025-11-07"], today=date(2025, 11, 9))
+    assert plan.select("Worcester", DATES) == [DATES[0], DATES[3]]
+
+
+def test_loaded_dates_are_read_page_by_page(monkeypatch):
+    monkeypatch.setattr(menu_dates, "DATES_PAGE_SIZE", 3)
+    rows = [{"location": hall, "date": text} for hall in ("Worcester", "Franklin", "Elsewhere") for _, text in DATES]
+    loaded = fetch_loaded_dates(FakeClient(rows), ["Worcester", "Franklin", "Hampshire"])
+
+    assert loaded == {
+        "Worcester": {text for _, text in DATES},
+        "Franklin": {text for _, text in DATES},
+        "Hampshire": set(),
+    }
+
+
+def test_unreadable_dates_scrape_everything(capsys):
+    class BrokenClient:
+        def table(self, name):
+            raise RuntimeError('relation "public.menu_dates" does not exist')
+
+    assert load_scrape_plan(BrokenClient(), HALLS) is None
+    assert "scraping every date" in capsys.readouterr().out
+
+
+def test_scrape_only_selected_dates():
+    loaded = {hall: {"Fri November 07, 2025", "Sat November 08, 2025"} for hall in HALLS}
+    plan = ScrapePlan(loaded, refresh_days=0, today=date(2025, 11, 7))
+
+    menus = replay_scrape(select_dates=plan.select)
+
+    assert all(len(entries) == 12 for entries in menus.values())
+    assert all(entry["date"] not in loaded[hall] for hall, entries in menus.items() for entry in entries)
@@ -0,0 +1,179 @@
+"""
+Content-hash diffing of food_items (menu_diff)
+
+diff_food_items must sort incoming rows into inserted, changed and unchanged,
+and pick out the stored rows that left an ingested menu, without touching other
+menus. sync_food_items must write only that difference: an identical re-ingest
+issues no writes, and removed items someone logged, ordered or saved in a meal
+template are kept. Supabase is faked by FakeSupabase, an in-memory store whose
+delete_unreferenced_food_items mirrors the SQL function.
+"""
+import menu_diff
+from menu_diff import content_hash, diff_food_items, sync_food_items
+
+
+def item(name, calories=100, meal_type="Lunch", date="2025-11-07", location="Worcester", **fields):
+    return {"name": name, "calories": calories, "meal_type": meal_type, "date": date, "location": location, **fields}
+
+
+MENU = [item("Oatmeal", 150, "Breakfast"), item("Burger", 540), item("Fries", 320), item("Salad", 90)]
+
+
+class FakeQuery:
+    """One table query chain: select/in_/order/range reads and upsert writes"""
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.filters = []
+        self.start, self.end = 0, None
+        self.write = None
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, set(values)))
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.write = ("upsert", rows)
+        return self
+
+    def execute(self):
+        table = self.db.tables[self.name]
+        matching = [row for row in table if all(row.get(column) in values for column, values in self.filters)]
+        if self.write is None:
+            rows = sorted(matching, key=lambda row: row.get("id", 0))
+            return type("Response", (), {"data": rows[self.start:None if self.end is None else self.end + 1]})()
+
+        action, rows = self.write
+        self.db.writes.append((action, self.name, len(rows)))
+        by_key = {menu_diff.food_item_key(row): row for row in table}
+        for row in rows:
+            existing = by_key.get(menu_diff.food_item_key(row))
+            if existing is not None:
+                existing.update(row)
+            else:
+                self.db.next_id += 1
+                table.append({**row, "id": self.db.next_id})
+        return type("Response", (), {"data": []})()
+
+
+class FakeRpc:
+    def __init__(self, db, ids):
+        self.db = db
+        self.ids = set(ids)
+
+    def execute(self):
+        if self.db.conflict_ids & self.ids:  # A meal logged between the check and the delete
+            raise type("APIError", (Exception,), {"code": "23503"})("violates foreign key constraint")
+        tables = self.db.tables
+        referenced = {row["food_item_id"] for row in tables["meal_entries"] + tables["order_items"]}
+        referenced |= {item["food_item_id"] for template in tables["meal_templates"] for item in template["items"]}
+        deleted = [row["id"] for row in tables["food_items"] if row["id"] in self.ids - referenced]
+        tables["food_items"] = [row for row in tables["food_items"] if row["id"] not in deleted]
+        self.db.writes.append(("delete", "food_items", len(deleted)))
+        return type("Response", (), {"data": deleted})()
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {"food_items": [], "meal_entries": [], "order_items": [], "meal_templates": []}
+        self.writes = []
+        self.next_id = 0
+        self.conflict_ids = set()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        assert name == "delete_unreferenced_food_items"
+        return FakeRpc(self, params["ids"])
+
+    def ids(self, **key):
+        return [row["id"] for row in self.tables["food_items"] if all(row[field] == value for field, value in key.items())]
+
+
+def counts(diff):
+    return {name: len(rows) for name, rows in diff.items()}
+
+
+def test_diff_counts():
+    stored = [
+        {"id": 1, **item("Oatmeal", meal_type="Breakfast"), "content_hash": content_hash(MENU[0])},  # Unchanged
+        {"id": 2, **item("Burger"), "content_hash": content_hash(item("Burger", 500))},               # Changed
+        {"id": 3, **item("Fries"), "content_hash": None},                                             # Never hashed
+        {"id": 4, **item("Soup"), "content_hash": "x"},                                               # Off the menu
+        {"id": 5, **item("Soup", date="2025-11-08"), "content_hash": "x"},                            # Other menu
+        {"id": 6, **item("Soup", meal_type="Dinner"), "content_hash": "x"},                           # Other meal
+    ]
+    diff = diff_food_items(MENU + [item("Salad", 95)], stored)  # The later Salad wins
+
+    assert counts(diff) == {"inserted": 1, "changed": 2, "unchanged": 1, "removed_ids": 1}
+    assert diff["inserted"][0]["calories"] == 95
+    assert [row["name"] for row in diff["changed"]] == ["Burger", "Fries"]
+    assert diff["removed_ids"] == [4]
+    assert all(row["content_hash"] == content_hash(row) for row in diff["inserted"] + diff["changed"])
+
+
+def test_hash_covers_name_and_nutrition_only():
+    assert content_hash(item("Burger", 540)) == content_hash(item("Burger", 540.0, date="2025-11-08"))
+    assert content_hash(item("Burger", 540)) != content_hash(item("Burger", 540, protein=30))
+    assert content_hash(item("Burger")) != content_hash(item("Cheeseburger"))
+
+
+def test_sync_writes_only_the_difference():
+    db = FakeSupabase()
+    assert sync_food_items(db, MENU) == {"inserted": 4, "updated": 0, "unchanged": 0, "deleted": 0}
+    assert db.writes == [("upsert", "food_items", 4)]
+
+    db.writes.clear()
+    assert sync_food_items(db, MENU) == {"inserted": 0, "updated": 0, "unchanged": 4, "deleted": 0}
+    assert db.writes == []
+
+    menu = [item("Oatmeal", 150, "Breakfast"), item("Burger", 560), item("Fries", 320), item("Wrap", 410)]
+    assert sync_food_items(db, menu) == {"inserted": 1, "updated": 1, "unchanged": 2, "deleted": 1}
+    assert db.writes == [("upsert", "food_items", 2), ("delete", "food_items", 1)]
+    assert {row["name"] for row in db.tables["food_items"]} == {"Oatmeal", "Burger", "Fries", "Wrap"}
+
+
+def test_referenced_items_are_not_deleted():
+    db = FakeSupabase()
+    menu = MENU + [item("Wrap"), item("Soup")]
+    sync_food_items(db, menu)
+    db.tables["meal_entries"].append({"food_item_id": db.ids(name="Salad")[0]})
+    db.tables["order_items"].append({"food_item_id": db.ids(name="Wrap")[0]})
+    db.tables["meal_templates"].append({"items": [{"food_item_id": db.ids(name="Soup")[0], "servings": 1.0}]})
+
+    assert sync_food_items(db, MENU[:2])["deleted"] == 1  # Fries; the others are still referenced
+    assert {row["name"] for row in db.tables["food_items"]} == {"Oatmeal", "Burger", "Salad", "Wrap", "Soup"}
+
+
+def test_a_delete_racing_a_new_meal_entry_skips_the_batch(monkeypatch):
+    monkeypatch.setattr(menu_diff, "DELETE_BATCH_SIZE", 1)
+    db = FakeSupabase()
+    sync_food_items(db, MENU)
+    db.conflict_ids = set(db.ids(name="Fries"))
+
+    summary = sync_food_items(db, MENU[:2])  # Fries fails on the foreign key, Salad still goes
+    assert summary == {"inserted": 0, "updated": 0, "unchanged": 2, "deleted": 1}
+    assert {row["name"] for row in db.tables["food_items"]} == {"Oatmeal", "Burger", "Fries"}
+
+
+def test_large_menus_are_read_and_written_in_pages(monkeypatch):
+    monkeypatch.setattr(menu_diff, "STORED_PAGE_SIZE", 3)
+    monkeypatch.setattr(menu_diff, "WRITE_BATCH_SIZE", 4)
+    menu = [item(f"Item {i}", i) for i in range(10)]
+    db = FakeSupabase()
+
+    assert sync_food_items(db, menu)["inserted"] == 10
+    assert [count for _, _, count in db.writes] == [4, 4, 2]
+    assert sync_food_items(db, menu)["unchanged"] == 10  # Every page of stored rows was read
@@ -0,0 +1,74 @@
+"""
+When the browserless HTTP scrape (menu_fetch) gives a hall up
+
+Each hall is scraped on its own: a request error, a reply that is not the
+expected {meal: {category: items}} shape, or a page the parser chokes on fails
+that hall alone, and scrape_with_fallback sends only it to the browser. Halls
+that did not fail are passed on as usual, empty menus never are.
+"""
+import asyncio
+
+import menu_fetch
+from menu_html import parse_menu_html
+from scrape_testing import HALLS, FoodProSite
+
+
+def site_breaking(hall_fragment, reply):
+    """A FoodProSite whose menu endpoint answers `reply` for halls whose URL contains hall_fragment"""
+    site = FoodProSite()
+    menu = site.payload
+    site.payload = lambda hall_url, date_value: reply if hall_fragment in hall_url else menu(hall_url, date_value)
+    return site
+
+
+def test_reply_without_meals_fails_the_hall():
+    for reply in ({}, {"breakfast": []}, {"breakfast": {}}):
+        menus, failed = asyncio.run(site_breaking("franklin", reply).fetch())
+
+        assert failed == ["Franklin"]
+        assert set(menus) == set(HALLS) - {"Franklin"}
+
+
+def test_parse_error_fails_only_that_hall():
+    def parse(html_content, date_str, hall):
+        if hall == "Worcester":
+            raise ValueError("unparseable page")
+        return parse_menu_html(html_content, date_str, hall)
+
+    menus, failed = asyncio.run(FoodProSite().fetch(parse_html=parse))
+
+    assert failed == ["Worcester"]
+    assert len(menus) == 3
+
+
+def test_failed_halls_fall_back_to_the_browser(monkeypatch):
+    site = site_breaking("hampshire", {})
+    browser_halls, passed_on = [], []
+
+    async def fetch_from_site(halls, parse_html, limiter=None, **kwargs):
+        return await site.fetch(halls, parse_html, **kwargs)
+
+    async def browser(halls):
+        browser_halls.extend(halls)
+        return {name: [{"date": "Fri November 07, 2025", "location": name, "meals": {}}] for name in halls}
+
+    async def on_menu(hall, menu):
+        passed_on.append(hall)
+
+    monkeypatch.setattr(menu_fetch, "fetch_halls", fetch_from_site)
+    menus = asyncio.run(menu_fetch.scrape_with_fallback(HALLS, parse_menu_html, browser, mode="auto", on_menu=on_menu))
+
+    assert browser_halls == ["Hampshire"]
+    assert list(menus) == list(HALLS)
+    assert "Hampshire" not in passed_on  # The browser scraper calls on_menu for its own halls
+
+
+def test_empty_menus_are_not_passed_on():
+    passed_on = []
+
+    async def on_menu(hall, menu):
+        passed_on.append(hall)
+
+    menus, failed = asyncio.run(FoodProSite().fetch(parse_html=lambda html_content, date_str, hall: None, on_menu=on_menu))
+
+    assert not failed and passed_on == []
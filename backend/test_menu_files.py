@@ -0,0 +1,104 @@
+"""
+The scraper's menu files (menu_files) and everything that reads them back
+
+Each output variant (.ndjson, .json, zstd/gzip compressed) must round-trip the
+checked-in scrape, and a failed or empty scrape must leave the previous file in
+place. On the reading side: NDJSON is told apart from the nested document by
+name or by its first bytes, the nutrition_utils loaders take raw file contents,
+and the streaming upload decoder (menu_ingest) ingests either format when the
+first bytes are split over several small chunks.
+"""
+import asyncio
+
+import pytest
+
+from menu_files import MenuFileWriter, read_menu_file
+from menu_ingest import detect_menu_format, ingest_menu_stream
+from nutrition_utils import get_available_locations, load_dining_hall_menus_from_json, validate_menu_json
+from scrape_testing import SCRAPED_MENUS_FILE, FakeNutritionDB, scraped_menus
+
+MENUS = scraped_menus()
+
+
+@pytest.mark.parametrize("name", ["menus.ndjson", "menus.ndjson.zst", "menus.ndjson.gz", "menus.json", "menus.json.zst"])
+def test_menu_files_round_trip(tmp_path, name):
+    path = tmp_path / name
+    with MenuFileWriter(str(path)) as menu_file:
+        menu_file.write_menus(MENUS)
+
+    assert read_menu_file(str(path)) == MENUS
+    assert not (tmp_path / f"{name}.tmp").exists()
+
+
+def test_ndjson_is_one_compact_menu_per_line(tmp_path):
+    path = tmp_path / "menus.ndjson"
+
+    async def stream():
+        with MenuFileWriter(str(path)) as menu_file:
+            for hall, entries in MENUS.items():
+                for menu in entries:
+                    await menu_file.put(hall, menu)
+                    assert not path.exists()  # Written next to it until the scrape is done
+
+    asyncio.run(stream())
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == sum(len(entries) for entries in MENUS.values())
+    assert lines[0].startswith('{"hall":"Berkshire","date":"Fri November 07, 2025"')
+    assert path.stat().st_size < SCRAPED_MENUS_FILE.stat().st_size
+
+
+def test_failed_or_empty_scrape_keeps_previous_file(tmp_path):
+    path = tmp_path / "menus.ndjson.zst"
+    with MenuFileWriter(str(path)) as menu_file:
+        menu_file.write_menus(MENUS)
+    previous = path.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with MenuFileWriter(str(path)) as menu_file:
+            menu_file.write("Worcester", MENUS["Worcester"][0])
+            raise RuntimeError("scrape failed")
+    with MenuFileWriter(str(path)) as menu_file:
+        pass
+
+    assert not menu_file.saved
+    assert path.read_bytes() == previous
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_format_detection():
+    assert detect_menu_format("menus.ndjson.zst") == "ndjson"
+    assert detect_menu_format("upload.bin", head='{"hall":"Worcester","date":') == "ndjson"
+    assert detect_menu_format("upload.bin", head='{\n  "Worcester": [') == "json"
+    assert detect_menu_format("upload.bin", default=None) is None
+
+
+def test_loaders_accept_ndjson(tmp_path):
+    path = tmp_path / "menus.ndjson.zst"
+    with MenuFileWriter(str(path)) as menu_file:
+        menu_file.write_menus(MENUS)
+    data = path.read_bytes()
+
+    assert get_available_locations(data) == sorted(MENUS)
+    assert validate_menu_json(data) == (True, [])
+    assert len(load_dining_hall_menus_from_json(data)) == len(load_dining_hall_menus_from_json(MENUS))
+    assert validate_menu_json(b'{"hall": "Worcester", "date"')[0] is False
+
+
+@pytest.mark.parametrize("name", ["menus.ndjson.zst", "menus.json"])
+def test_upload_detects_format_from_content(tmp_path, name):
+    path = tmp_path / name
+    with MenuFileWriter(str(path)) as menu_file:
+        menu_file.write_menus(MENUS)
+    data = path.read_bytes()
+
+    async def chunks():
+        for i in range(0, len(data), 100):  # Less than the sniffed prefix per chunk
+            yield data[i:i + 100]
+
+    db = FakeNutritionDB()
+    result = asyncio.run(ingest_menu_stream(chunks(), db, fmt=None, trusted=True))
+
+    assert result["errors"] == []
+    assert result["entries"] == sum(len(entries) for entries in MENUS.values())
+    assert {row["location"] for row in db.rows} == set(MENUS)
@@ -0,0 +1,191 @@
+"""
+Tests and throughput benchmark for the single-pass menu HTML parser (menu_html)
+
+Every saved page in fixtures/menu_html is parsed with each backend and compared
+with the previous BeautifulSoup walker and with the menus in
+all_dining_halls_menus.json. The in-browser extraction (DOM_EXTRACT_SCRIPT's
+output) must turn into the same menus. The benchmark prints pages/s and items/s
+per parser.
+
+Run from backend/: python -m pytest test_menu_html.py -q
+No browser, database or running server is needed.
+"""
+import asyncio
+import time
+
+import pytest
+from bs4 import BeautifulSoup
+
+from menu_html import (
+    DEFAULT_BACKEND,
+    DETAIL_ATTRS,
+    NUTRITION_ATTRS,
+    etree,
+    extract_menu,
+    iter_menu_items,
+    menu_from_extracted,
+    parse_menu_html,
+)
+from scrape_testing import FIXTURES, FakePage, extracted_from_menu, fixture_menu
+
+BENCHMARK_ROUNDS = 20
+
+BACKENDS = ["html.parser"] + (["lxml"] if etree is not None else [])
+
+
+def legacy_parse_menu_from_html(html_content, date_str, location_name):
+    """The BeautifulSoup walk scraper.py used before menu_html"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    menu_data = {'date': date_str, 'location': location_name, 'meals': {}}
+
+    location_header = soup.select_one('.singlepage-content-padding h1')
+    if location_header:
+        detected_location = location_header.get_text(strip=True)
+        if detected_location:
+            menu_data['location'] = detected_location
+
+    for meal_div in soup.find_all('div', id=lambda x: x and '_menu' in x):
+        meal_type = meal_div.get('id').replace('_menu', '')
+        meal_header = meal_div.find('h2')
+        meal_name = meal_header.get_text(strip=True) if meal_header else meal_type
+        menu_data['meals'][meal_name] = {}
+
+        content_div = meal_div.find('div', {'id': 'content_text'})
+        if not content_div:
+            continue
+        for category in content_div.find_all('h2', {'class': 'menu_category_name'}):
+            category_name = category.get_text(strip=True)
+            menu_data['meals'][meal_name][category_name] = []
+            current = category.find_next_sibling()
+            while current:
+                if current.name == 'h2' and 'menu_category_name' in current.get('class', []):
+                    break
+                if current.name == 'li' and 'lightbox-nutrition' in current.get('class', []):
+                    link = current.find('a')
+                    if link:
+                        item = {
+                            'name': link.get_text(strip=True),
+                            'nutrition': {field: link.get(attr, '') for field, attr in NUTRITION_ATTRS.items()},
+                        }
+                        item.update({field: link.get(attr, '') for field, attr in DETAIL_ATTRS.items()})
+                        menu_data['meals'][meal_name][category_name].append(item)
+                current = current.find_next_sibling()
+
+    return menu_data
+
+
+def test_fixtures_present():
+    assert FIXTURES, "fixtures/menu_html is empty"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.stem)
+def test_matches_legacy_parser_and_scraped_menu(path, backend):
+    html_content = path.read_text(encoding="utf-8")
+    hall, entry = fixture_menu(path)
+
+    parsed = parse_menu_html(html_content, entry["date"], hall, backend=backend)
+
+    assert parsed == legacy_parse_menu_from_html(html_content, entry["date"], hall)
+    assert parsed == entry
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_edge_cases_match_legacy_parser(backend):
+    html_content = """
+    <div class="singlepage-content-padding"><h1> Hall <b>Name</b> </h1></div>
+    <div id="dinner_menu"><div id="content_text">
+      <h2 class="menu_category_name">Entrees</h2>
+      <p>Served 5-8pm</p>
+      <li class="lightbox-nutrition featured"><a data-calories="300" data-allergens="Milk &amp; Eggs">Mac &amp; <em>Cheese</em></a></li>
+      <li class="lightbox-nutrition">No link here</li>
+      <div><h2 class="menu_category_name">Nested</h2><li class="lightbox-nutrition"><a>Inner</a></li></div>
+      <li class="lightbox-nutrition"><a data-calories="10">Still entrees</a></li>
+      <h2 class="menu_category_name">Sides</h2>
+      <li class="lightbox-nutrition"><span><a data-protein="2g">Rice</a></span><a>Ignored</a></li>
+    </div><div id="content_text"><h2 class="menu_category_name">Second content</h2></div></div>
+    <div id="late_menu"><h2>Late Night</h2></div>
+    <div id="content_text"><h2 class="menu_category_name">Outside any meal</h2></div>
+    <ul><li class="lightbox-nutrition"><a>Orphan</a></li></ul>
+    """
+    expected = legacy_parse_menu_from_html(html_content, "Mon November 10, 2025", "Fallback")
+    assert expected["meals"]["Entrees"]  # No <h2> header: the first h2 (a category) names the meal
+
+    parsed = parse_menu_html(html_content, "Mon November 10, 2025", "Fallback", backend=backend)
+    assert parsed == expected
+
+    kept = parse_menu_html(html_content, "Mon November 10, 2025", "Fallback", detect_location=False, backend=backend)
+    assert kept["location"] == "Fallback"
+
+
+def test_iter_menu_items_in_page_order():
+    path = FIXTURES[0]
+    hall, entry = fixture_menu(path)
+    items = list(iter_menu_items(path.read_text(encoding="utf-8")))
+
+    expected = [
+        (meal, category, item)
+        for meal, categories in entry["meals"].items()
+        for category, category_items in categories.items()
+        for item in category_items
+    ]
+    assert [(item.meal, item.category, item.as_dict()) for item in items] == expected
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.stem)
+def test_dom_extraction_matches_html_parser(path):
+    html_content = path.read_text(encoding="utf-8")
+    hall, entry = fixture_menu(path)
+
+    assert menu_from_extracted(extracted_from_menu(entry), entry["date"], hall) == parse_menu_html(html_content, entry["date"], hall)
+    assert menu_from_extracted(extracted_from_menu(entry), entry["date"], hall, detect_location=False)["location"] == hall
+
+
+def test_extract_menu_modes(capsys):
+    path = FIXTURES[0]
+    hall, entry = fixture_menu(path)
+    html_content = path.read_text(encoding="utf-8")
+
+    page = FakePage(html_content, extracted_from_menu(entry))
+    assert asyncio.run(extract_menu(page, entry["date"], hall, mode="dom")) == entry
+    assert page.calls == ["evaluate"]  # The page is never serialized
+
+    page = FakePage(html_content, extracted_from_menu(entry))
+    assert asyncio.run(extract_menu(page, entry["date"], hall, mode="html")) == entry
+    assert page.calls == ["content"]
+
+    changed = extracted_from_menu(entry)
+    changed["meals"][0][1][0][1].pop()
+    page = FakePage(html_content, changed)
+    menu = asyncio.run(extract_menu(page, entry["date"], hall, mode="compare"))
+    assert menu != entry
+    assert "DOM and HTML extraction differ" in capsys.readouterr().out
+
+    with pytest.raises(ValueError):
+        asyncio.run(extract_menu(page, entry["date"], hall, mode="xpath"))
+
+
+def _throughput(parse, pages):
+    started = time.perf_counter()
+    items = 0
+    for _ in range(BENCHMARK_ROUNDS):
+        for html_content in pages:
+            menu = parse(html_content)
+            items += sum(len(category) for meal in menu["meals"].values() for category in meal.values())
+    elapsed = time.perf_counter() - started
+    return len(pages) * BENCHMARK_ROUNDS / elapsed, items / elapsed
+
+
+def test_parse_throughput(capsys):
+    pages = [path.read_text(encoding="utf-8") for path in FIXTURES]
+    parsers = {"BeautifulSoup (previous)": lambda page: legacy_parse_menu_from_html(page, "", "")}
+    for backend in BACKENDS:
+        parsers[f"menu_html/{backend}"] = lambda page, backend=backend: parse_menu_html(page, "", "", backend=backend)
+
+    results = {name: _throughput(parse, pages) for name, parse in parsers.items()}
+
+    with capsys.disabled():
+        print(f"\nMenu HTML parse throughput ({len(pages)} pages x {BENCHMARK_ROUNDS}, default backend: {DEFAULT_BACKEND})")
+        baseline = results["BeautifulSoup (previous)"][0]
+        for name, (pages_per_s, items_per_s) in results.items():
+            print(f"  {name:<26} {pages_per_s:8.0f} pages/s {items_per_s:10.0f} items/s  {pages_per_s / baseline:5.1f}x")
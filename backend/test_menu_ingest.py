@@ -0,0 +1,172 @@
+"""
+The streaming upload decoder (menu_ingest) on its own
+
+MenuStreamParser must yield the same entries however the upload is split into
+chunks: splits inside strings, between tokens and inside multi-byte UTF-8
+characters. StreamDecompressor must undo gzip (including concatenated members)
+and zstd fed a few bytes at a time, and ingest_menu_stream must detect either
+compression from the data even when the magic bytes are split across chunks.
+A large entry arriving over many chunks is scanned once rather than re-decoded
+per chunk, and an upload that breaks partway reports what was already written.
+"""
+import asyncio
+import gzip
+import json
+
+import pytest
+import zstandard
+
+import menu_ingest
+from menu_ingest import MenuIngestError, MenuStreamParser, StreamDecompressor, detect_compression, ingest_menu_stream
+from scrape_testing import FakeNutritionDB
+
+MENUS = {
+    "Worcester": [
+        {"date": "Fri November 07, 2025", "meals": {"Lunch": {"Grill": [{"name": "Café Burger", "calories": "540"}]}}},
+        {"date": "Sat November 08, 2025", "meals": {}},
+    ],
+    "Franklin": [
+        {"date": "Fri November 07, 2025", "meals": {"Dinner": {"Entrées": [{"name": "Jalapeño Mac \"n\" Cheese"}]}}},
+    ],
+}
+ENTRIES = [(hall, entry) for hall, entries in MENUS.items() for entry in entries]
+DOCUMENT = ("\ufeff" + json.dumps(MENUS, ensure_ascii=False, indent=2)).encode("utf-8")
+NDJSON = "".join(
+    json.dumps({"hall": hall, **entry}, ensure_ascii=False) + "\n" for hall, entry in ENTRIES
+).encode("utf-8")
+
+
+def parse_in_chunks(data: bytes, fmt: str, *splits: int):
+    parser = MenuStreamParser(fmt)
+    entries = []
+    bounds = [0, *splits, len(data)]
+    for start, end in zip(bounds, bounds[1:]):
+        entries += parser.feed(data[start:end])
+    return entries + parser.close()
+
+
+@pytest.fixture(params=["re-decode", "scan"])
+def pending_values(request, monkeypatch):
+    """Run a test both ways a pending value is tracked: re-decoded per chunk, or scanned"""
+    if request.param == "scan":
+        monkeypatch.setattr(menu_ingest, "SCAN_AFTER_CHARS", 0)
+    return request.param
+
+
+@pytest.mark.parametrize("fmt, data", [("json", DOCUMENT), ("ndjson", NDJSON)])
+def test_every_single_split_point(fmt, data, pending_values):
+    for split in range(len(data) + 1):
+        assert parse_in_chunks(data, fmt, split) == ENTRIES, split
+
+
+@pytest.mark.parametrize("fmt, data", [("json", DOCUMENT), ("ndjson", NDJSON)])
+def test_one_byte_at_a_time(fmt, data, pending_values):
+    assert parse_in_chunks(data, fmt, *range(1, len(data))) == ENTRIES
+
+
+def test_entries_are_yielded_as_soon_as_complete():
+    parser = MenuStreamParser("json")
+    end_of_first = DOCUMENT.index(b"}\n    },") + len(b"}\n    }")
+    assert parser.feed(DOCUMENT[:end_of_first - 1]) == []
+    assert parser.feed(DOCUMENT[end_of_first - 1:end_of_first]) == ENTRIES[:1]
+
+
+def test_truncated_or_invalid_input(pending_values):
+    with pytest.raises(ValueError, match="Unexpected end"):
+        parse_in_chunks(DOCUMENT[:-5], "json")
+    with pytest.raises(ValueError, match="list of menu entries"):
+        parse_in_chunks(b'{"Worcester": {}}', "json")
+    lines = NDJSON.splitlines(keepends=True)
+    with pytest.raises(ValueError, match="line 2"):
+        parse_in_chunks(lines[0] + lines[1][:-2] + b"\n" + lines[2], "ndjson")
+
+
+class CountingDecoder(json.JSONDecoder):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+def test_large_entries_are_decoded_once(monkeypatch):
+    monkeypatch.setattr(menu_ingest, "SCAN_AFTER_CHARS", 1024)
+    entry = {"date": "d", "meals": {"Lunch": {"Grill": [{"name": "Burger \"{deluxe]\"", "calories": "540"}] * 500}}}
+    data = json.dumps({"Worcester": [entry, entry]}).encode("utf-8")
+    parser = MenuStreamParser("json")
+    parser._decoder = decoder = CountingDecoder()
+
+    chunks = range(0, len(data), 64)
+    entries = []
+    for i in chunks:
+        entries += parser.feed(data[i:i + 64])
+    assert entries + parser.close() == [("Worcester", entry)] * 2
+    assert decoder.calls < len(chunks) // 10  # Retries stop once a value passes SCAN_AFTER_CHARS
+
+    with pytest.raises(ValueError, match="Invalid menu JSON"):  # Complete but broken: no need to wait for more
+        MenuStreamParser("json").feed(b'{"Worcester": [{"date": "d", "meals": [1, }] ' + b" " * 2048)
+
+
+def decompress_in_chunks(compression, data: bytes, size: int) -> bytes:
+    decompressor = StreamDecompressor(compression)
+    out = b"".join(decompressor.decompress(data[i:i + size]) for i in range(0, len(data), size))
+    return out + decompressor.flush()
+
+
+@pytest.mark.parametrize("size", [1, 3, 64, 1 << 20])
+def test_gzip_and_zstd_in_chunks(size):
+    compressed = {
+        "gzip": gzip.compress(DOCUMENT),
+        "zstd": zstandard.ZstdCompressor().compress(DOCUMENT),
+    }
+    for compression, data in compressed.items():
+        assert detect_compression(data[:4]) == compression
+        assert decompress_in_chunks(compression, data, size) == DOCUMENT
+
+    members = gzip.compress(NDJSON[:100]) + gzip.compress(NDJSON[100:])
+    assert decompress_in_chunks("gzip", members, size) == NDJSON
+    assert decompress_in_chunks(None, NDJSON, size) == NDJSON
+
+
+def test_corrupt_data_is_a_value_error():
+    with pytest.raises(ValueError, match="gzip"):
+        decompress_in_chunks("gzip", b"\x1f\x8b" + b"\x00" * 20, 8)
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, zstandard.ZstdCompressor().compress, lambda data: data])
+@pytest.mark.parametrize("size", [1, 2, 4096])
+def test_ingest_detects_compression_and_format_from_small_chunks(compress, size):
+    data = compress(NDJSON)
+
+    async def chunks():
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+
+    db = FakeNutritionDB()
+    result = asyncio.run(ingest_menu_stream(chunks(), db, fmt=None, trusted=True))
+
+    assert result["errors"] == []
+    assert result["entries"] == len(ENTRIES)
+    assert {row["location"] for row in db.rows} == {"Worcester", "Franklin"}
+
+
+def test_upload_broken_partway_reports_what_was_written():
+    lines = (NDJSON + b'{"hall": "Worcester", "date": \n' + NDJSON).splitlines(keepends=True)
+
+    async def chunks():
+        for line in lines:
+            yield line
+
+    db = FakeNutritionDB()
+    with pytest.raises(MenuIngestError) as error:
+        asyncio.run(ingest_menu_stream(chunks(), db, fmt="ndjson", trusted=True, batch_size=1))
+
+    assert error.value.partial
+    assert error.value.progress["entries"] == len(ENTRIES)
+    assert error.value.progress["inserted"] == len(db.rows) > 0
+
+    with pytest.raises(MenuIngestError) as error:
+        asyncio.run(ingest_menu_stream(chunks(), FakeNutritionDB(), fmt="ndjson", trusted=True))
+    assert not error.value.partial  # Nothing reached a full batch before the error
@@ -0,0 +1,79 @@
+"""
+Tests for the scraped menu hash cache (menu_page_cache)
+
+Run from backend/: python -m pytest test_menu_page_cache.py -q
+No browser, database or running server is needed.
+"""
+import asyncio
+import json
+
+from menu_html import extract_menu, parse_menu_html
+from menu_page_cache import MenuPageCache, menu_hash
+from scrape_testing import FIXTURES, FakePage, extracted_from_menu, fixture_menu, fixture_page
+
+
+def test_unchanged_menus_are_left_out(tmp_path):
+    path = tmp_path / "cache.json"
+    hall, entry, html_content = fixture_page()
+
+    cache = MenuPageCache(str(path))
+    assert cache.cached_parser(parse_menu_html)(html_content, entry["date"], hall) == entry
+    assert cache.changed_menus({hall: [entry]}) == {hall: [entry]}
+    cache.save()
+
+    cache = MenuPageCache(str(path))
+    assert cache.cached_parser(parse_menu_html)(html_content, entry["date"], hall) == entry
+    assert cache.changed_menus({hall: [entry]}) == {hall: []}
+
+    changed = html_content.replace("BRK Brkfst Sausage Sandwich", "BRK Brkfst Bacon Sandwich")
+    cache.cached_parser(parse_menu_html)(changed, entry["date"], hall)
+    assert cache.changed_menus({hall: [entry]}) == {hall: [entry]}
+
+
+def test_menu_hash_ignores_the_date():
+    _, entry, _ = fixture_page()
+    assert menu_hash(entry) == menu_hash({**entry, "date": "Sat November 08, 2025"})
+    assert menu_hash(entry) != menu_hash({**entry, "location": "Elsewhere"})
+
+
+def test_save_drops_dates_no_longer_scraped(tmp_path):
+    path = tmp_path / "cache.json"
+    menu = {"location": "Worcester", "meals": {}}
+    cache = MenuPageCache(str(path))
+    cache.check("Worcester", "Mon", menu)
+    cache.check("Worcester", "Tue", menu)
+    cache.check("Franklin", "Mon", menu)
+    cache.save()
+
+    cache = MenuPageCache(str(path))
+    cache.check("Worcester", "Tue", menu)
+    cache.save()
+
+    pages = json.loads(path.read_text(encoding="utf-8"))["pages"]
+    assert set(pages["Worcester"]) == {"Tue"}
+    assert set(pages["Franklin"]) == {"Mon"}  # Not scraped this time, kept as is
+    assert set(pages["Worcester"]["Tue"]) == {"hash", "scraped_at"}  # No copy of the menu
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert MenuPageCache(str(path)).pages == {}
+
+
+def test_scrape_paths_share_entries(tmp_path):
+    """A hall the HTTP path cached is still unchanged after falling back to the browser, and back"""
+    for path in FIXTURES:
+        hall, entry = fixture_menu(path)
+        html_content = path.read_text(encoding="utf-8")
+        cache = MenuPageCache(str(tmp_path / f"{path.stem}.json"))
+        cache.cached_parser(parse_menu_html)(html_content, entry["date"], hall)
+
+        for mode in ("dom", "html", "compare"):
+            page = FakePage(html_content, extracted_from_menu(entry))
+            assert asyncio.run(extract_menu(page, entry["date"], hall, mode=mode, cache=cache)) == entry
+            assert cache.unchanged == {(hall, entry["date"])}, (path.name, mode)
+
+        cache.unchanged.clear()
+        cache.cached_parser(parse_menu_html)(html_content, entry["date"], hall)
+        assert cache.unchanged == {(hall, entry["date"])}
@@ -0,0 +1,105 @@
+"""
+The scrape -> normalize -> write pipeline (menu_pipeline), fed by the replayed
+recording with an in-memory writer standing in for Supabase: writes start before
+the scrape ends, batches never split a menu, skipped (unchanged) menus are left
+out, and a failing write stops the pipeline without hanging it, even when the
+scrape is blocked on a full queue.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from menu_fetch import scrape_with_fallback
+from menu_html import parse_menu_html
+from menu_pipeline import MenuPipeline
+from nutrition_parsing import menu_rows
+from scrape_testing import HALLS, no_browser
+
+
+def replay_producer(events):
+    async def produce(on_menu):
+        menus = await scrape_with_fallback(HALLS, parse_menu_html, no_browser, mode="replay", on_menu=on_menu)
+        events.append("scraped")
+        return menus
+    return produce
+
+
+class Writer:
+    def __init__(self, events, fail_on=None):
+        self.events = events
+        self.fail_on = fail_on
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self.lock:
+            if len(self.batches) + 1 == self.fail_on:
+                raise RuntimeError("database went away")
+            self.batches.append(rows)
+            self.events.append("write")
+        return {"inserted": len(rows), "updated": 0, "unchanged": 0, "deleted": 0}
+
+
+def test_menus_are_written_in_batches_of_whole_menus_while_scraping():
+    events = []
+    writer = Writer(events)
+    pipeline = MenuPipeline(write_batch=writer, batch_rows=200, queue_size=2)
+
+    menus = asyncio.run(pipeline.run(replay_producer(events)))
+
+    expected = [row for hall, entries in menus.items() for entry in entries for row in menu_rows(entry, hall, trusted=True)]
+    assert [row for batch in writer.batches for row in batch] == expected
+    assert pipeline.summary["inserted"] == len(expected) == pipeline.rows
+    assert pipeline.menus == 56 and pipeline.batches == len(writer.batches) > 1
+    assert events.index("write") < events.index("scraped")  # Writing started before the scrape finished
+
+    seen = set()
+    for batch in writer.batches:
+        menus_in_batch = {(row["location"], row["date"]) for row in batch}
+        assert not menus_in_batch & seen  # No menu is split across batches
+        seen |= menus_in_batch
+
+
+def test_skipped_menus_are_not_written():
+    events = []
+    writer = Writer(events)
+    pipeline = MenuPipeline(write_batch=writer, skip=lambda hall, menu: hall != "Hampshire")
+
+    asyncio.run(pipeline.run(replay_producer(events)))
+
+    assert pipeline.menus_skipped == 42
+    assert {row["location"] for batch in writer.batches for row in batch} == {"Hampshire"}
+
+
+def test_failed_write_stops_the_pipeline():
+    events = []
+    writer = Writer(events, fail_on=2)
+    pipeline = MenuPipeline(write_batch=writer, batch_rows=200, queue_size=2)
+
+    with pytest.raises(RuntimeError, match="database went away"):
+        asyncio.run(pipeline.run(replay_producer(events)))
+
+    assert len(writer.batches) == 1  # Batches before the failure stay written
+    assert "scraped" not in events
+
+
+def test_failed_write_with_a_full_queue_does_not_hang():
+    def slow_failing_writer(rows):
+        time.sleep(0.2)  # Long enough for every queue to fill up behind it
+        raise RuntimeError("database went away")
+
+    pipeline = MenuPipeline(write_batch=slow_failing_writer, batch_rows=1, queue_size=1)
+
+    async def run():
+        # The scrape is blocked on the full menu queue when the write fails
+        return await asyncio.wait_for(pipeline.run(replay_producer([])), timeout=10)
+
+    with pytest.raises(RuntimeError, match="database went away"):
+        asyncio.run(run())
+
+
+def test_needs_a_client_or_writer():
+    with pytest.raises(ValueError):
+        MenuPipeline()
@@ -0,0 +1,65 @@
+"""
+Record/replay round trips (menu_replay)
+
+The checked-in recording in fixtures/scrape replays to all_dining_halls_menus.json,
+which is what keeps it usable as a regression set. Recording is checked from both
+sides: an HTTP scrape against the fake dining site must replay to the menus it
+returned, and a browser scrape must save the menu markup MENU_MARKUP_SCRIPT
+serializes rather than the whole page.
+"""
+import asyncio
+
+import pytest
+
+import menu_replay
+from menu_html import MENU_MARKUP_SCRIPT, extract_menu, parse_menu_html
+from menu_replay import ScrapeRecorder, date_file_name, load_dates, replay_halls
+from scrape_testing import FIXTURES, HALLS, HERE, FakePage, FoodProSite, extracted_from_menu, fixture_menu, replay_scrape, scraped_menus
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = ScrapeRecorder(str(tmp_path / "recording"))
+    menu_replay.set_recorder(recorder)
+    yield recorder
+    menu_replay.set_recorder(None)
+
+
+def test_date_file_name():
+    assert date_file_name("Fri November 07, 2025") == "2025-11-07.html"
+    assert date_file_name("Next week / special") == "Next-week-special.html"
+
+
+def test_recording_replays_scraped_menus():
+    assert replay_scrape() == scraped_menus()
+
+
+def test_http_scrape_records_and_replays(recorder):
+    site = FoodProSite()
+    menus, failed = asyncio.run(site.fetch())
+
+    assert not failed
+    assert load_dates("Worcester", recorder.root) == site.dates
+    assert replay_halls(HALLS, parse_menu_html, recorder.root) == menus
+
+
+def test_browser_scrape_records_menu_markup(recorder):
+    hall, entry = fixture_menu(FIXTURES[0])
+    markup = (HERE / "fixtures" / "scrape" / hall / date_file_name(entry["date"])).read_text(encoding="utf-8")
+
+    class RecordedPage(FakePage):
+        async def evaluate(self, script, arg=None):
+            if script == MENU_MARKUP_SCRIPT:
+                return markup
+            return await super().evaluate(script, arg)
+
+    page = RecordedPage(None, extracted_from_menu(entry))
+    assert asyncio.run(extract_menu(page, entry["date"], hall)) == entry
+    recorder.record_dates(hall, [("11/07/2025", entry["date"])])
+
+    assert replay_halls({hall: ""}, parse_menu_html, recorder.root) == {hall: [entry]}
+
+
+def test_missing_recordings_are_skipped(tmp_path, capsys):
+    assert replay_halls(HALLS, parse_menu_html, str(tmp_path)) == {}
+    assert "No recorded dates for Berkshire" in capsys.readouterr().out
@@ -0,0 +1,111 @@
+"""
+Nutrient totals and trend buckets (nutrition_aggregation)
+
+Group totals must weight every nutrient by servings and count missing values as
+0. summarize_trends must return a bucket for every day/week/month in the range,
+clipped to it, including buckets and ranges with no entries at all: those report
+zero totals, zero averages and zero goal adherence rather than NaN or a gap.
+"""
+import math
+
+import pytest
+
+from nutrition_aggregation import NUTRIENTS, NutrientFrame, empty_totals, summarize_trends
+
+
+def row(date, calories, servings=1.0, category="Lunch", profile_id="u1", protein=None):
+    return {
+        "profile_id": profile_id,
+        "entry_date": date,
+        "meal_category": category,
+        "servings": servings,
+        "food_items": {"calories": calories, "protein": protein},
+    }
+
+
+FRAME = NutrientFrame.from_rows([
+    row("2025-11-03", 500, protein=20),                      # Monday
+    row("2025-11-03", 300, servings=2, category="Dinner"),
+    row("2025-11-05T12:30:00", 1000, profile_id="u2"),
+    row("2025-11-19", 2000),                                 # Two weeks later
+])
+
+
+def test_totals_weight_servings_and_fill_missing_nutrients():
+    assert FRAME.totals()["calories"] == 500 + 600 + 1000 + 2000
+    assert FRAME.totals()["protein"] == 20
+    assert FRAME.totals()["meal_count"] == 4
+
+    by_day = FRAME.totals_by_day()
+    assert list(by_day) == ["2025-11-03", "2025-11-05", "2025-11-19"]
+    assert by_day["2025-11-03"]["calories"] == 1100
+    assert by_day["2025-11-03"]["meal_count"] == 2
+
+    by_day_and_user = FRAME.group_totals("day", "user")
+    assert by_day_and_user[("2025-11-05", "u2")]["calories"] == 1000
+    assert set(FRAME.totals_by_week()) == {"2025-11-03", "2025-11-17"}
+
+
+def test_empty_frame():
+    frame = NutrientFrame.from_rows([])
+
+    assert len(frame) == 0
+    assert frame.totals() == empty_totals()
+    assert frame.group_totals("day", "meal_category") == {}
+    with pytest.raises(ValueError):
+        frame.group_totals()
+
+    dates, sums, meal_counts = frame.daily_matrix("2025-11-01", "2025-11-03")
+    assert len(dates) == 3
+    assert sums.shape == (3, len(NUTRIENTS)) and not sums.any()
+    assert meal_counts.tolist() == [0, 0, 0]
+
+
+def test_range_without_entries_has_empty_buckets():
+    buckets = summarize_trends(NutrientFrame.from_rows([]), "2025-11-01", "2025-11-10", "day", goals={"calories": 2000})
+
+    assert len(buckets) == 10
+    for bucket in buckets:
+        assert bucket["days"] == 1 and bucket["days_logged"] == 0
+        assert bucket["totals"] == empty_totals()
+        assert all(value == 0 for value in bucket["averages"].values())
+        assert bucket["goal_adherence"] == {"calories": 0.0}
+
+
+def test_empty_weeks_between_logged_ones():
+    buckets = summarize_trends(FRAME, "2025-11-01", "2025-11-20", "week", goals={"calories": 1100, "protein": 0})
+
+    assert [(bucket["start_date"], bucket["end_date"], bucket["days"]) for bucket in buckets] == [
+        ("2025-11-01", "2025-11-02", 2),  # Clipped to the range start
+        ("2025-11-03", "2025-11-09", 7),
+        ("2025-11-10", "2025-11-16", 7),
+        ("2025-11-17", "2025-11-20", 4),  # Clipped to the range end
+    ]
+    empty, logged, gap, last = buckets
+
+    for bucket in (empty, gap):
+        assert bucket["days_logged"] == 0
+        assert bucket["totals"]["calories"] == 0 and bucket["totals"]["meal_count"] == 0
+        assert bucket["averages"]["calories"] == 0
+        assert bucket["goal_adherence"] == {"calories": 0.0}  # A goal of 0 is no goal
+
+    assert logged["days_logged"] == 2
+    assert logged["totals"]["calories"] == 2100
+    assert logged["averages"]["calories"] == 1050  # Per logged day, not per day of the week
+    assert logged["goal_adherence"] == {"calories": 1.0}  # 1100 and 1000 are within 10% of 1100
+    assert last["goal_adherence"] == {"calories": 0.0}
+
+    for bucket in buckets:
+        assert not any(math.isnan(value) for value in bucket["averages"].values())
+
+
+def test_month_buckets_and_degenerate_ranges():
+    months = summarize_trends(FRAME, "2025-10-15", "2025-12-02", "month")
+    assert [(bucket["start_date"], bucket["end_date"]) for bucket in months] == [
+        ("2025-10-15", "2025-10-31"), ("2025-11-01", "2025-11-30"), ("2025-12-01", "2025-12-02"),
+    ]
+    assert [bucket["totals"]["meal_count"] for bucket in months] == [0, 4, 0]
+
+    assert summarize_trends(FRAME, "2025-11-10", "2025-11-01", "day") == []
+    with pytest.raises(ValueError):
+        summarize_trends(FRAME, "2025-11-01", "2025-11-10", "year")
@@ -0,0 +1,66 @@
+"""
+The profile cache in NutritionDatabase
+
+A profile read is served from the cache while fresh, and the cache keeps at most
+profile_cache_size profiles, evicting the least recently used one. Supabase is
+faked by ProfilesClient, which counts the profile reads that reach it.
+"""
+import asyncio
+
+from nutrition_db import NutritionDatabase
+
+
+class ProfilesClient:
+    """The profiles select chain: table().select().eq("id", ...).execute()"""
+
+    def __init__(self):
+        self.reads = []
+
+    def table(self, name):
+        assert name == "profiles"
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.user_id = value
+        return self
+
+    def execute(self):
+        self.reads.append(self.user_id)
+        row = {"id": self.user_id, "age": 20, "sex": "Other", "activity_level": 2, "bmr": 1500, "tdee": 2000}
+        return type("Response", (), {"data": [row]})()
+
+
+def read(db, *user_ids):
+    async def get_all():
+        return [await db.get_profile(user_id) for user_id in user_ids]
+    return asyncio.run(get_all())
+
+
+def test_fresh_profiles_are_served_from_the_cache():
+    client = ProfilesClient()
+    db = NutritionDatabase(client)
+
+    first, second = read(db, "u1", "u1")
+    assert first is second
+    assert client.reads == ["u1"]
+
+    db = NutritionDatabase(client, profile_cache_ttl=0)
+    client.reads.clear()
+    read(db, "u1", "u1")
+    assert client.reads == ["u1", "u1"]
+
+
+def test_cache_evicts_the_least_recently_used_profile():
+    client = ProfilesClient()
+    db = NutritionDatabase(client, profile_cache_size=2)
+
+    read(db, "u1", "u2", "u1", "u3")  # u2 is the least recently used when u3 arrives
+    assert list(db._profile_cache) == ["u1", "u3"]
+
+    client.reads.clear()
+    read(db, "u1", "u3", "u2")
+    assert client.reads == ["u2"]
+    assert len(db._profile_cache) == 2
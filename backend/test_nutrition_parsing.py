@@ -0,0 +1,108 @@
+"""
+Single-pass menu validation (nutrition_parsing.menu_rows) and its sharded form
+(menu_parallel.parse_shards_async)
+
+menu_rows must turn a menu entry into food_items rows while skipping only the
+broken part (entry, meal, section or item) and reporting it under its JSON
+Pointer. parse_shards_async must return the same rows, in document order, and
+the same capped errors whether it parses in-process or across a process pool,
+for decoded entries and raw NDJSON lines alike.
+"""
+import asyncio
+import json
+
+import pytest
+
+from menu_parallel import MIN_PARALLEL_SHARDS, create_parse_pool, parse_shards_async
+from nutrition_parsing import MenuErrors, menu_rows
+
+BURGER = {"name": "Burger", "nutrition": {"calories": "540", "sodium": "1.2g", "protein": "<1g", "total_fat": "2-3g"}}
+ENTRY = {"date": "Fri November 07, 2025", "meals": {"Lunch": {"Grill/Hot": [BURGER]}}}
+
+
+def test_rows_from_a_valid_entry():
+    rows = menu_rows(ENTRY, "Worcester")
+
+    assert rows == [{
+        "name": "Burger", "serving_size": "1 serving", "calories": 540, "total_fat": 2.5, "sodium": 1200.0,
+        "total_carb": 0.0, "dietary_fiber": 0.0, "sugars": 0.0, "protein": 0.5,
+        "location": "Worcester", "date": "Fri November 07, 2025", "meal_type": "Lunch",
+    }]
+    assert menu_rows(ENTRY, "Worcester", trusted=True) == rows
+
+
+def test_only_the_broken_part_is_skipped():
+    entry = {"date": "Fri November 07, 2025", "meals": {
+        "Lunch": {"Grill/Hot": [BURGER, 5, {"name": ""}, {"name": "Fries", "nutrition": {"calories": -1}}]},
+        "Dinner": ["not", "sections"],
+        "Breakfast": {"Cereal": "not a list", "Hot": [{"name": "Oatmeal"}]},
+    }}
+    errors = MenuErrors()
+    rows = menu_rows(entry, "Worcester", errors, "/Worcester/0")
+
+    assert [(row["meal_type"], row["name"]) for row in rows] == [("Lunch", "Burger"), ("Breakfast", "Oatmeal")]
+    assert errors.as_list() == [
+        "/Worcester/0/meals/Lunch/Grill~1Hot/1: item must be an object",
+        "/Worcester/0/meals/Lunch/Grill~1Hot/2/name: must be a non-empty string",
+        "/Worcester/0/meals/Lunch/Grill~1Hot/3/nutrition/calories: must not be negative",
+        "/Worcester/0/meals/Dinner: must be an object of sections",
+        "/Worcester/0/meals/Breakfast/Cereal: must be a list of items",
+    ]
+
+
+@pytest.mark.parametrize("entry, expected", [
+    ([], ["/W/0: menu entry must be an object"]),
+    ({"meals": {}}, ["/W/0/date: missing"]),
+    ({"date": 7, "meals": []}, ["/W/0/date: must be a string", "/W/0/meals: must be an object of meals"]),
+])
+def test_broken_entries_are_skipped_whole(entry, expected):
+    errors = MenuErrors()
+    assert menu_rows(entry, "W", errors, "/W/0") == []
+    assert errors.as_list() == expected
+
+
+def test_errors_are_capped():
+    errors = MenuErrors(limit=2)
+    menu_rows({"date": "d", "meals": {"Lunch": {"Grill": [1, 2, 3, 4]}}}, "W", errors)
+    assert len(errors) == 4
+    assert errors.as_list()[-1] == "2 more errors omitted"
+
+
+def shards():
+    """Enough (hall, date) shards to use the pool: decoded entries and raw NDJSON lines, some broken"""
+    result = []
+    for idx in range(MIN_PARALLEL_SHARDS + 5):
+        entry = {"date": f"Day {idx}", "meals": {"Lunch": {"Grill": [BURGER, {"name": f"Special {idx}"}]}}}
+        if idx % 3 == 0:
+            result.append((None, idx, json.dumps({"hall": "Franklin", **entry})))
+        elif idx % 7 == 0:
+            result.append(("Worcester", idx, {"date": f"Day {idx}"}))
+        else:
+            result.append(("Worcester", idx, entry))
+    result.append((None, len(result), '{"hall": "Franklin", "date"'))
+    return result
+
+
+def parse(executor, error_limit=50):
+    errors = MenuErrors(error_limit)
+    rows = asyncio.run(parse_shards_async(shards(), executor, errors))
+    return rows, errors
+
+
+def test_shards_parse_the_same_in_a_process_pool():
+    in_process, in_process_errors = parse(None)
+    pool = create_parse_pool(2)
+    try:
+        pooled, pooled_errors = parse(pool)
+        _, capped = parse(pool, error_limit=3)
+    finally:
+        pool.shutdown()
+
+    assert pooled == in_process
+    assert pooled_errors.as_list() == in_process_errors.as_list()
+    assert len(capped) == len(in_process_errors) and len(capped.messages) == 3
+
+    assert [row["date"] for row in in_process[:4]] == ["Day 0", "Day 0", "Day 1", "Day 1"]  # Document order
+    assert {row["location"] for row in in_process if row["date"] == "Day 3"} == {"Franklin"}
+    assert in_process_errors.as_list()[-1].startswith(f"/line {len(shards())}: invalid JSON")
+    assert "/Worcester/7/meals: missing" in in_process_errors.as_list()
@@ -0,0 +1,147 @@
+"""
+Parsing off the event loop (menu_html.ParsePool) and measuring it (scrape_pool.ScrapeTimeline)
+
+Covers the interval arithmetic the [TIMING] report is built on, that every
+executor parses a page exactly like parse_menu_html, that a page-cache-wrapped
+parser checks its cache on the loop (so it also works with a process pool), and
+the two ways pages reach the pool: HTTP pages parsed while other requests are in
+flight, and browser pages in "html" mode handed back as a pending parse. Also
+pins which configurations run parses in parallel: only the process executor,
+the default off Lambda, and never the "dom" extract mode.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from menu_html import ParsePool, default_parse_executor, extract_menu, parse_menu_html
+from menu_page_cache import MenuPageCache
+from scrape_pool import ScrapeTimeline
+from scrape_testing import FakePage, FoodProSite, extracted_from_menu, fixture_page
+
+
+def test_timeline_overlap():
+    timeline = ScrapeTimeline()
+    timeline.add("fetch", 0.0, 2.0)
+    timeline.add("fetch", 1.0, 3.0)
+    timeline.add("browser", 5.0, 6.0)
+    timeline.add("parse", 2.5, 4.0)
+    timeline.add("parse", 5.5, 7.0)
+
+    assert timeline.busy("fetch") == 3.0
+    assert timeline.busy("fetch", "browser") == 4.0
+    assert timeline.busy("parse") == 3.0
+    assert timeline.overlap("parse", ["fetch", "browser"]) == 1.0
+    assert "1.00s of parsing overlapped I/O (33%)" in timeline.report()
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        ParsePool("fibers")
+
+
+def test_default_executor(monkeypatch):
+    monkeypatch.delenv("SCRAPER_PARSE_EXECUTOR", raising=False)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    assert default_parse_executor() == "process"
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "menu-scraper")
+    assert default_parse_executor() == "thread"
+    monkeypatch.setenv("SCRAPER_PARSE_EXECUTOR", "inline")
+    assert default_parse_executor() == "inline"
+
+
+def where_parsed(html_content, date_str, location_name):
+    """A stand-in parser, slow enough that two calls in parallel overlap"""
+    time.sleep(0.3)
+    return {"pid": os.getpid(), "thread": threading.get_ident()}
+
+
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+def test_where_each_executor_parses(executor):
+    async def parse_two():
+        with ParsePool(executor, workers=2) as pool:
+            return await asyncio.gather(*(pool.parse(where_parsed, "", "Mon", hall) for hall in ("Worcester", "Franklin")))
+
+    workers = asyncio.run(parse_two())
+    pids = {worker["pid"] for worker in workers}
+    threads = {(worker["pid"], worker["thread"]) for worker in workers}
+
+    if executor == "process":  # Two worker processes, so two pages at once
+        assert len(pids) == 2 and os.getpid() not in pids
+    elif executor == "thread":  # Off the loop, but in this process under one GIL
+        assert pids == {os.getpid()}
+        assert threading.get_ident() not in {thread for _, thread in threads}
+    else:
+        assert threads == {(os.getpid(), threading.get_ident())}
+
+
+def test_dom_mode_does_not_use_the_pool():
+    hall, entry, html_content = fixture_page()
+    timeline = ScrapeTimeline()
+
+    async def extract():
+        with ParsePool("thread", workers=1, timeline=timeline) as pool:
+            page = FakePage(html_content, extracted_from_menu(entry))
+            return await extract_menu(page, entry["date"], hall, mode="dom", parse_pool=pool)
+
+    assert asyncio.run(extract()) == entry
+    assert not timeline.spans.get("parse")
+
+
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+def test_pool_parses_like_the_parser(executor):
+    hall, entry, html_content = fixture_page()
+    timeline = ScrapeTimeline()
+
+    async def parse():
+        with ParsePool(executor, workers=2, timeline=timeline) as pool:
+            return await pool.parse(parse_menu_html, html_content, entry["date"], hall)
+
+    assert asyncio.run(parse()) == parse_menu_html(html_content, entry["date"], hall)
+    assert len(timeline.spans["parse"]) == 1
+
+
+def test_pool_checks_the_page_cache_on_the_loop(tmp_path):
+    hall, entry, html_content = fixture_page()
+    cache = MenuPageCache(str(tmp_path / "cache.json"))
+    timeline = ScrapeTimeline()
+
+    async def parse_twice():
+        # A process pool only works if the cache wrapper (a closure) stays on the loop
+        with ParsePool("process", workers=1, timeline=timeline) as pool:
+            parse = cache.cached_parser(parse_menu_html)
+            first = await pool.parse(parse, html_content, entry["date"], hall)
+            second = await pool.parse(parse, html_content, entry["date"], hall)
+            return first, second
+
+    first, second = asyncio.run(parse_twice())
+
+    assert first == second == parse_menu_html(html_content, entry["date"], hall)
+    assert cache.unchanged == {(hall, entry["date"])}
+    assert len(timeline.spans["parse"]) == 2
+
+
+def test_http_pages_are_parsed_while_fetching():
+    timeline = ScrapeTimeline()
+    with ParsePool("thread", workers=2, timeline=timeline) as pool:
+        pooled, failed = asyncio.run(FoodProSite().fetch(parse_pool=pool))
+
+    assert not failed
+    assert pooled == asyncio.run(FoodProSite().fetch())[0]
+    assert len(timeline.spans["fetch"]) == len(timeline.spans["parse"]) == 8
+
+
+def test_html_extraction_returns_a_pending_parse():
+    hall, entry, html_content = fixture_page()
+
+    async def extract():
+        with ParsePool("thread", workers=1) as pool:
+            page = FakePage(html_content, extracted_from_menu(entry))
+            pending = await extract_menu(page, entry["date"], hall, mode="html", parse_pool=pool)
+            assert page.calls == ["content"]
+            assert isinstance(pending, asyncio.Future)
+            return await pending
+
+    assert asyncio.run(extract()) == parse_menu_html(html_content, entry["date"], hall)
@@ -11,11 +11,13 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { supabase } from "@/integrations/supabase/client";
+import { nutritionApi } from "@/lib/api";
 import { toast } from "@/hooks/use-toast";
 import { Loader2 } from "lucide-react";
 
 type OrderItem = {
   id: string;
+  food_item_id: number;
   food_item_name: string;
   quantity: number;
   calories: number;
@@ -25,6 +27,9 @@ type OrderItem = {
   dining_hall?: string | null;
 };
 
+// The nutrition API accepts at most this many servings per meal entry
+const MAX_SERVINGS_PER_ENTRY = 20;
+
 type MealTrackingDialogProps = {
   open: boolean;
   onOpenChange: (open: boolean) => void;
@@ -39,7 +44,6 @@ export function MealTrackingDialog({
   orderId,
 }: MealTrackingDialogProps) {
   const [loading, setLoading] = useState(false);
-  const [mealName, setMealName] = useState("");
   const [servings, setServings] = useState("1");
 
   const totalCalories = orderItems.reduce((sum, item) => sum + (item.calories * item.quantity), 0);
@@ -53,84 +57,43 @@ export function MealTrackingDialog({
       const { data: { user } } = await supabase.auth.getUser();
       if (!user) throw new Error("No user found");
 
-      // Get or create food item for this meal
-      const foodItemName = mealName || orderItems.map(item => item.food_item_name).join(", ");
       const servingMultiplier = parseFloat(servings);
-      const location = orderItems[0]?.dining_hall || "Custom";
-      const currentDate = new Date().toISOString().split('T')[0];
-      const mealType = "Lunch";
-
-      // Check if food item already exists
-      const { data: existingFoodItem } = await supabase
-        .from("food_items")
-        .select()
-        .eq("name", foodItemName)
-        .eq("location", location)
-        .eq("date", currentDate)
-        .eq("meal_type", mealType)
-        .maybeSingle();
-
-      let foodItem;
-
-      if (existingFoodItem) {
-        // Use existing food item
-        foodItem = existingFoodItem;
-      } else {
-        // Create new food item
-        const { data: newFoodItem, error: foodError } = await supabase
-          .from("food_items")
-          .insert({
-            name: foodItemName,
-            calories: Math.round(totalCalories / servingMultiplier),
-            total_fat: totalFat / servingMultiplier,
-            sodium: 0,
-            total_carb: totalCarbs / servingMultiplier,
-            dietary_fiber: 0,
-            sugars: 0,
-            protein: totalProtein / servingMultiplier,
-            serving_size: "1 meal",
-            location: location,
-            meal_type: mealType,
-            date: currentDate,
-          })
-          .select()
-          .single();
-
-        if (foodError) throw foodError;
-        foodItem = newFoodItem;
-      }
-
-      // Add to meal entries
-      const { data: mealEntry, error: entryError } = await supabase
-        .from("meal_entries")
-        .insert({
-          profile_id: user.id,
-          food_item_id: foodItem.id,
-          meal_category: "Lunch",
-          entry_date: new Date().toISOString().split('T')[0],
-          servings: servingMultiplier,
-        })
-        .select()
-        .single();
-
-      if (entryError) throw entryError;
-
-      // Add individual items to meal_entry_items table
-      const mealEntryItems = orderItems.map(item => ({
-        meal_entry_id: mealEntry.id,
-        order_item_id: item.id,
-        food_item_name: item.food_item_name,
-        quantity: item.quantity,
-        calories: item.calories,
-        protein: item.protein,
-        carbs: item.carbs,
-        fat: item.fat,
-        dining_hall: item.dining_hall,
-      }));
+      if (!(servingMultiplier > 0)) throw new Error("Number of servings must be greater than 0");
+
+      // Log every ordered item in one batch request, scaled by the servings eaten.
+      // Larger amounts are split evenly over several entries of at most MAX_SERVINGS_PER_ENTRY.
+      const items: { food_item_id: number; servings: number }[] = [];
+      const firstEntryIndex = orderItems.map(item => {
+        const total = item.quantity * servingMultiplier;
+        const count = Math.ceil(total / MAX_SERVINGS_PER_ENTRY);
+        const first = items.length;
+        for (let i = 0; i < count; i++) {
+          items.push({ food_item_id: item.food_item_id, servings: total / count });
+        }
+        return first;
+      });
 
+      const mealEntries = await nutritionApi.createMealEntriesBatch({
+        profile_id: user.id,
+        meal_category: "Lunch",
+        entry_date: new Date().toISOString().split('T')[0],
+        items,
+      });
+
+      // Link each order item to its (first) meal entry; entries come back in request order
       const { error: itemsError } = await supabase
         .from("meal_entry_items")
-        .insert(mealEntryItems);
+        .insert(orderItems.map((item, index) => ({
+          meal_entry_id: mealEntries[firstEntryIndex[index]].id,
+          order_item_id: item.id,
+          food_item_name: item.food_item_name,
+          quantity: item.quantity,
+          calories: item.calories,
+          protein: item.protein,
+          carbs: item.carbs,
+          fat: item.fat,
+          dining_hall: item.dining_hall,
+        })));
 
       if (itemsError) throw itemsError;
 
@@ -140,7 +103,6 @@ export function MealTrackingDialog({
       });
 
       onOpenChange(false);
-      setMealName("");
       setServings("1");
     } catch (error: any) {
       console.error("Error adding meal:", error);
@@ -197,18 +159,6 @@ export function MealTrackingDialog({
             </div>
           </div>
 
-          {/* Meal Name Input */}
-          <div>
-            <Label htmlFor="mealName">Meal Name (optional)</Label>
-            <Input
-              id="mealName"
-              value={mealName}
-              onChange={(e) => setMealName(e.target.value)}
-              placeholder="e.g., Lunch from Commons"
-              className="mt-1"
-            />
-          </div>
-
           {/* Servings */}
           <div>
             <Label htmlFor="servings">Number of Servings</Label>
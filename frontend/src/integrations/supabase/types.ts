@@ -405,6 +405,10 @@ export type Database = {
         Args: { order_uuid: string }
         Returns: undefined
       }
+      delete_unreferenced_food_items: {
+        Args: { ids: number[] }
+        Returns: number[]
+      }
     }
     Enums: {
       order_status:
@@ -77,6 +77,15 @@ export interface MealEntry {
   location?: string;
 }
 
+export interface MealTemplate {
+  id: number;
+  profile_id: string;
+  name: string;
+  meal_category: string;
+  items: { food_item_id: number; servings: number }[];
+  created_at?: string;
+}
+
 export interface DailyTotals {
   date: string;
   calories: number;
@@ -89,6 +98,25 @@ export interface DailyTotals {
   meal_count: number;
 }
 
+export interface NutritionTrendBucket {
+  start_date: string;
+  end_date: string;
+  days: number;
+  days_logged: number;
+  totals: Omit<DailyTotals, 'date'>;
+  averages: { [nutrient: string]: number };
+  goal_adherence: { [nutrient: string]: number };
+}
+
+export interface NutritionTrends {
+  profile_id: string;
+  start_date: string;
+  end_date: string;
+  bucket: 'day' | 'week' | 'month';
+  goals: { [nutrient: string]: number };
+  buckets: NutritionTrendBucket[];
+}
+
 export interface MealsByCategory {
   Breakfast: MealEntry[];
   Lunch: MealEntry[];
@@ -157,6 +185,43 @@ export const nutritionApi = {
     });
   },
 
+  async createMealEntriesBatch(data: {
+    profile_id: string;
+    meal_category?: string;
+    entry_date?: string;
+    items: { food_item_id: number; servings?: number; meal_category?: string; entry_date?: string }[];
+  }): Promise<MealEntry[]> {
+    return apiRequest('/api/nutrition/meals:batch', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  },
+
+  // Meal templates
+  async getMealTemplates(userId: string): Promise<MealTemplate[]> {
+    return apiRequest(`/api/nutrition/meal-templates/user/${userId}`);
+  },
+
+  async createMealTemplate(data: Omit<MealTemplate, 'id' | 'created_at'>): Promise<MealTemplate> {
+    return apiRequest('/api/nutrition/meal-templates', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  },
+
+  async logMealTemplate(id: number, data: { entry_date?: string; meal_category?: string } = {}): Promise<MealEntry[]> {
+    return apiRequest(`/api/nutrition/meal-templates/${id}/log`, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  },
+
+  async deleteMealTemplate(id: number): Promise<void> {
+    return apiRequest(`/api/nutrition/meal-templates/${id}`, {
+      method: 'DELETE',
+    });
+  },
+
   async getMealEntry(id: number): Promise<MealEntry> {
     return apiRequest(`/api/nutrition/meals/${id}`);
   },
@@ -201,6 +266,14 @@ export const nutritionApi = {
     return apiRequest(`/api/nutrition/totals/user/${userId}/date/${date}`);
   },
 
+  async getNutritionTrends(
+    userId: string,
+    range: string = '90d',
+    bucket: 'day' | 'week' | 'month' = 'week'
+  ): Promise<NutritionTrends> {
+    return apiRequest(`/api/nutrition/trends/user/${userId}?range=${range}&bucket=${bucket}`);
+  },
+
   // User profile
   async getProfile(userId: string): Promise<UserProfile> {
     return apiRequest(`/api/nutrition/profiles/${userId}`);
@@ -53,6 +53,7 @@ import { calculateBMR, calculateTDEE } from "@/lib/calculations";
 type MealEntryItem = {
   id: string;
   meal_entry_id: number;
+  order_item_id: string | null;
   food_item_name: string;
   quantity: number;
   calories: number;
@@ -190,30 +191,22 @@ const Nutrition = () => {
       // Fetch meal entries for selected date using API
       const mealsData = await nutritionApi.getMealsByDate(user.id, selectedDate);
       
-      // Also fetch meal_entry_items for manual entries
+      // Also fetch meal_entry_items: manual entries, and the order items a logged order came from
       const { data: mealEntryItems } = await supabase
         .from('meal_entry_items')
         .select('*, meal_entry_id')
         .order('created_at', { ascending: true });
 
-      // Create a map of meal_entry_id to meal_entry_items
-      const itemsMap = new Map<number, Array<{
-        id: string;
-        meal_entry_id: number;
-        food_item_name: string;
-        quantity: number;
-        calories: number;
-        protein: number;
-        carbs: number;
-        fat: number;
-        dining_hall: string | null;
-      }>>();
+      // Create maps of meal_entry_id to manual items and to linked order items
+      const itemsMap = new Map<number, MealEntryItem[]>();
+      const orderItemsMap = new Map<number, MealEntryItem[]>();
       if (mealEntryItems) {
         mealEntryItems.forEach(item => {
-          if (!itemsMap.has(item.meal_entry_id)) {
-            itemsMap.set(item.meal_entry_id, []);
+          const map = item.order_item_id ? orderItemsMap : itemsMap;
+          if (!map.has(item.meal_entry_id)) {
+            map.set(item.meal_entry_id, []);
           }
-          itemsMap.get(item.meal_entry_id)?.push(item);
+          map.get(item.meal_entry_id)?.push(item);
         });
       }
       
@@ -244,9 +237,10 @@ const Nutrition = () => {
               });
             });
           } else {
-            // Regular food item from database
+            // Regular food item from database, with the order items it was logged from
             allMeals.push({
               ...meal,
+              meal_entry_items: orderItemsMap.get(meal.id),
               food_item: {
                 id: meal.food_item_id,
                 name: meal.food_name || '',
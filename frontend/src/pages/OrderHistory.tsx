@@ -19,6 +19,7 @@ type OrderStatus = 'pending' | 'preparing' | 'ready' | 'out_for_delivery' | 'del
 
 type OrderItem = {
   id: string;
+  food_item_id: number;
   food_item_name: string;
   quantity: number;
   calories: number;
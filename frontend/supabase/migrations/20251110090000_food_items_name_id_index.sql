@@ -0,0 +1,4 @@
+-- Keyset pagination for GET /api/nutrition/food-items orders by (name, id)
+-- and filters with (name, id) > (last_name, last_id); this index turns every
+-- page into a short range scan instead of scanning and discarding OFFSET rows.
+CREATE INDEX IF NOT EXISTS idx_food_items_name_id ON public.food_items(name, id);
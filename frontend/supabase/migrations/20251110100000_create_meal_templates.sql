@@ -0,0 +1,37 @@
+-- Saved meals that can be logged to meal_entries with a single call
+-- items: [{"food_item_id": 123, "servings": 1.0}, ...]
+CREATE TABLE IF NOT EXISTS public.meal_templates (
+  id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  profile_id uuid NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+  name text NOT NULL,
+  meal_category text NOT NULL DEFAULT 'Lunch',
+  items jsonb NOT NULL DEFAULT '[]'::jsonb,
+  created_at timestamp with time zone DEFAULT now()
+);
+
+-- Enable RLS
+ALTER TABLE public.meal_templates ENABLE ROW LEVEL SECURITY;
+
+-- Create policies for meal_templates
+CREATE POLICY "Users can view their own meal templates"
+  ON public.meal_templates
+  FOR SELECT
+  USING (auth.uid() = profile_id);
+
+CREATE POLICY "Users can insert their own meal templates"
+  ON public.meal_templates
+  FOR INSERT
+  WITH CHECK (auth.uid() = profile_id);
+
+CREATE POLICY "Users can update their own meal templates"
+  ON public.meal_templates
+  FOR UPDATE
+  USING (auth.uid() = profile_id);
+
+CREATE POLICY "Users can delete their own meal templates"
+  ON public.meal_templates
+  FOR DELETE
+  USING (auth.uid() = profile_id);
+
+-- Create index for better query performance
+CREATE INDEX idx_meal_templates_profile_id ON public.meal_templates(profile_id);
@@ -0,0 +1,37 @@
+-- Single-row counter bumped by every write to food_items (API uploads, the
+-- Lambda scraper ingest, seeds). The nutrition API uses it as the ETag for menu
+-- endpoints, so repeat requests between ingests can be answered with 304.
+CREATE TABLE IF NOT EXISTS public.menu_version (
+  id boolean PRIMARY KEY DEFAULT true CHECK (id),
+  version bigint NOT NULL DEFAULT 1,
+  updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.menu_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+-- Enable RLS (menu data is public, the counter is read-only for clients)
+ALTER TABLE public.menu_version ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view the menu version"
+  ON public.menu_version
+  FOR SELECT
+  USING (true);
+
+CREATE OR REPLACE FUNCTION public.bump_menu_version()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.menu_version SET version = version + 1, updated_at = now() WHERE id;
+  RETURN NULL;
+END;
+$$;
+
+-- Statement-level, so a 500-row batch upsert bumps the version once
+DROP TRIGGER IF EXISTS food_items_bump_menu_version ON public.food_items;
+CREATE TRIGGER food_items_bump_menu_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.food_items
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.bump_menu_version();
@@ -0,0 +1,7 @@
+-- Hash of each item's name and nutrition fields, written by the menu ingest
+-- (API uploads and the Lambda scraper). Re-ingesting a menu compares hashes and
+-- only writes rows that are new or changed; NULL (older rows) counts as changed.
+ALTER TABLE public.food_items ADD COLUMN IF NOT EXISTS content_hash text;
+
+-- The ingest loads the stored hashes of the locations/dates it is about to write
+CREATE INDEX IF NOT EXISTS idx_food_items_location_date ON public.food_items(location, date);
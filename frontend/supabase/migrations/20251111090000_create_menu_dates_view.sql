@@ -0,0 +1,9 @@
+-- Distinct (location, date) pairs already loaded into food_items, answered from
+-- idx_food_items_location_date. The scraper reads it to fetch only the dates
+-- that are missing (or due for a refresh) instead of every date on the site.
+CREATE OR REPLACE VIEW public.menu_dates AS
+SELECT location, date, count(*) AS item_count
+FROM public.food_items
+GROUP BY location, date;
+
+GRANT SELECT ON public.menu_dates TO anon, authenticated, service_role;
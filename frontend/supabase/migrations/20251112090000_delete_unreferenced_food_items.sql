@@ -0,0 +1,30 @@
+-- Deletes the given food items that nothing refers to, in one statement, and
+-- returns the ids it deleted. The menu ingest calls it for items that left a
+-- menu: items logged in meal_entries, ordered in order_items or saved in a
+-- meal template (items: [{"food_item_id": 123, ...}]) are kept. Checking and
+-- deleting in one statement leaves no gap for a meal to be logged in between.
+CREATE OR REPLACE FUNCTION public.delete_unreferenced_food_items(ids bigint[])
+RETURNS SETOF bigint
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  DELETE FROM public.food_items f
+  WHERE f.id = ANY(ids)
+    AND NOT EXISTS (SELECT 1 FROM public.meal_entries m WHERE m.food_item_id = f.id)
+    AND NOT EXISTS (SELECT 1 FROM public.order_items o WHERE o.food_item_id = f.id)
+    AND NOT EXISTS (
+      SELECT 1 FROM public.meal_templates t
+      WHERE t.items @> jsonb_build_array(jsonb_build_object('food_item_id', f.id))
+    )
+  RETURNING f.id;
+$$;
+
+-- Only the ingest (service role) deletes food items
+REVOKE EXECUTE ON FUNCTION public.delete_unreferenced_food_items(bigint[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.delete_unreferenced_food_items(bigint[]) TO service_role;
+
+-- The NOT EXISTS checks look up each candidate id in these
+CREATE INDEX IF NOT EXISTS idx_meal_entries_food_item_id ON public.meal_entries(food_item_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_food_item_id ON public.order_items(food_item_id);
+CREATE INDEX IF NOT EXISTS idx_meal_templates_items ON public.meal_templates USING gin (items jsonb_path_ops);
@@ -1,10 +1,13 @@
 """
 Debug script to inspect scraped menu data structure
+
+    python debug_scraper.py [--hall Worcester] [--replay [--replay-dir DIR]] [--record DIR]
 """
 import os
 import sys
 import json
 import asyncio
+import argparse
 
 # Add backend to path for .env loading
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
@@ -14,16 +17,20 @@ from dotenv import load_dotenv
 backend_env = os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')
 load_dotenv(backend_env)
 
-from lambda_function import scrape_dining_hall
 
-async def debug_scrape():
+async def debug_scrape(hall="Worcester", mode=None):
     """Scrape one dining hall and print detailed debug info"""
-    print("Scraping Worcester dining hall...")
+    # Imported here so --replay-dir/--record set on the command line are picked up
+    from menu_fetch import DEFAULT_FETCH_MODE, scrape_with_fallback
+    from scraper_utils import DINING_HALLS, parse_menu_from_html, scrape_with_browser
+
+    print(f"Scraping {hall} dining hall...")
 
-    menus = await scrape_dining_hall(
-        "https://umassdining.com/locations-menus/worcester/menu",
-        "Worcester"
+    halls = {hall: DINING_HALLS[hall]}
+    all_menus = await scrape_with_fallback(
+        halls, parse_menu_from_html, scrape_with_browser, mode=mode or DEFAULT_FETCH_MODE
     )
+    menus = all_menus.get(hall, [])
 
     print(f"\nFound {len(menus)} menu entries")
 
@@ -50,4 +57,14 @@ async def debug_scrape():
     print(f"\n\nFull menu data saved to debug_menu_output.json")
 
 if __name__ == "__main__":
-    asyncio.run(debug_scrape())
+    parser = argparse.ArgumentParser(description="Scrape one dining hall and dump its menus")
+    parser.add_argument("--hall", default="Worcester", help="Dining hall name (default: Worcester)")
+    parser.add_argument("--replay", action="store_true", help="Read a recorded scrape instead of the site")
+    parser.add_argument("--replay-dir", help="Recording to replay (default: backend/fixtures/scrape)")
+    parser.add_argument("--record", metavar="DIR", help="Save the fetched pages under DIR for later replay")
+    args = parser.parse_args()
+    if args.replay_dir:
+        os.environ["SCRAPER_REPLAY_DIR"] = args.replay_dir
+    if args.record:
+        os.environ["SCRAPER_RECORD_DIR"] = args.record
+    asyncio.run(debug_scrape(args.hall, "replay" if args.replay or args.replay_dir else None))
@@ -6,27 +6,31 @@ Runs every Saturday at 11:00 AM via EventBridge
 
 import json
 import os
+import sys
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List
 from supabase import create_client, Client
-from scraper_utils import scrape_all_dining_halls
-
-# Supabase Configuration
-SUPABASE_URL = os.environ['SUPABASE_URL']
-SUPABASE_KEY = os.environ['SUPABASE_KEY']
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def parse_nutrition_value(value: str) -> float:
-    """Extract numeric value from nutrition string (e.g., '25.9g' -> 25.9)"""
-    if not value:
-        return 0.0
-    numeric_str = ''.join(c for c in value if c.isdigit() or c == '.')
-    try:
-        return float(numeric_str) if numeric_str else 0.0
-    except ValueError:
-        return 0.0
 
+# Shared modules live in backend/ (the Docker image copies them next to this file)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from scraper_utils import DINING_HALLS, scrape_all_dining_halls
+from menu_diff import empty_summary, sync_food_items
+from menu_pipeline import MenuPipeline
+from menu_page_cache import MenuPageCache
+from menu_fetch import DEFAULT_FETCH_MODE
+from menu_dates import load_scrape_plan
+
+# Optional Parquet snapshot directory (e.g. an EFS mount); unset disables snapshots
+MENU_SNAPSHOT_DIR = os.environ.get('MENU_SNAPSHOT_DIR')
+
+# Optional page hash cache file (e.g. on the same EFS mount); unset re-parses and re-loads every page
+MENU_PAGE_CACHE = os.environ.get('MENU_PAGE_CACHE')
+
+# Supabase Configuration (checked in the handler, so a dry run needs no credentials)
+SUPABASE_URL = os.environ.get('SUPABASE_URL')
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
 def get_past_week_dates() -> List[str]:
     """
@@ -95,65 +99,26 @@ def delete_past_week_data():
         raise
 
 
-def load_to_supabase(menu_data: Dict):
-    """Load scraped menu data into Supabase food_items table"""
-    food_items = []
-
-    # Parse menu data into food items
-    for location, entries in menu_data.items():
-        for entry in entries:
-            date = entry.get("date", "")
-            meals = entry.get("meals", {})
-
-            for meal_type, meal_sections in meals.items():
-                for section_name, items in meal_sections.items():
-                    for item in items:
-                        nutrition = item.get("nutrition", {})
-
-                        food_item = {
-                            "name": item.get("name", "Unknown"),
-                            "serving_size": nutrition.get("serving_size", "1 serving"),
-                            "calories": int(parse_nutrition_value(nutrition.get("calories", "0"))),
-                            "total_fat": parse_nutrition_value(nutrition.get("total_fat", "0g")),
-                            "sodium": parse_nutrition_value(nutrition.get("sodium", "0mg")),
-                            "total_carb": parse_nutrition_value(nutrition.get("total_carb", "0g")),
-                            "dietary_fiber": parse_nutrition_value(nutrition.get("dietary_fiber", "0g")),
-                            "sugars": parse_nutrition_value(nutrition.get("sugars", "0g")),
-                            "protein": parse_nutrition_value(nutrition.get("protein", "0g")),
-                            "location": location,
-                            "date": date,
-                            "meal_type": meal_type
-                        }
-
-                        food_items.append(food_item)
-
-    print(f"\nLoading {len(food_items)} food items to Supabase...")
-
-    # Batch insert to Supabase (handle duplicates)
-    batch_size = 100
-    inserted_count = 0
-
-    for i in range(0, len(food_items), batch_size):
-        batch = food_items[i:i+batch_size]
-        try:
-            # Use upsert to handle duplicates
-            result = supabase.table("food_items").upsert(
-                batch,
-                on_conflict="name,location,date,meal_type"
-            ).execute()
-            inserted_count += len(batch)
-            print(f"Inserted batch {i//batch_size + 1}: {len(batch)} items")
-        except Exception as e:
-            print(f"Error inserting batch {i//batch_size + 1}: {e}")
-
-    print(f"[SUCCESS] Successfully loaded {inserted_count} food items to Supabase")
-    return inserted_count
+def load_batch_to_supabase(food_items: List[Dict]) -> Dict[str, int]:
+    """Load one batch of food_items rows (whole menus) into Supabase, writing only what changed"""
+    # Only new/changed items are written; items dropped from a scraped meal are deleted
+    summary = sync_food_items(supabase, food_items)
+
+    print(f"[SUCCESS] Diff: {summary['inserted']} inserted, {summary['updated']} updated, "
+          f"{summary['unchanged']} unchanged, {summary['deleted']} deleted")
+    return summary
 
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler function
     Triggered by EventBridge on Saturdays at 11:00 AM
+
+    Only dates missing from food_items (or within SCRAPER_REFRESH_DAYS of today)
+    are scraped. Optional event keys: "full": true scrapes every date,
+    "refresh_dates": [...] re-scrapes those dates even if loaded, "fetch_mode"
+    overrides SCRAPER_FETCH_MODE (e.g. "replay" to scrape a recording offline)
+    and "dry_run": true scrapes without writing to Supabase
     """
     import subprocess  # Import at function level for both Lambda and error handling
 
@@ -165,20 +130,45 @@ def lambda_handler(event, context):
     print(f"Memory Limit: {context.memory_limit_in_mb}MB")
     print(f"Time Remaining: {context.get_remaining_time_in_millis()}ms")
 
+    event = event or {}
+    dry_run = bool(event.get('dry_run'))
+    fetch_mode = event.get('fetch_mode', DEFAULT_FETCH_MODE)
+    full_scrape = bool(event.get('full'))
+
     try:
         # Verify environment variables
-        if not SUPABASE_URL or not SUPABASE_KEY:
+        if dry_run:
+            print("[DRY RUN] Nothing will be written to Supabase")
+        elif not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY environment variables")
-
-        print(f"Supabase URL configured: {SUPABASE_URL[:30]}...")
+        else:
+            print(f"Supabase URL configured: {SUPABASE_URL[:30]}...")
 
         # Playwright browsers are in Lambda layer
         print("\n[INFO] Using Playwright from Lambda layer")
 
-        # Scrape all dining halls
-        print("\n[SCRAPE] Starting menu scraping...")
+        # Scrape and load in one pass: each scraped menu goes through a bounded queue into
+        # row building and batched writes while the remaining dates are still being scraped
+        print("\n[SCRAPE] Starting menu scraping and loading...")
         print(f"Time remaining: {context.get_remaining_time_in_millis()}ms")
-        menu_data = asyncio.run(scrape_all_dining_halls())
+        page_cache = MenuPageCache(MENU_PAGE_CACHE) if MENU_PAGE_CACHE else None
+        # Skip dates already loaded (a recording is never compared with the database)
+        plan = None
+        if not full_scrape and supabase is not None and fetch_mode != 'replay':
+            plan = load_scrape_plan(supabase, DINING_HALLS, refresh_dates=event.get('refresh_dates', []))
+        # Pages unchanged since the last scrape were loaded then; only the rest is diffed and written
+        pipeline = MenuPipeline(
+            write_batch=(lambda rows: empty_summary()) if dry_run else load_batch_to_supabase,
+            skip=(lambda hall, menu: (hall, menu.get('date')) in page_cache.unchanged) if page_cache else None,
+        )
+        menu_data = asyncio.run(pipeline.run(lambda on_menu: scrape_all_dining_halls(
+            mode=fetch_mode, cache=page_cache, select_dates=plan.select if plan else None, on_menu=on_menu
+        )))
+        if plan:
+            print(f"[INCREMENTAL] {plan.summary()}")
+        if page_cache:
+            print(f"[CACHE] {page_cache.summary()}")
+        print(f"[PIPELINE] {pipeline.report()}")
 
         # Validate scraped data
         total_items = sum(len(entries) for entries in menu_data.values())
@@ -187,19 +177,35 @@ def lambda_handler(event, context):
         if total_items == 0:
             print("[WARNING] No menu items were scraped")
 
-        # Load to Supabase
-        print("\n[UPLOAD] Loading data to Supabase...")
-        print(f"Time remaining: {context.get_remaining_time_in_millis()}ms")
-        item_count = load_to_supabase(menu_data)
-
-        # Delete past week's data (after successful scraping and loading)
-        print("\n[CLEANUP] Deleting past week's data...")
-        print(f"Time remaining: {context.get_remaining_time_in_millis()}ms")
-        try:
-            deleted_count = delete_past_week_data()
-        except Exception as e:
-            print(f"[WARNING] Failed to delete past week's data: {e}")
+        # Archive the full scrape (every field), including what was not written to the database
+        snapshot_rows = 0
+        if MENU_SNAPSHOT_DIR:
+            try:
+                from menu_snapshots import write_snapshot
+                snapshot_rows = write_snapshot(menu_data, MENU_SNAPSHOT_DIR)
+                print(f"\n[SNAPSHOT] Wrote {snapshot_rows} items to {MENU_SNAPSHOT_DIR}")
+            except Exception as e:
+                print(f"[WARNING] Failed to write Parquet snapshot: {e}")
+
+        load_summary = pipeline.summary
+        item_count = load_summary['inserted'] + load_summary['updated']
+        if dry_run:
+            # Nothing was loaded, so the page cache is not saved either
+            print(f"\n[DRY RUN] Skipped writing {pipeline.rows} rows and the cleanup")
             deleted_count = 0
+        else:
+            if page_cache:
+                # Only after every batch was written, so a failed load is retried next time
+                page_cache.save()
+
+            # Delete past week's data (after successful scraping and loading)
+            print("\n[CLEANUP] Deleting past week's data...")
+            print(f"Time remaining: {context.get_remaining_time_in_millis()}ms")
+            try:
+                deleted_count = delete_past_week_data()
+            except Exception as e:
+                print(f"[WARNING] Failed to delete past week's data: {e}")
+                deleted_count = 0
 
         # Calculate execution time
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -211,8 +217,16 @@ def lambda_handler(event, context):
                 'message': 'Menu scraping and database update completed successfully',
                 'timestamp': datetime.now().isoformat(),
                 'items_loaded': item_count,
+                'items_unchanged': load_summary['unchanged'],
+                'items_removed': load_summary['deleted'],
+                'pages_unchanged': len(page_cache.unchanged) if page_cache else 0,
                 'items_deleted': deleted_count,
+                'snapshot_items': snapshot_rows,
                 'dining_halls_scraped': len(menu_data),
+                'dates_skipped': sum(len(dates) for dates in plan.skipped.values()) if plan else 0,
+                'batches_written': pipeline.batches,
+                'menu_entries_scraped': total_items,
+                'dry_run': dry_run,
                 'execution_time_seconds': execution_time,
                 'request_id': context.request_id
             })
@@ -3,14 +3,16 @@ Shared scraper utilities for UMass Dining Hall menus
 Used by both Lambda function and backend scraper
 """
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import asyncio
+from functools import partial
+from scrape_pool import DEFAULT_CONCURRENCY, ScrapeTimeline, scrape_halls, select_menu_date
+from menu_fetch import DEFAULT_FETCH_MODE, scrape_with_fallback
+from menu_html import ParsePool, extract_menu, parse_menu_html
 
 
 async def get_available_dates(page, base_url):
     """Extract available dates from the dropdown menu"""
     print(f"Fetching available dates from {base_url}...")
-    await page.goto(base_url, wait_until='networkidle')
+    await page.goto(base_url, wait_until='domcontentloaded')
     await page.wait_for_selector('#upcoming-foodpro', timeout=10000)
     
     dates = await page.evaluate('''() => {
@@ -27,52 +29,16 @@ async def get_available_dates(page, base_url):
 
 
 def parse_menu_from_html(html_content, date_str, location_name):
-    """Parse menu data from HTML content"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    menu_data = {'date': date_str, 'location': location_name, 'meals': {}}
-    
-    meal_divs = soup.find_all('div', id=lambda x: x and '_menu' in x)
-    
-    for meal_div in meal_divs:
-        meal_type = meal_div.get('id').replace('_menu', '')
-        meal_header = meal_div.find('h2')
-        meal_name = meal_header.get_text(strip=True) if meal_header else meal_type
-        menu_data['meals'][meal_name] = {}
-        
-        content_div = meal_div.find('div', {'id': 'content_text'})
-        if content_div:
-            categories = content_div.find_all('h2', {'class': 'menu_category_name'})
-            
-            for category in categories:
-                category_name = category.get_text(strip=True)
-                menu_data['meals'][meal_name][category_name] = []
-                current = category.find_next_sibling()
-                
-                while current:
-                    if current.name == 'h2' and 'menu_category_name' in current.get('class', []):
-                        break
-                    
-                    if current.name == 'li' and 'lightbox-nutrition' in current.get('class', []):
-                        link = current.find('a')
-                        if link:
-                            item_data = {
-                                'name': link.get_text(strip=True),
-                                'nutrition': {
-                                    'calories': link.get('data-calories', ''),
-                                    'total_fat': link.get('data-total-fat', ''),
-                                    'sodium': link.get('data-sodium', ''),
-                                    'total_carb': link.get('data-total-carb', ''),
-                                    'dietary_fiber': link.get('data-dietary-fiber', ''),
-                                    'sugars': link.get('data-sugars', ''),
-                                    'protein': link.get('data-protein', ''),
-                                    'serving_size': link.get('data-serving-size', '')
-                                }
-                            }
-                            menu_data['meals'][meal_name][category_name].append(item_data)
-                    
-                    current = current.find_next_sibling()
-    
-    return menu_data
+    """Parse menu data from HTML content, keeping the hall name as the location"""
+    return parse_menu_html(html_content, date_str, location_name, detect_location=False)
+
+
+async def get_menu_for_date(page, date_value, date_text, location_name, cache=None, parse_pool=None):
+    """Select one date in the dropdown (page must be on the hall's menu) and parse it unless unchanged"""
+    print(f"Fetching menu for {date_text} at {location_name}...")
+    if not await select_menu_date(page, date_value):
+        print(f"[WARNING] Menu did not change for {date_text} at {location_name}; reading the page as is")
+    return await extract_menu(page, date_text, location_name, detect_location=False, cache=cache, parse_pool=parse_pool)
 
 
 async def get_all_menus_for_dining_hall(page, base_url, location_name):
@@ -88,14 +54,9 @@ async def get_all_menus_for_dining_hall(page, base_url, location_name):
         hall_menus = []
         for i, (date_value, date_text) in enumerate(available_dates, 1):
             print(f"Processing {i}/{len(available_dates)}: {date_text}")
-            await page.select_option('#upcoming-foodpro', value=date_value)
-            await page.wait_for_load_state('networkidle')
-            await asyncio.sleep(1)
-            html_content = await page.content()
-            menu_data = parse_menu_from_html(html_content, date_text, location_name)
+            menu_data = await get_menu_for_date(page, date_value, date_text, location_name)
             if menu_data:
                 hall_menus.append(menu_data)
-            await asyncio.sleep(1)
         
         return hall_menus
     except Exception as e:
@@ -103,27 +64,50 @@ async def get_all_menus_for_dining_hall(page, base_url, location_name):
         return []
 
 
-async def scrape_all_dining_halls():
-    """Scrape all dining hall menus"""
-    dining_halls = {
-        "Berkshire": "https://umassdining.com/menu/berkshire-grab-n-go-menu",
-        "Worcester": "https://umassdining.com/menu/worcester-grab-n-go",
-        "Franklin": "https://umassdining.com/menu/franklin-grab-n-go",
-        "Hampshire": "https://umassdining.com/menu/hampshire-grab-n-go"
-    }
-    
+DINING_HALLS = {
+    "Berkshire": "https://umassdining.com/menu/berkshire-grab-n-go-menu",
+    "Worcester": "https://umassdining.com/menu/worcester-grab-n-go",
+    "Franklin": "https://umassdining.com/menu/franklin-grab-n-go",
+    "Hampshire": "https://umassdining.com/menu/hampshire-grab-n-go"
+}
+
+
+async def scrape_with_browser(dining_halls, concurrency=DEFAULT_CONCURRENCY, cache=None, select_dates=None, on_menu=None, parse_pool=None):
+    """Scrape the given halls with Chromium, halls and dates concurrently over a pool of pages"""
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=True,
             args=['--no-sandbox', '--disable-dev-shm-usage']
         )
-        page = await browser.new_page()
-        all_menus = {}
         
         try:
-            for hall_name, hall_url in dining_halls.items():
-                menus = await get_all_menus_for_dining_hall(page, hall_url, hall_name)
-                all_menus[hall_name] = menus
-            return all_menus
+            return await scrape_halls(
+                browser, dining_halls, get_available_dates, partial(get_menu_for_date, cache=cache, parse_pool=parse_pool),
+                concurrency=concurrency, select_dates=select_dates, on_menu=on_menu,
+                timeline=parse_pool.timeline if parse_pool else None
+            )
         finally:
             await browser.close()
+
+
+async def scrape_all_dining_halls(mode=DEFAULT_FETCH_MODE, concurrency=DEFAULT_CONCURRENCY, cache=None, select_dates=None, on_menu=None):
+    """
+    Scrape all dining hall menus over HTTP, using Chromium only for halls that fail over HTTP
+    With a MenuPageCache, unchanged pages reuse the cached menu instead of being parsed
+    With select_dates (a menu_dates.ScrapePlan's select), only the dates it keeps are scraped
+    With on_menu (e.g. a menu_pipeline.MenuPipeline's put), each menu is handed on as soon as it is scraped
+    HTML is parsed in a ParsePool (SCRAPER_PARSE_EXECUTOR), overlapping the requests still in flight
+    """
+    with ParsePool(timeline=ScrapeTimeline()) as parse_pool:
+        menus = await scrape_with_fallback(
+            DINING_HALLS,
+            cache.cached_parser(parse_menu_from_html) if cache else parse_menu_from_html,
+            lambda halls: scrape_with_browser(halls, concurrency, cache, select_dates, on_menu, parse_pool),
+            mode=mode,
+            select_dates=select_dates,
+            on_menu=on_menu,
+            parse_pool=parse_pool
+        )
+    if parse_pool.timeline.spans:
+        print(f"[TIMING] {parse_pool.timeline.report()}")
+    return menus
@@ -1,6 +1,12 @@
 """
 Test script to run the Lambda function locally with mock AWS context
+
+    python test_lambda_local.py                 # live scrape, loads into Supabase
+    python test_lambda_local.py --replay        # offline: recorded pages, no Supabase
+    python test_lambda_local.py --dry-run       # live scrape, no Supabase writes
+    python test_lambda_local.py --full          # every date, not only those missing from Supabase
 """
+import argparse
 import os
 import sys
 from datetime import datetime
@@ -13,9 +19,6 @@ from dotenv import load_dotenv
 backend_env = os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')
 load_dotenv(backend_env)
 
-# Import the lambda function
-from lambda_function import lambda_handler
-
 
 class MockLambdaContext:
     """Mock AWS Lambda context for local testing"""
@@ -34,8 +37,13 @@ class MockLambdaContext:
         return self._remaining_time_ms
 
 
-def test_lambda_local():
-    """Run the Lambda function locally"""
+def test_lambda_local(replay=False, dry_run=False, full=False):
+    """Run the Lambda function locally (replay implies dry_run: recorded menus are never loaded)"""
+    # Imported here so a --replay-dir set on the command line is picked up
+    from lambda_function import lambda_handler
+
+    dry_run = dry_run or replay
+
     print("="*80)
     print("Testing Lambda Function Locally")
     print("="*80)
@@ -60,8 +68,12 @@ def test_lambda_local():
         "resources": [
             "arn:aws:events:us-east-1:123456789012:rule/test-rule"
         ],
-        "detail": {}
+        "detail": {},
+        "dry_run": dry_run,
+        "full": full
     }
+    if replay:
+        event["fetch_mode"] = "replay"
 
     print(f"\nInvoking Lambda function...")
     print(f"Request ID: {context.request_id}")
@@ -98,4 +110,13 @@ def test_lambda_local():
 
 
 if __name__ == "__main__":
-    test_lambda_local()
+    parser = argparse.ArgumentParser(description="Run the Lambda function locally")
+    parser.add_argument("--replay", action="store_true",
+                        help="Scrape a recorded site (SCRAPER_REPLAY_DIR) with no network access")
+    parser.add_argument("--replay-dir", help="Recording to replay (default: backend/fixtures/scrape)")
+    parser.add_argument("--dry-run", action="store_true", help="Do not load into or clean up Supabase")
+    parser.add_argument("--full", action="store_true", help="Scrape every date, not only those missing from Supabase")
+    args = parser.parse_args()
+    if args.replay_dir:
+        os.environ["SCRAPER_REPLAY_DIR"] = args.replay_dir
+    test_lambda_local(replay=args.replay or bool(args.replay_dir), dry_run=args.dry_run, full=args.full)